@@ -0,0 +1,155 @@
+import os
+import json
+import argparse
+
+import numpy as np
+
+from run_gaia import GAIALoader
+from owl.utils.gaia_scoring import diff_runs, read_results, score_results
+
+
+LEVELS = [1, 2, 3]
+
+
+def load_results(result_file):
+    """Return the last record of every task in a result file"""
+    return {record["task_id"]: record for record in read_results(result_file)}
+
+
+def percentiles(values, qs=(50, 90, 99)):
+    if not values:
+        return {f"p{q}": None for q in qs}
+    return {f"p{q}": round(float(np.percentile(values, q)), 3) for q in qs}
+
+
+def summarize(results, tasks):
+    """Accuracy per level, latency percentiles and token usage of one run
+
+    Args:
+        results: Result records of the run, by task id
+        tasks: Dataset records, by task id
+
+    Returns:
+        dict: Statistics of the run over the tasks of the dataset it covers
+    """
+    report = score_results(results.values(), tasks)
+    per_level = report.per_level()
+    durations = []
+    prompt_tokens = []
+    completion_tokens = []
+    failed = 0
+    timed_out = 0
+    for task_id in report.scores:
+        record = results[task_id]
+        if record.get("status") == "timeout":
+            timed_out += 1
+        elif record.get("error"):
+            failed += 1
+        if "duration" in record:
+            durations.append(record["duration"])
+        token_info = record.get("token_info")
+        if token_info:
+            prompt_tokens.append(token_info.get("prompt_token_count", 0))
+            completion_tokens.append(token_info.get("completion_token_count", 0))
+
+    return {
+        "total": report.total,
+        "correct": report.correct,
+        "accuracy": round(report.accuracy, 4) if report.total else None,
+        "failed": failed,
+        "timed_out": timed_out,
+        "levels": {
+            level: {
+                "total": per_level.get(level, {}).get("total", 0),
+                "correct": per_level.get(level, {}).get("correct", 0),
+                "accuracy": (round(per_level[level]["accuracy"], 4)
+                             if level in per_level else None),
+            }
+            for level in LEVELS
+        },
+        "latency": percentiles(durations),
+        "tokens": {
+            "prompt_mean": round(float(np.mean(prompt_tokens)), 1) if prompt_tokens else None,
+            "completion_mean": round(float(np.mean(completion_tokens)), 1) if completion_tokens else None,
+            "total": int(sum(prompt_tokens) + sum(completion_tokens)),
+        },
+    }, report
+
+
+def print_diff(first_tag, first, second_tag, second, tasks):
+    """Print the tasks whose outcome flipped between two runs"""
+    diff = diff_runs(first, second)
+    print(f"\n{first_tag} -> {second_tag}: {len(diff.fixed)} fixed, "
+          f"{len(diff.broken)} broken, {len(diff.only_first)} only in "
+          f"{first_tag}, {len(diff.only_second)} only in {second_tag}")
+    for label, task_ids in (("fixed", diff.fixed), ("broken", diff.broken)):
+        for task_id in task_ids:
+            print(f"  {label:6} L{tasks[task_id]['Level']} {task_id}: "
+                  f"{first.answers[task_id]!r} -> {second.answers[task_id]!r} "
+                  f"(expected {tasks[task_id]['Final answer']!r})")
+
+
+def format_table(summaries):
+    columns = ["tag", "tasks", "acc", "L1", "L2", "L3", "failed", "timeout",
+               "p50 s", "p90 s", "p99 s", "prompt tok", "compl. tok"]
+    rows = []
+    for tag, summary in summaries.items():
+        rows.append([
+            tag,
+            summary["total"],
+            summary["accuracy"],
+            *(summary["levels"][level]["accuracy"] for level in LEVELS),
+            summary["failed"],
+            summary["timed_out"],
+            summary["latency"]["p50"],
+            summary["latency"]["p90"],
+            summary["latency"]["p99"],
+            summary["tokens"]["prompt_mean"],
+            summary["tokens"]["completion_mean"],
+        ])
+    cells = [columns] + [["-" if v is None else str(v) for v in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(columns))]
+    lines = ["  ".join(cell.ljust(width) for cell, width in zip(row, widths))
+             for row in cells]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare GAIA runs of several backends")
+    parser.add_argument("--tags", nargs="+", required=True,
+                        help="tags of the runs, as given to run_gaia.py")
+    parser.add_argument("--set-type", default="validation",
+                        choices=["validation", "test"])
+    parser.add_argument("--output", default=None,
+                        help="also write the statistics to this JSON file")
+    parser.add_argument("--diff", action="store_true",
+                        help="list the tasks that flipped between each tag "
+                             "and the first one")
+    args = parser.parse_args()
+
+    tasks = {task["task_id"]: task
+             for task in GAIALoader("all").dataset[args.set_type]}
+
+    summaries = {}
+    reports = {}
+    for tag in args.tags:
+        result_file = os.path.join("results", tag, f"gaia_{args.set_type}.jsonl")
+        if not os.path.exists(result_file):
+            print(f"No results for {tag} ({result_file} not found).")
+            continue
+        summaries[tag], reports[tag] = summarize(load_results(result_file), tasks)
+
+    print(format_table(summaries))
+    if args.diff and reports:
+        base_tag, *other_tags = reports
+        for tag in other_tags:
+            print_diff(base_tag, reports[base_tag], tag, reports[tag], tasks)
+    if args.output:
+        with open(args.output, "w") as fout:
+            json.dump(summaries, fout, indent=4)
+
+
+if __name__ == '__main__':
+    main()
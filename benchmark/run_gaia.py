@@ -1,24 +1,43 @@
 import os
-import json
 import time
+import queue
 import logging
+import argparse
+import glob
+import importlib
 import threading
 import traceback
+import contextvars
+import multiprocessing
+import signal
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
 
-from datasets import load_dataset
-
-from examples.run_azure_openai import construct_society
 from owl.utils import run_society
+from owl.utils.gaia_index import GAIAIndex
+from owl.utils.gaia_scoring import read_results
+from owl.utils.rate_limit import installed_rate_limiter
+from owl.utils.result_store import ResultStore
+from owl.utils.scheduling import CostModel, WorkStealingScheduler
+
+
+# Local index of the dataset, downloaded and built on first use
+GAIA_INDEX_PATH = os.environ.get("GAIA_INDEX", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "gaia_index.db"))
 
 
 class GAIALoader:
     def __init__(self, level):
         # level: level1, level2, level3, all
-        self.dataset = load_dataset(
-            path="gaia-benchmark/GAIA",
-            name=f"2023_{level}",
-            trust_remote_code=True
-        )
+        levels = None if level == "all" else [int(level[len("level"):])]
+        index = GAIAIndex.from_hub(GAIA_INDEX_PATH)
+        try:
+            self.dataset = {
+                split: index.tasks(split, levels)
+                for split in ["validation", "test"]
+            }
+        finally:
+            index.close()
 
     def task2query(self, task, output_file):
         query = 'Your task is: {}'.format(task['Question'])
@@ -35,43 +54,206 @@ class GAIALoader:
         return query
 
 
-def set_log(log_path, log_level=logging.INFO):
+LOG_FORMAT = ('[%(levelname)s][%(asctime)s.%(msecs)03d][%(process)d]'
+              '[%(filename)s:%(lineno)d]: %(message)s')
+LOG_DATEFMT = '(%Y-%m-%d) %H:%M:%S'
+
+# Id of the task whose log receives the records emitted in this context
+_current_task = contextvars.ContextVar("gaia_task_id", default=None)
+
+
+class _TaskRoutingHandler(logging.Handler):
+    """Write each record to the log file of the task that emitted it"""
+
+    def __init__(self, main_handler):
+        super().__init__()
+        self.main_handler = main_handler
+        self.task_handlers = {}
+        self.lock_handlers = threading.Lock()
+
+    def open_task(self, task_id, log_path):
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(self.main_handler.formatter)
+        with self.lock_handlers:
+            self.task_handlers[task_id] = handler
+
+    def emit(self, record):
+        close_task = getattr(record, "close_task", None)
+        with self.lock_handlers:
+            if close_task is not None:
+                handler = self.task_handlers.pop(close_task, None)
+            else:
+                handler = self.task_handlers.get(
+                    getattr(record, "task_id", None), self.main_handler)
+        if close_task is not None:
+            if handler is not None:
+                handler.close()
+            return
+        handler.handle(record)
+
+    def close(self):
+        with self.lock_handlers:
+            handlers, self.task_handlers = list(self.task_handlers.values()), {}
+        for handler in handlers:
+            handler.close()
+        self.main_handler.close()
+        super().close()
+
+
+class TaskLogRouter:
+    """Give every concurrently running task a log file of its own
+
+    The root logger gets a single QueueHandler, which tags every record with
+    the task running in the emitting context. A QueueListener thread then
+    writes each record to the file of its task, so tasks running side by
+    side never interleave their logs, and records emitted outside any task
+    go to the main log.
+    """
+
+    def __init__(self, main_log_path, log_level=logging.INFO):
+        self.log_level = log_level
+        self.queue = queue.Queue(-1)
+        main_handler = logging.FileHandler(main_log_path)
+        main_handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATEFMT))
+        self.router = _TaskRoutingHandler(main_handler)
+        self.queue_handler = QueueHandler(self.queue)
+        self.queue_handler.addFilter(self._tag)
+        self.listener = QueueListener(self.queue, self.router)
+
+    @staticmethod
+    def _tag(record):
+        if not hasattr(record, "task_id"):
+            record.task_id = _current_task.get()
+        return True
+
+    def start(self):
+        for handler in logging.root.handlers[:]:
+            logging.root.removeHandler(handler)
+        # otherwise, run_gaia will produce messy logs
+        logging.root.addHandler(self.queue_handler)
+        logging.root.setLevel(self.log_level)
+        logging.getLogger("openai").setLevel(logging.ERROR)
+        logging.getLogger("httpx").setLevel(logging.ERROR)
+        self.listener.start()
+
+    def stop(self):
+        logging.root.removeHandler(self.queue_handler)
+        self.listener.stop()
+        self.router.close()
+
+    @contextmanager
+    def task(self, task_id, log_path):
+        """Send the records emitted in this context to log_path"""
+        self.router.open_task(task_id, log_path)
+        reset = _current_task.set(task_id)
+        try:
+            yield
+        finally:
+            _current_task.reset(reset)
+            # Queued behind the task's records, so none of them is lost
+            marker = logging.makeLogRecord({"close_task": task_id, "msg": ""})
+            self.queue.put_nowait(marker)
+
+
+class TaskTimeout(Exception):
+    """A task ran longer than its wall-clock budget"""
+
+
+def child_main(module, query, log_path, memory_limit, conn):
+    """Entry point of the process running the society of one task"""
+    # A session of its own, so that the browser and tool subprocesses can
+    # be torn down together with the process.
+    if hasattr(os, "setsid"):
+        os.setsid()
+    if memory_limit:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
     for handler in logging.root.handlers[:]:
         logging.root.removeHandler(handler)
-    # otherwise, run_gaia will produce messy logs
-
-    logging.basicConfig(
-        filename=log_path,
-        level=log_level,
-        format='[%(levelname)s][%(asctime)s.%(msecs)03d][%(process)d]'
-               '[%(filename)s:%(lineno)d]: %(message)s',
-        datefmt='(%Y-%m-%d) %H:%M:%S'
-    )
+    logging.basicConfig(filename=log_path, level=logging.INFO,
+                        format=LOG_FORMAT, datefmt=LOG_DATEFMT)
     logging.getLogger("openai").setLevel(logging.ERROR)
     logging.getLogger("httpx").setLevel(logging.ERROR)
 
+    try:
+        construct_society = importlib.import_module(module).construct_society
+        society = construct_society(query)
+        answer, chat_history, token_count = run_society(society)
+        limiter = installed_rate_limiter()
+        conn.send({"answer": answer, "chat_history": chat_history,
+                   "token_count": token_count,
+                   "rate_limits": limiter.metrics() if limiter else None})
+    except BaseException as e:
+        logging.error(f"Run failed: {e}\n{traceback.format_exc()}")
+        conn.send({"error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
 
-def blocking_run(query, result_holder):
-    society = construct_society(query)
-    answer, chat_history, token_count = run_society(society)
-    result_holder["answer"] = answer
-    result_holder["chat_history"] = chat_history
-    result_holder["token_count"] = token_count
+def stop_process_group(process, grace=10):
+    """Stop a task process and everything it started, e.g. its browser"""
+    for sig, timeout in ((signal.SIGTERM, grace), (signal.SIGKILL, None)):
+        try:
+            os.killpg(process.pid, sig)
+        except (ProcessLookupError, PermissionError, AttributeError):
+            # The child has not made its own group yet, or is gone
+            if process.is_alive():
+                os.kill(process.pid, sig)
+        process.join(timeout)
+        if not process.is_alive():
+            # Its group may outlive it; make sure nothing of it is left
+            if sig == signal.SIGTERM:
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except (ProcessLookupError, PermissionError, AttributeError):
+                    pass
+            break
 
 
-def call_agent(query, log_path):
-    set_log(log_path)
-    logging.info(f"Starting serving the query: {query}")
-    # society = construct_society(query)
-    # answer, chat_history, token_count = run_society(society)
+def call_agent(config, query, log_path):
+    """Run the society on a query in a supervised child process
 
-    # detour to avoid errors:
-    # playwright._impl._errors.Error: It looks like you are using Playwright Sync API inside the asyncio loop.
-    # Please use the Async API instead.
-    result = {}
-    t = threading.Thread(target=blocking_run, args=(query, result))
-    t.start()
-    t.join()
+    The child is killed, together with its browser and tool subprocesses,
+    when it exceeds config.timeout seconds. Its address space is capped at
+    config.memory_limit bytes, when set.
+
+    Returns:
+        dict: The answer, chat history and token count of the run
+
+    Raises:
+        TaskTimeout: If the task ran out of time
+        RuntimeError: If the run failed or the process died
+    """
+    logging.info(f"Starting serving the query: {query}")
+    # spawn rather than fork: the runner has threads, whose locks a forked
+    # child would inherit in whatever state they were.
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(
+        target=child_main,
+        args=(config.module, query, log_path, config.memory_limit, sender),
+        daemon=True,
+    )
+    process.start()
+    # Only the child writes; EOF then signals that it has exited.
+    sender.close()
+    try:
+        if not receiver.poll(config.timeout or None):
+            logging.error(f"Task timed out after {config.timeout}s")
+            raise TaskTimeout(f"timed out after {config.timeout}s")
+        try:
+            result = receiver.recv()
+        except EOFError:
+            process.join()
+            raise RuntimeError(
+                f"process exited with code {process.exitcode} without a result")
+    finally:
+        receiver.close()
+        stop_process_group(process)
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return result
 
 
 def read_final_answer(output_path):
@@ -86,67 +268,220 @@ def read_final_answer(output_path):
     return final_answer
 
 
-def main():
-    # set_type = "test"  # or "validation"
-    set_type = "validation"
-    result_file = f"gaia_{set_type}.jsonl"
-    retry_limit = 3
-
-    # Load processed task_ids if result_file already exists.
-    processed_tasks = set()
-    if os.path.exists(result_file):
-        with open(result_file, 'r') as f:
-            for line in f:
-                try:
-                    record = json.loads(line)
-                    processed_tasks.add(record["task_id"])
-                except json.JSONDecodeError:
-                    continue  # Skip any malformed lines
-
-    # Process tasks and update result file incrementally.
-    with open(result_file, 'a') as out_file:
-        for level in ["level1", "level2", "level3"]:
-            print(f"Processing {level}")
-            gaia = GAIALoader(level)
-            task_list = gaia.dataset[set_type]
-
-            task_list_len = len(task_list)
-            for task_idx, task in enumerate(task_list):
-                task_id = task.get("task_id")
-
-                if task_id in processed_tasks:
-                    print(f"\t({task_idx + 1}/{task_list_len}) "
-                          f"Skipping task {task_id} (already processed).")
-                    continue
-                print(f"\t({task_idx + 1}/{task_list_len}) "
-                      f"Processing task {task_id}")
-                log_dir = os.path.join('logs', f"{set_type}-{level}")
-                os.makedirs(log_dir, exist_ok=True)
-                log_path = os.path.join(log_dir, f"{task_id}.log")
-                output_path = os.path.join(log_dir, f"{task_id}.txt")
-                query = gaia.task2query(task, output_path)
+def run_task(config, router, gaia, task, level, log_dir):
+    """Run one task in its own log context and return its result record
+
+    A task is attempted up to config.attempts times; it is retried when the
+    run fails, writes no output file or gives no final answer, but not when
+    it times out. The status of the record is "ok", "error" or "timeout".
+    """
+    task_id = task.get("task_id")
+    log_path = os.path.join(log_dir, f"{task_id}.log")
+    output_path = os.path.join(log_dir, f"{task_id}.txt")
 
+    final_answer = ""
+    status = "error"
+    error = None
+    history = None
+    rate_limits = None
+    token_info = {"prompt_token_count": 0, "completion_token_count": 0}
+    attempt = 0
+    start_time = time.perf_counter()
+    with router.task(task_id, log_path):
+        query = gaia.task2query(task, output_path)
+        while attempt < config.attempts:
+            attempt += 1
+            if attempt > 1:
+                logging.info(f"Retrying task {task_id} for the {attempt - 1}th time "
+                             f"due to: {error}")
+            # An answer left by an earlier attempt or run must not be
+            # mistaken for one written by this attempt.
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            try:
+                result = call_agent(config, query, log_path)
+            except TaskTimeout as e:
+                # Not retried: another attempt would most likely hang too
+                status = "timeout"
+                error = str(e)
+                break
+            except Exception as e:
+                error = f"run failed: {e}"
+                continue
+            history = result["chat_history"]
+            rate_limits = result["rate_limits"]
+            # Tokens of every attempt count towards the cost of the task
+            for key in token_info:
+                token_info[key] += result["token_count"].get(key, 0)
+            if not os.path.exists(output_path):
+                error = "no output file generated"
+                continue
+            try:
+                final_answer = read_final_answer(output_path)
+            except Exception as e:
+                error = f"result extraction failed: {e}"
+                continue
+            if not final_answer:
                 final_answer = ""
-                start_time = time.perf_counter()
-                try:
-                    call_agent(query, log_path)
-                except Exception as e:
-                    print(f"Task {task_id} failed due to error {e}\n{traceback.format_exc()}")
-                else:
-                    try:
-                        final_answer = read_final_answer(output_path)
-                    except Exception as e:
-                        print(f"Result extraction for {task_id} failed due to error {e}\n{traceback.format_exc()}")
-
-                end_time = time.perf_counter()
-                duration = round(end_time - start_time, 3)
-
-                record = {"task_id": task_id, "model_answer": final_answer}
-                out_file.write(json.dumps(record) + "\n")
-                out_file.flush()
-
-                processed_tasks.add(task_id)
-                print(f"\tProcessed task {task_id} in {duration}s.")
+                error = "no final answer in the output file"
+                continue
+            status = "ok"
+            error = None
+            break
+
+    duration = round(time.perf_counter() - start_time, 3)
+    if error is not None:
+        print(f"\tTask {task_id} failed after {attempt} attempt(s): {error}")
+    return {
+        "task_id": task_id,
+        "model_answer": final_answer,
+        "level": level,
+        "duration": duration,
+        "attempts": attempt,
+        "token_info": token_info,
+        "status": status,
+        "error": error,
+        "rate_limits": rate_limits,
+        "history": history,
+    }
+
+
+class RunConfig:
+    """What to run and how: the society factory, the retry policy, the
+    concurrency and the dataset split"""
+
+    def __init__(self, module, tag=None, set_type="validation",
+                 levels=("level1", "level2", "level3"), workers=1, attempts=1,
+                 timeout=3600, memory_limit=None):
+        self.module = module
+        # Fail fast on a wrong module; tasks import it in their own process
+        importlib.import_module(module).construct_society
+        self.tag = tag or module.rsplit(".", 1)[-1]
+        self.set_type = set_type
+        self.levels = list(levels)
+        self.workers = workers
+        self.attempts = max(1, attempts)
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+
+    @property
+    def result_file(self):
+        return os.path.join("results", self.tag, f"gaia_{self.set_type}.jsonl")
+
+    @property
+    def log_root(self):
+        return os.path.join("logs", self.tag)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run OWL on the GAIA benchmark")
+    parser.add_argument("--module", default="examples.run_azure_openai",
+                        help="module providing construct_society(question)")
+    parser.add_argument("--tag", default=None,
+                        help="name of the results of this backend "
+                             "(default: the module name)")
+    parser.add_argument("--set-type", default="validation",
+                        choices=["validation", "test"])
+    parser.add_argument("--levels", default="level1,level2,level3",
+                        help="comma separated levels to run")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of tasks run concurrently")
+    parser.add_argument("--attempts", type=int, default=1,
+                        help="attempts per task before giving up")
+    parser.add_argument("--timeout", type=float, default=3600,
+                        help="wall-clock seconds per attempt, 0 for no limit")
+    parser.add_argument("--memory-limit", type=int, default=0,
+                        help="address space limit of each task process in MiB, "
+                             "0 for no limit")
+    return parser.parse_args()
+
+
+def past_durations(set_type):
+    """Result records of every earlier run of any backend, for their durations"""
+    records = []
+    for result_file in glob.glob(os.path.join("results", "*", f"gaia_{set_type}.jsonl")):
+        records.extend(read_results(result_file))
+    return records
+
+
+def run_benchmark(config):
+    result_file = config.result_file
+    # Results are appended one line per task, with the chat histories in a
+    # side file, and tasks that already have a result are skipped.
+    store = ResultStore(result_file)
+
+    gaia = GAIALoader("all")
+    levels = {int(level[len("level"):]) for level in config.levels}
+    tasks = [task for task in gaia.dataset[config.set_type]
+             if int(task["Level"]) in levels and task["task_id"] not in store]
+    print(f"[{config.tag}] {len(tasks)} tasks to run")
+
+    # Longest expected tasks first, spread over the workers, which steal
+    # from each other once their own queue is empty
+    cost_model = CostModel().fit(past_durations(config.set_type),
+                                 {task["task_id"]: task for task in tasks})
+    scheduler = WorkStealingScheduler(tasks, config.workers, cost_model.estimate)
+    print(f"[{config.tag}] Expected makespan: "
+          f"{scheduler.expected_makespan / 60:.1f} minutes")
+
+    os.makedirs(config.log_root, exist_ok=True)
+    for level in config.levels:
+        os.makedirs(os.path.join(config.log_root, f"{config.set_type}-{level}"),
+                    exist_ok=True)
+    router = TaskLogRouter(
+        os.path.join(config.log_root, f"{config.set_type}-main.log"))
+    router.start()
+
+    records = queue.Queue()
+
+    def worker(index):
+        while (task := scheduler.next(index)) is not None:
+            level = int(task["Level"])
+            log_dir = os.path.join(config.log_root,
+                                   f"{config.set_type}-level{level}")
+            try:
+                record = run_task(config, router, gaia, task, level, log_dir)
+            except Exception as e:
+                record = {"task_id": task["task_id"], "model_answer": "",
+                          "level": level, "error": f"runner failed: {e}"}
+            records.put(record)
+
+    workers = [threading.Thread(target=worker, args=(i,), daemon=True,
+                                name=f"gaia-worker-{i}")
+               for i in range(config.workers)]
+    for thread in workers:
+        thread.start()
+
+    # Results are only stored from this thread, so an interrupted run can
+    # always be resumed.
+    try:
+        for done in range(1, len(tasks) + 1):
+            record = records.get()
+            store.add(record)
+            print(f"\t({done}/{len(tasks)}) Processed level {record['level']} "
+                  f"task {record['task_id']} in {record.get('duration')}s.")
+        print(f"[{config.tag}] {scheduler.steals} tasks were stolen between workers")
+    finally:
+        router.stop()
+    return result_file
+
+
+def main():
+    args = parse_args()
+    config = RunConfig(
+        module=args.module,
+        tag=args.tag,
+        set_type=args.set_type,
+        levels=[level.strip() for level in args.levels.split(",") if level.strip()],
+        workers=args.workers,
+        attempts=args.attempts,
+        timeout=args.timeout,
+        memory_limit=args.memory_limit * 1024 * 1024 or None,
+    )
+    result_file = run_benchmark(config)
+    print(f"Results written to {result_file}; "
+          f"compare backends with: python report.py --tags {config.tag} ...")
+
 
 if __name__ == '__main__':
     main()
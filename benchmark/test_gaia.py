@@ -1,13 +1,20 @@
 import os
 import json
+import argparse
 from run_gaia import GAIALoader, read_final_answer
-from scorer import question_scorer
+from owl.utils.gaia_scoring import score_answer
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Score a GAIA run")
+    parser.add_argument("--tag", default="run_azure_openai",
+                        help="tag of the run, as given to run_gaia.py")
+    args = parser.parse_args()
+
     set_type = "validation"  # cannot be "test"
-    input_file = f"gaia_{set_type}.jsonl"
-    output_file = f"gaia_{set_type}_scored.jsonl"
+    result_dir = os.path.join("results", args.tag)
+    input_file = os.path.join(result_dir, f"gaia_{set_type}.jsonl")
+    output_file = os.path.join(result_dir, f"gaia_{set_type}_scored.jsonl")
     relax_mode = True
 
     existing_result = {}
@@ -30,7 +37,7 @@ def main():
 
         possible_result = {}
         if relax_mode:
-            possible_result_dir = os.path.join("logs", f"{set_type} - {level}")
+            possible_result_dir = os.path.join("logs", args.tag, f"{set_type}-{level}")
             if os.path.isdir(possible_result_dir):
                 for filename in os.listdir(possible_result_dir):
                     if filename.endswith(".txt"):
@@ -71,7 +78,7 @@ def main():
                 model_answer = existing_result[task_id]["model_answer"]
             else:
                 model_answer = possible_result[task_id]
-            correct = question_scorer(ground_truth, model_answer)
+            correct = score_answer(model_answer, ground_truth)
             level_all += 1
             if correct:
                 level_correct += 1
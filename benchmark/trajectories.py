@@ -0,0 +1,111 @@
+import os
+import json
+import argparse
+
+from run_gaia import GAIALoader
+from owl.utils.gaia_scoring import score_answer
+from owl.utils.result_store import ResultStore
+from owl.utils.trajectory import analyze_results
+
+
+def fmt(value, digits=1):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.{digits}f}"
+    return str(value)
+
+
+def print_report(report, limits, prompt_price, completion_price):
+    print(f"{len(report.trajectories)} trajectories"
+          + (f" ({report.estimated} with token counts estimated from "
+             f"message lengths)" if report.estimated else ""))
+
+    print("\nToken growth per round")
+    print("  round  runs  prompt tok  compl. tok")
+    for row in report.token_growth():
+        print(f"  {row['round']:>5}  {row['runs']:>4}  "
+              f"{fmt(row['prompt_tokens']):>10}  {fmt(row['completion_tokens']):>10}")
+
+    print("\nTool call latency (s)")
+    print(f"  {'tool':40}  calls  timed    p50    p90    max   total")
+    for name, stat in report.tool_latency().items():
+        print(f"  {name[:40]:40}  {stat['calls']:>5}  {stat['timed']:>5}  "
+              f"{fmt(stat['p50'], 2):>5}  {fmt(stat['p90'], 2):>5}  "
+              f"{fmt(stat['max'], 2):>5}  {fmt(stat['total'], 1):>6}")
+
+    rounds = report.rounds_to_answer()
+    print(f"\nRounds to answer: answer found in {rounds['answered']} runs, "
+          f"mean round {fmt(rounds['mean_answer_round'])}, "
+          f"mean rounds run {fmt(rounds['mean_rounds'])}")
+    print("  " + ", ".join(f"round {k}: {v}" for k, v in rounds["histogram"].items()))
+
+    wasted = report.wasted_rounds()
+    print(f"\nWasted rounds after the answer appeared: {wasted['rounds']} rounds "
+          f"in {wasted['runs']} runs, {wasted['tokens']} tokens")
+
+    cost = report.cost_per_correct(prompt_price, completion_price)
+    print(f"\nCost: {cost['total_tokens']} tokens for {cost['correct']} correct "
+          f"answers, {fmt(cost['tokens_per_correct'], 0)} tokens per correct answer"
+          + (f", {fmt(cost['cost_per_correct'], 4)} per correct answer"
+             if prompt_price or completion_price else ""))
+
+    print("\nEstimated effect of round_limit")
+    print("  limit  correct  accuracy      tokens")
+    for limit, row in report.round_limit_curve(limits).items():
+        print(f"  {limit:>5}  {row['correct']:>7}  {fmt(row['accuracy'], 3):>8}  "
+              f"{row['tokens']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Analyse the recorded trajectories of a GAIA run offline")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--tag", help="tag of a run of run_gaia.py")
+    source.add_argument("--file", help="result file of GAIABenchmark.run")
+    parser.add_argument("--set-type", default="validation",
+                        choices=["validation", "test"])
+    parser.add_argument("--limits", default="5,10,15,20",
+                        help="comma separated round limits to evaluate")
+    parser.add_argument("--prompt-price", type=float, default=0.0,
+                        help="price of a million prompt tokens")
+    parser.add_argument("--completion-price", type=float, default=0.0,
+                        help="price of a million completion tokens")
+    parser.add_argument("--output", default=None,
+                        help="also write the statistics to this JSON file")
+    args = parser.parse_args()
+
+    result_file = args.file or os.path.join(
+        "results", args.tag, f"gaia_{args.set_type}.jsonl")
+    store = ResultStore(result_file)
+    records = store.records()
+    if any("score" not in record for record in records):
+        # Runs of run_gaia.py are scored against the local dataset index
+        tasks = {task["task_id"]: task
+                 for task in GAIALoader("all").dataset[args.set_type]}
+        for record in records:
+            task = tasks.get(record["task_id"])
+            if "score" not in record and task is not None:
+                answer = record.get("model_answer")
+                record["score"] = bool(answer) and score_answer(
+                    answer, task["Final answer"])
+
+    report = analyze_results(records, store.history)
+    limits = [int(limit) for limit in args.limits.split(",") if limit.strip()]
+    print_report(report, limits, args.prompt_price, args.completion_price)
+
+    if args.output:
+        with open(args.output, "w") as fout:
+            json.dump({
+                "token_growth": report.token_growth(),
+                "tool_latency": report.tool_latency(),
+                "rounds_to_answer": report.rounds_to_answer(),
+                "wasted_rounds": report.wasted_rounds(),
+                "cost": report.cost_per_correct(args.prompt_price,
+                                                args.completion_price),
+                "round_limit": report.round_limit_curve(limits),
+            }, fout, indent=4)
+
+
+if __name__ == '__main__':
+    main()
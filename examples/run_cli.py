@@ -27,7 +27,7 @@ from camel.types import ModelPlatformType, ModelType
 from camel.societies import RolePlaying
 from camel.logger import set_log_level
 
-from owl.utils import run_society, DocumentProcessingToolkit
+from owl.utils import run_society, DocumentProcessingToolkit, install_rate_limits
 
 import pathlib
 
@@ -38,6 +38,7 @@ set_log_level(level="DEBUG")
 base_dir = pathlib.Path(__file__).parent.parent
 env_path = base_dir / "owl" / ".env"
 load_dotenv(dotenv_path=str(env_path))
+install_rate_limits()
 
 
 def get_user_input(prompt):
@@ -32,7 +32,7 @@ from camel.toolkits import (
 from camel.types import ModelPlatformType, ModelType
 from camel.configs import ChatGPTConfig
 
-from owl.utils import GAIABenchmark
+from owl.utils import GAIABenchmark, install_rate_limits
 from camel.logger import set_log_level
 
 import pathlib
@@ -40,6 +40,7 @@ import pathlib
 base_dir = pathlib.Path(__file__).parent.parent
 env_path = base_dir / "owl" / ".env"
 load_dotenv(dotenv_path=str(env_path))
+install_rate_limits()
 
 set_log_level(level="DEBUG")
 
@@ -116,7 +117,7 @@ def main():
     assistant_agent_kwargs = {"model": models["assistant"], "tools": tools}
 
     # Initialize benchmark
-    benchmark = GAIABenchmark(data_dir="data/gaia", save_to="results/result.json")
+    benchmark = GAIABenchmark(data_dir="data/gaia", save_to="results/result.jsonl")
 
     # Print benchmark information
     print(f"Number of validation examples: {len(benchmark.valid)}")
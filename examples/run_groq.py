@@ -42,9 +42,15 @@ from camel.toolkits import (
 from camel.types import ModelPlatformType, ModelType
 from camel.logger import set_log_level
 
-from owl.utils import OwlRolePlaying, run_society, DocumentProcessingToolkit
+from owl.utils import (
+    OwlRolePlaying,
+    run_society,
+    DocumentProcessingToolkit,
+    install_rate_limits,
+)
 
 load_dotenv()
+install_rate_limits()
 
 set_log_level(level="DEBUG")
 
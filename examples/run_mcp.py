@@ -86,12 +86,14 @@ from camel.logger import set_log_level
 from camel.toolkits import MCPToolkit
 
 from owl.utils.enhanced_role_playing import OwlRolePlaying, arun_society
+from owl.utils import install_rate_limits
 
 import pathlib
 
 base_dir = pathlib.Path(__file__).parent.parent
 env_path = base_dir / "owl" / ".env"
 load_dotenv(dotenv_path=str(env_path))
+install_rate_limits()
 
 set_log_level(level="DEBUG")
 
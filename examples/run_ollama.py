@@ -26,7 +26,7 @@ from camel.toolkits import (
 )
 from camel.types import ModelPlatformType
 
-from owl.utils import run_society
+from owl.utils import run_society, install_rate_limits
 
 from camel.societies import RolePlaying
 
@@ -37,6 +37,7 @@ import pathlib
 base_dir = pathlib.Path(__file__).parent.parent
 env_path = base_dir / "owl" / ".env"
 load_dotenv(dotenv_path=str(env_path))
+install_rate_limits()
 
 set_log_level(level="DEBUG")
 
@@ -31,7 +31,7 @@ from camel.types import ModelPlatformType, ModelType
 from camel.societies import RolePlaying
 from camel.logger import set_log_level
 
-from owl.utils import run_society
+from owl.utils import run_society, install_rate_limits
 
 import pathlib
 
@@ -40,6 +40,7 @@ set_log_level(level="DEBUG")
 base_dir = pathlib.Path(__file__).parent.parent
 env_path = base_dir / "owl" / ".env"
 load_dotenv(dotenv_path=str(env_path))
+install_rate_limits()
 
 
 def construct_society(question: str) -> RolePlaying:
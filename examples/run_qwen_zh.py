@@ -31,7 +31,7 @@ from camel.toolkits import (
 from camel.types import ModelPlatformType, ModelType
 from camel.societies import RolePlaying
 
-from owl.utils import run_society, DocumentProcessingToolkit
+from owl.utils import run_society, DocumentProcessingToolkit, install_rate_limits
 
 from camel.logger import set_log_level
 
@@ -41,6 +41,7 @@ import pathlib
 base_dir = pathlib.Path(__file__).parent.parent
 env_path = base_dir / "owl" / ".env"
 load_dotenv(dotenv_path=str(env_path))
+install_rate_limits()
 
 set_log_level(level="DEBUG")
 
@@ -24,7 +24,7 @@ from camel.toolkits import (
 from camel.types import ModelPlatformType, ModelType
 from camel.logger import set_log_level
 
-from owl.utils import run_society
+from owl.utils import run_society, install_rate_limits
 from camel.societies import RolePlaying
 
 import pathlib
@@ -32,6 +32,7 @@ import pathlib
 base_dir = pathlib.Path(__file__).parent.parent
 env_path = base_dir / "owl" / ".env"
 load_dotenv(dotenv_path=str(env_path))
+install_rate_limits()
 
 set_log_level(level="DEBUG")
 
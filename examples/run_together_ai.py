@@ -26,11 +26,12 @@ from camel.types import ModelPlatformType, ModelType
 from camel.logger import set_log_level
 from camel.societies import RolePlaying
 
-from owl.utils import run_society, DocumentProcessingToolkit
+from owl.utils import run_society, DocumentProcessingToolkit, install_rate_limits
 
 base_dir = pathlib.Path(__file__).parent.parent
 env_path = base_dir / "owl" / ".env"
 load_dotenv(dotenv_path=str(env_path))
+install_rate_limits()
 
 set_log_level(level="DEBUG")
 
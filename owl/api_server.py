@@ -0,0 +1,346 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+"""Headless HTTP API for running OWL societies.
+
+Endpoints:
+    POST   /tasks              Submit a question with an example module
+    GET    /tasks/{id}         Status, queue position and result of a task
+    GET    /tasks/{id}/events  Server-sent events of a task (messages, tokens,
+                               status changes), replaying earlier messages
+    DELETE /tasks/{id}         Cancel a waiting or running task
+    GET    /runs?q=...         Full-text search over past runs
+    GET    /health             Number of running and waiting tasks, and the
+                               saturation of the provider rate limits
+
+Start with ``python owl/api_server.py``; the address, the module allowlist
+and the pool size are configured with OWL_API_HOST, OWL_API_PORT,
+OWL_API_MODULES, OWL_API_MAX_WORKERS and OWL_API_MAX_QUEUE. Runs are saved
+to the run history (OWL_RUN_HISTORY) and repeated questions are answered
+from it when OWL_REUSE_ANSWERS is set. Provider quotas shared by all the
+running societies are set with OWL_RATE_LIMITS (see utils/rate_limit.py).
+"""
+
+# Import from the correct module path
+from utils import arun_society
+from utils.conversation import ConversationStore
+from utils.events import EVENT_BUS
+from utils.jobs import JobManager, QueueFullError, FINISHED
+from utils.rate_limit import install_rate_limits
+from utils.run_history import ReusePolicy, RunHistory
+from utils.streaming import enable_streaming
+from utils.warm_pool import ModelClientCache, SocietyFactoryPool
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Any, Dict, Optional
+
+from dotenv import find_dotenv, load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+os.environ["PYTHONIOENCODING"] = "utf-8"
+load_dotenv(find_dotenv(), override=True)
+
+logger = logging.getLogger("owl.api_server")
+
+DEFAULT_MODULES = [
+    "run",
+    "run_mini",
+    "run_gemini",
+    "run_claude",
+    "run_deepseek_zh",
+    "run_mistral",
+    "run_openai_compatible_model",
+    "run_ollama",
+    "run_qwen_mini_zh",
+    "run_qwen_zh",
+    "run_azure_openai",
+    "run_groq",
+    "run_ppio",
+    "run_together_ai",
+    "run_novita_ai",
+]
+MODULES = [
+    name.strip()
+    for name in os.environ.get("OWL_API_MODULES", ",".join(DEFAULT_MODULES)).split(",")
+    if name.strip()
+]
+
+RATE_LIMITER = install_rate_limits()
+SOCIETY_POOL = SocietyFactoryPool(MODULES, model_cache=ModelClientCache())
+JOB_MANAGER = JobManager(
+    max_workers=int(os.environ.get("OWL_API_MAX_WORKERS", "4")),
+    max_queue=int(os.environ.get("OWL_API_MAX_QUEUE", "64")),
+    bus=EVENT_BUS,
+)
+
+RUN_HISTORY = RunHistory(
+    os.environ.get(
+        "OWL_RUN_HISTORY", os.path.join(os.path.dirname(__file__), "run_history.db")
+    )
+)
+REUSE_POLICY = ReusePolicy.from_env()
+
+# Seconds between keep-alive comments on idle event streams
+KEEPALIVE_INTERVAL = 15
+
+
+class TaskRequest(BaseModel):
+    question: str
+    module: str = "run"
+    round_limit: int = 15
+    stream: bool = False
+
+
+def run_task(
+    question: str,
+    module_name: str,
+    conversation: ConversationStore,
+    round_limit: int = 15,
+    stream: bool = False,
+) -> Dict[str, Any]:
+    """Build a society and run it to completion on the current worker
+
+    The society runs on its own event loop, so tools that block do not stall
+    the server. The job's session and cancel token are inherited from the
+    worker's context.
+
+    Args:
+        question: User question
+        module_name: Example module providing construct_society
+        conversation: Store receiving the messages of every round
+        round_limit: Maximum number of rounds
+        stream: Whether to publish "token" events while responses are generated
+
+    Returns:
+        dict: Answer, token usage and the id of the run it was reused from
+    """
+    reused = RUN_HISTORY.find_reusable(question, module_name, REUSE_POLICY)
+    if reused is not None:
+        for round_idx, record in enumerate(reused.chat_history):
+            conversation.add_round(round_idx, record)
+        RUN_HISTORY.record(
+            question,
+            module_name,
+            reused.answer,
+            run_id=conversation.session_id,
+            reused_from=reused.run_id,
+        )
+        return {
+            "answer": reused.answer,
+            "token_info": {"completion_token_count": 0, "prompt_token_count": 0},
+            "reused_from": reused.run_id,
+        }
+
+    society = SOCIETY_POOL.construct_society(module_name, question)
+    if stream:
+        enable_streaming(
+            society,
+            lambda role, delta: EVENT_BUS.publish("token", role=role, delta=delta),
+        )
+    answer, chat_history, token_info = asyncio.run(
+        arun_society(
+            society,
+            round_limit=round_limit,
+            round_callback=conversation.add_round,
+        )
+    )
+    RUN_HISTORY.record(
+        question,
+        module_name,
+        answer,
+        chat_history,
+        token_info,
+        run_id=conversation.session_id,
+    )
+    return {"answer": answer, "token_info": token_info, "reused_from": None}
+
+
+def task_summary(job) -> Dict[str, Any]:
+    """Describe a job as returned by the status endpoint"""
+    summary = {
+        "task_id": job.id,
+        "status": job.status,
+        "position": JOB_MANAGER.position(job.id),
+        "submitted_at": job.submitted_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "messages": len(job.context),
+    }
+    if job.status == FINISHED:
+        summary.update(job.result)
+    if job.error is not None:
+        summary["error"] = str(job.error)
+    return summary
+
+
+def sse(event: str, data: Any) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+app = FastAPI(title="OWL API")
+
+
+@app.on_event("startup")
+async def preload_modules():
+    SOCIETY_POOL.preload(
+        warm_up=os.environ.get("OWL_API_WARM_UP", "true").lower() == "true"
+    )
+
+
+@app.on_event("shutdown")
+async def cancel_tasks():
+    JOB_MANAGER.shutdown()
+
+
+@app.post("/tasks", status_code=202)
+async def submit_task(request: TaskRequest):
+    if not request.question.strip():
+        raise HTTPException(status_code=400, detail="Question must not be empty")
+    if request.module not in MODULES:
+        raise HTTPException(
+            status_code=400, detail=f"Module '{request.module}' is not supported"
+        )
+
+    conversation = ConversationStore(uuid.uuid4().hex, EVENT_BUS)
+    try:
+        job = JOB_MANAGER.submit(
+            run_task,
+            request.question,
+            request.module,
+            conversation,
+            request.round_limit,
+            request.stream,
+            job_id=conversation.session_id,
+            context=conversation,
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    logger.info(f"Task {job.id} submitted with module {request.module}")
+    return task_summary(job)
+
+
+@app.get("/tasks/{task_id}")
+async def get_task(task_id: str):
+    job = JOB_MANAGER.get(task_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task_summary(job)
+
+
+@app.delete("/tasks/{task_id}")
+async def cancel_task(task_id: str):
+    job = JOB_MANAGER.get(task_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    cancelled = JOB_MANAGER.cancel(task_id)
+    return {"task_id": task_id, "cancelled": cancelled, "status": job.status}
+
+
+@app.get("/tasks/{task_id}/events")
+async def stream_task_events(task_id: str):
+    job = JOB_MANAGER.get(task_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    conversation: ConversationStore = job.context
+
+    async def events():
+        # Subscribe before replaying, so that nothing published in between
+        # is lost; messages are sent by index and never twice.
+        subscription = EVENT_BUS.subscribe(task_id)
+        cursor = 0
+        try:
+            status: Optional[str] = job.status
+            yield sse(
+                "status", {"status": status, "position": JOB_MANAGER.position(task_id)}
+            )
+            while True:
+                for message in conversation.since(cursor):
+                    yield sse("message", message)
+                cursor = len(conversation)
+                if job.done.is_set():
+                    break
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.aget(), timeout=KEEPALIVE_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                if event.type == "queued":
+                    yield sse("status", {"status": "queued", **event.data})
+                elif event.type == "started":
+                    yield sse("status", {"status": "running"})
+                elif event.type == "token":
+                    yield sse("token", event.data)
+            yield sse("done", task_summary(job))
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/runs")
+async def search_runs(q: str = "", module: Optional[str] = None, limit: int = 20):
+    runs = RUN_HISTORY.search(q, limit=min(limit, 100), module=module)
+    return [
+        {
+            "run_id": run.run_id,
+            "question": run.question,
+            "module": run.module,
+            "answer": run.answer,
+            "rounds": run.rounds,
+            "token_info": run.token_info,
+            "reused_from": run.reused_from,
+            "created_at": run.created_at,
+            "snippet": run.snippet,
+        }
+        for run in runs
+    ]
+
+
+@app.get("/health")
+async def health():
+    stats = {"status": "ok", **JOB_MANAGER.stats()}
+    if RATE_LIMITER is not None:
+        stats["rate_limits"] = RATE_LIMITER.metrics()
+    return stats
+
+
+def main():
+    import uvicorn
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    uvicorn.run(
+        app,
+        host=os.environ.get("OWL_API_HOST", "127.0.0.1"),
+        port=int(os.environ.get("OWL_API_PORT", "8000")),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -19,8 +19,10 @@ from .enhanced_role_playing import (
     run_society,
     arun_society,
 )
+from .cancellation import CancelToken, SocietyCancelled, cancel_scope
 from .gaia import GAIABenchmark
 from .document_toolkit import DocumentProcessingToolkit
+from .rate_limit import RateLimit, RateLimiter, install_rate_limits
 
 __all__ = [
     "extract_pattern",
@@ -28,6 +30,12 @@ __all__ = [
     "OwlGAIARolePlaying",
     "run_society",
     "arun_society",
+    "CancelToken",
+    "SocietyCancelled",
+    "cancel_scope",
     "GAIABenchmark",
     "DocumentProcessingToolkit",
+    "RateLimit",
+    "RateLimiter",
+    "install_rate_limits",
 ]
@@ -0,0 +1,250 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""Cooperative cancellation of society runs.
+
+A :class:`CancelToken` is checked by :func:`run_society` between rounds and
+by the agents' tools before and after every call. Child processes started
+by those tools (code execution sandboxes, terminal commands, the browser
+driver) are registered with the token and killed when it is cancelled.
+"""
+
+import contextvars
+import functools
+import inspect
+import subprocess
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from camel.logger import get_logger
+
+logger = get_logger(__name__)
+
+_current_token: contextvars.ContextVar[Optional["CancelToken"]] = (
+    contextvars.ContextVar("owl_cancel_token", default=None)
+)
+# The token of the guarded tool call in progress, if any
+_tool_token: contextvars.ContextVar[Optional["CancelToken"]] = contextvars.ContextVar(
+    "owl_tool_cancel_token", default=None
+)
+
+
+class SocietyCancelled(BaseException):
+    r"""Raised inside a society run once its token has been cancelled.
+
+    Like :class:`asyncio.CancelledError`, it derives from
+    :class:`BaseException` so that the ``except Exception`` clauses wrapping
+    tool and model calls do not swallow it.
+    """
+
+
+class CancelToken:
+    r"""A flag shared between a society run and whoever may stop it."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self._processes: List[Tuple[subprocess.Popen, Callable[[], None]]] = []
+        self.reason = ""
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "Cancelled") -> None:
+        r"""Request cancellation and run the registered callbacks, e.g. to
+        kill child processes. Later calls have no effect."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        logger.info(f"Cancellation requested: {reason}")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Cancellation callback failed: {e}")
+
+    def raise_if_cancelled(self) -> None:
+        r"""Raise :class:`SocietyCancelled` if cancellation was requested."""
+        if self._event.is_set():
+            raise SocietyCancelled(self.reason)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        r"""Block until cancellation is requested or ``timeout`` expires."""
+        return self._event.wait(timeout)
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        r"""Run ``callback`` on cancellation, immediately if the token is
+        already cancelled."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def track_process(self, process: subprocess.Popen) -> None:
+        r"""Kill ``process`` and its descendants when cancelled, unless it
+        has exited by then."""
+        import psutil
+
+        try:
+            # Taken now: psutil checks that the pid still belongs to this
+            # process before signalling it.
+            handle = psutil.Process(process.pid)
+        except psutil.NoSuchProcess:
+            return
+
+        def kill() -> None:
+            # An exited child may have been reaped and its pid reused.
+            if process.poll() is None:
+                _kill_tree(handle)
+
+        self.forget_exited()
+        with self._lock:
+            self._processes.append((process, kill))
+        self.add_callback(kill)
+
+    def forget_exited(self) -> None:
+        r"""Drop the callbacks of tracked processes that have exited."""
+        with self._lock:
+            running = []
+            for process, kill in self._processes:
+                if process.poll() is None:
+                    running.append((process, kill))
+                elif kill in self._callbacks:
+                    self._callbacks.remove(kill)
+            self._processes = running
+
+
+def _kill_tree(parent: Any) -> None:
+    import psutil
+
+    try:
+        processes = parent.children(recursive=True) + [parent]
+    except psutil.NoSuchProcess:
+        return
+    # Not reaped here, so that the owner of the process still gets its
+    # exit status.
+    for process in processes:
+        try:
+            process.kill()
+        except psutil.NoSuchProcess:
+            pass
+
+
+def kill_process_tree(pid: int) -> None:
+    r"""Kill a process and all of its descendants, ignoring those that have
+    already exited."""
+    import psutil
+
+    try:
+        parent = psutil.Process(pid)
+    except psutil.NoSuchProcess:
+        return
+    _kill_tree(parent)
+
+
+@contextmanager
+def cancel_scope(token: Optional[CancelToken]) -> Iterator[None]:
+    r"""Make ``token`` the active token of the current context, so that
+    :func:`run_society` picks it up."""
+    reset = _current_token.set(token)
+    try:
+        yield
+    finally:
+        _current_token.reset(reset)
+
+
+def current_cancel_token() -> Optional[CancelToken]:
+    r"""Return the token bound with :func:`cancel_scope`, if any."""
+    return _current_token.get()
+
+
+_tracking_lock = threading.Lock()
+_tracking_installed = False
+
+
+def install_process_tracking() -> None:
+    r"""Register the :class:`subprocess.Popen` objects created by guarded
+    tool calls with the token of the call. Installed once per process, the
+    first time the tools of a society are guarded; other subprocesses of
+    the process are left alone."""
+    global _tracking_installed
+    with _tracking_lock:
+        if _tracking_installed:
+            return
+        original_init = subprocess.Popen.__init__
+
+        @functools.wraps(original_init)
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            original_init(self, *args, **kwargs)
+            token = _tool_token.get()
+            if token is not None:
+                token.track_process(self)
+
+        subprocess.Popen.__init__ = __init__  # type: ignore[method-assign]
+        _tracking_installed = True
+
+
+def guard_tool(func: Callable[..., Any], token: CancelToken) -> Callable[..., Any]:
+    r"""Wrap a tool function so that it checks ``token`` before and after
+    every call, and registers the processes it starts with ``token``."""
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            token.raise_if_cancelled()
+            reset = _tool_token.set(token)
+            try:
+                result = await func(*args, **kwargs)
+            finally:
+                _tool_token.reset(reset)
+                token.forget_exited()
+            token.raise_if_cancelled()
+            return result
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        token.raise_if_cancelled()
+        reset = _tool_token.set(token)
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            _tool_token.reset(reset)
+            token.forget_exited()
+        token.raise_if_cancelled()
+        return result
+
+    return wrapper
+
+
+def guard_society_tools(society: Any, token: CancelToken) -> None:
+    r"""Guard the tools of the user and assistant agents of a society."""
+    install_process_tracking()
+    for agent in (society.user_agent, society.assistant_agent):
+        for tool in getattr(agent, "_internal_tools", {}).values():
+            if not getattr(tool.func, "__owl_cancel_guard__", False):
+                tool.func = guard_tool(tool.func, token)
+                tool.func.__owl_cancel_guard__ = True
@@ -0,0 +1,103 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .events import EventBus
+
+
+class ConversationStore:
+    r"""Append-only store of the messages exchanged during one society run.
+
+    The society writes to it through :meth:`add_round`, which can be passed
+    directly as the ``round_callback`` of :func:`run_society`. Readers keep
+    a cursor and fetch only the messages added since their last read with
+    :meth:`since`.
+
+    Args:
+        session_id (str, optional): The run the messages belong to.
+            (default: :obj:`None`)
+        bus (EventBus, optional): When given, a ``"message"`` event is
+            published to the run's session for every appended message.
+            (default: :obj:`None`)
+    """
+
+    def __init__(
+        self,
+        session_id: Optional[str] = None,
+        bus: Optional[EventBus] = None,
+    ):
+        self.session_id = session_id
+        self.bus = bus
+        self._messages: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def append(
+        self,
+        role: str,
+        content: str,
+        round_idx: Optional[int] = None,
+        tool_calls: Optional[List[dict]] = None,
+    ) -> Dict[str, Any]:
+        r"""Append one message and return it.
+
+        Args:
+            role (str): ``"user"`` or ``"assistant"``.
+            content (str): The content of the message.
+            round_idx (int, optional): The society round of the message.
+                (default: :obj:`None`)
+            tool_calls (List[dict], optional): The tool calls made while
+                producing the message. (default: :obj:`None`)
+
+        Returns:
+            Dict[str, Any]: The stored message, including its index.
+        """
+        with self._lock:
+            message = {
+                "index": len(self._messages),
+                "role": role,
+                "content": content,
+                "round": round_idx,
+                "tool_calls": tool_calls or [],
+                "timestamp": time.time(),
+            }
+            self._messages.append(message)
+        if self.bus is not None:
+            self.bus.publish(
+                "message", session_id=self.session_id, index=message["index"]
+            )
+        return message
+
+    def add_round(self, round_idx: int, record: dict) -> None:
+        r"""Store the user and assistant messages of a society round, as
+        recorded in the chat history by :func:`run_society`."""
+        if record.get("user"):
+            self.append("user", record["user"], round_idx)
+        if record.get("assistant") or record.get("tool_calls"):
+            self.append(
+                "assistant",
+                record.get("assistant", ""),
+                round_idx,
+                record.get("tool_calls"),
+            )
+
+    def since(self, index: int = 0) -> List[Dict[str, Any]]:
+        r"""Return the messages whose index is at least ``index``."""
+        with self._lock:
+            return self._messages[index:]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._messages)
@@ -20,9 +20,18 @@ from camel.utils import retry_on_error
 from camel.logger import get_logger
 from camel.models import BaseModelBackend
 from chunkr_ai import Chunkr
+from .image_cache import CaptionCache, preprocess_image
+from .spreadsheet import profile_spreadsheet
+from .web_extraction import extract_webpage_locally
+from .structured_data import (
+    detect_format,
+    query_structured_file,
+    summarize_structured_file,
+)
 import requests
 import mimetypes
 import json
+import asyncio
 from typing import List, Optional, Tuple, Literal
 from urllib.parse import urlparse
 import os
@@ -35,6 +44,10 @@ nest_asyncio.apply()
 
 logger = get_logger(__name__)
 
+# Documents sent to Chunkr in batches by extract_documents_content
+CHUNKR_EXTENSIONS = (".pdf", ".docx", ".doc", ".pptx", ".ppt")
+CHUNKR_ERROR_PREFIX = "Error while processing document"
+
 
 class DocumentProcessingToolkit(BaseToolkit):
     r"""A class representing a toolkit for processing document and return the content of the document.
@@ -43,9 +56,30 @@ class DocumentProcessingToolkit(BaseToolkit):
     """
 
     def __init__(
-        self, cache_dir: Optional[str] = None, model: Optional[BaseModelBackend] = None
+        self,
+        cache_dir: Optional[str] = None,
+        model: Optional[BaseModelBackend] = None,
+        max_inline_size: int = 100 * 1024,
+        image_max_side: int = 1024,
     ):
+        r"""Initialize the toolkit.
+
+        Args:
+            cache_dir (str, optional): The directory for downloaded and
+                extracted files. (default: :obj:`"tmp/"`)
+            model (BaseModelBackend, optional): The model used for image
+                analysis. (default: :obj:`None`)
+            max_inline_size (int, optional): JSON, JSONL and XML files larger
+                than this many bytes are returned as a streamed structural
+                summary instead of their full content. (default: :obj:`102400`)
+            image_max_side (int, optional): Images are downscaled so that
+                their longest side is at most this many pixels before being
+                sent to the vision model. (default: :obj:`1024`)
+        """
+        self.max_inline_size = max_inline_size
+        self.image_max_side = image_max_side
         self.image_tool = ImageAnalysisToolkit(model=model)
+        self.image_model_name = str(model.model_type) if model else ""
         # self.audio_tool = AudioAnalysisToolkit()
         self.excel_tool = ExcelToolkit()
 
@@ -54,6 +88,9 @@ class DocumentProcessingToolkit(BaseToolkit):
             self.cache_dir = cache_dir
 
         self.uio = UnstructuredIO()
+        self.caption_cache = CaptionCache(
+            os.path.join(self.cache_dir, "image_captions.jsonl")
+        )
 
     @retry_on_error()
     def extract_document_content(self, document_path: str) -> Tuple[bool, str]:
@@ -72,7 +109,7 @@ class DocumentProcessingToolkit(BaseToolkit):
         )
 
         if any(document_path.endswith(ext) for ext in [".jpg", ".jpeg", ".png"]):
-            res = self.image_tool.ask_question_about_image(
+            res = self._ask_question_about_image(
                 document_path, "Please make a detailed caption about the image."
             )
             return True, res
@@ -82,6 +119,13 @@ class DocumentProcessingToolkit(BaseToolkit):
         #     return True, res
 
         if any(document_path.endswith(ext) for ext in ["xls", "xlsx"]):
+            try:
+                return True, self._profile_spreadsheet(document_path)
+            except Exception as e:
+                logger.warning(
+                    f"Spreadsheet profiling failed for {document_path}: {e}, "
+                    f"falling back to full extraction."
+                )
             res = self.excel_tool.extract_excel_content(document_path)
             return True, res
 
@@ -90,8 +134,14 @@ class DocumentProcessingToolkit(BaseToolkit):
             return True, f"The extracted files are: {extracted_files}"
 
         if any(document_path.endswith(ext) for ext in ["json", "jsonl", "jsonld"]):
+            if self._is_large_structured_file(document_path):
+                return True, self._summarize_structured_file(document_path)
+
             with open(document_path, "r", encoding="utf-8") as f:
-                content = json.load(f)
+                if document_path.endswith("jsonl"):
+                    content = [json.loads(line) for line in f if line.strip()]
+                else:
+                    content = json.load(f)
             f.close()
             return True, content
 
@@ -102,6 +152,9 @@ class DocumentProcessingToolkit(BaseToolkit):
             return True, content
 
         if any(document_path.endswith(ext) for ext in ["xml"]):
+            if self._is_large_structured_file(document_path):
+                return True, self._summarize_structured_file(document_path)
+
             data = None
             with open(document_path, "r", encoding="utf-8") as f:
                 content = f.read()
@@ -148,6 +201,157 @@ class DocumentProcessingToolkit(BaseToolkit):
                 logger.error(traceback.format_exc())
                 return False, f"Error occurred while processing document: {e}"
 
+    def extract_documents_content(
+        self, document_paths: List[str]
+    ) -> List[Tuple[bool, str]]:
+        r"""Extract the content of several documents (or urls) at once. Use it
+        instead of repeated calls to `extract_document_content` when many
+        documents, such as a folder of PDFs, are needed.
+
+        Args:
+            document_paths (List[str]): The paths of the documents to be processed, either local paths or URLs.
+
+        Returns:
+            List[Tuple[bool, str]]: For each document, in order, whether it was processed successfully and its content (if success).
+        """
+        results: List[Optional[Tuple[bool, str]]] = [None] * len(document_paths)
+        batch = [
+            idx
+            for idx, path in enumerate(document_paths)
+            if path.lower().endswith(CHUNKR_EXTENSIONS) and os.path.exists(path)
+        ]
+        if batch and os.getenv("CHUNKR_API_KEY"):
+            try:
+                contents = asyncio.run(
+                    self._extract_contents_with_chunkr(
+                        [document_paths[idx] for idx in batch]
+                    )
+                )
+            except Exception as e:
+                logger.warning(f"Batched Chunkr extraction failed: {e}")
+                contents = []
+            for idx, content in zip(batch, contents):
+                # Documents Chunkr failed on are extracted one by one below.
+                if not content.startswith(CHUNKR_ERROR_PREFIX):
+                    results[idx] = (True, content)
+
+        for idx, path in enumerate(document_paths):
+            if results[idx] is None:
+                try:
+                    results[idx] = self.extract_document_content(path)
+                except Exception as e:
+                    results[idx] = (
+                        False,
+                        f"Error occurred while processing document: {e}",
+                    )
+        return results
+
+    def query_structured_document(
+        self,
+        document_path: str,
+        record_path: str,
+        filter_expression: Optional[str] = None,
+        limit: int = 20,
+    ) -> Tuple[bool, str]:
+        r"""Query records from a local JSON, JSONL or XML file without loading the whole file. Use it after `extract_document_content` returned a structural summary of a large file.
+
+        Args:
+            document_path (str): The local path of the JSON, JSONL or XML file.
+            record_path (str): The path of the records to return, as listed in the summary. For JSON, keys are joined with `.` and `item` means every array element, e.g. `data.item` or `data.item.author`. JSONL records are under `item`. For XML, tags are joined with `/`, e.g. `catalog/book`.
+            filter_expression (str, optional): A condition on each record, in the form `<field> <op> <value>` with op one of `==`, `!=`, `>`, `>=`, `<`, `<=`, `~` (case-insensitive substring), e.g. `price > 10` or `author.name == "Ann"`. XML attributes are `@name`, XML text is `#text`.
+            limit (int, optional): The maximum number of records to return. (default: :obj:`20`)
+
+        Returns:
+            Tuple[bool, str]: A tuple containing a boolean indicating whether the query succeeded, and the matching records as JSON (if success).
+        """
+        logger.debug(
+            f"Calling query_structured_document function with document_path=`{document_path}`, record_path=`{record_path}`, filter_expression=`{filter_expression}`"
+        )
+        if detect_format(document_path) is None:
+            return False, "Only JSON, JSONL and XML files can be queried."
+        try:
+            records = query_structured_file(
+                document_path, record_path, filter_expression, limit
+            )
+        except Exception as e:
+            logger.error(traceback.format_exc())
+            return False, f"Error occurred while querying document: {e}"
+        return True, json.dumps(records, ensure_ascii=False, default=str)
+
+    def _is_large_structured_file(self, document_path: str) -> bool:
+        return (
+            detect_format(document_path) is not None
+            and os.path.isfile(document_path)
+            and os.path.getsize(document_path) > self.max_inline_size
+        )
+
+    def _summarize_structured_file(self, document_path: str) -> str:
+        r"""Stream a large structured file into a summary of its shape, record
+        count and a few sample records."""
+        summary = summarize_structured_file(document_path)
+        size = os.path.getsize(document_path)
+        return (
+            f"The document is too large to return in full ({size} bytes). "
+            f"Here is a summary of its structure, record count and sample "
+            f"records. Use `query_structured_document` with a `record_path` "
+            f"from the schema below to retrieve specific records.\n"
+            f"{json.dumps(summary, ensure_ascii=False, default=str)}"
+        )
+
+    def _ask_question_about_image(self, image_path: str, question: str) -> str:
+        r"""Ask the vision model about a downscaled copy of the image, reusing
+        the cached answer for the same question about the same image."""
+        try:
+            local_path = image_path
+            if urlparse(image_path).scheme in ("http", "https"):
+                os.makedirs(self.cache_dir, exist_ok=True)
+                local_path = self._download_file(image_path)
+            model_input, digest = preprocess_image(
+                local_path,
+                os.path.join(self.cache_dir, "images"),
+                max_side=self.image_max_side,
+            )
+        except Exception as e:
+            logger.warning(f"Image preprocessing failed for {image_path}: {e}")
+            return self.image_tool.ask_question_about_image(image_path, question)
+
+        cached = self.caption_cache.get(digest, question, self.image_model_name)
+        if cached is not None:
+            logger.debug(f"Using cached answer for image {image_path}")
+            return cached
+
+        res = self.image_tool.ask_question_about_image(model_input, question)
+        if not res.startswith(("Image error:", "Analysis failed:")):
+            self.caption_cache.put(digest, question, res, self.image_model_name)
+        return res
+
+    def _profile_spreadsheet(self, document_path: str) -> str:
+        r"""Profile the columns of every sheet and cache the sheets as Parquet
+        files under the cache directory."""
+        profile = profile_spreadsheet(document_path, cache_dir=self.cache_dir)
+        parts = [f"Spreadsheet: {document_path}"]
+        for sheet in profile["sheets"]:
+            parts.append(
+                f"\n## Sheet `{sheet['name']}` ({sheet['rows']} data rows, "
+                f"{len(sheet['columns'])} columns)"
+            )
+            if sheet.get("parquet_path"):
+                parts.append(
+                    f"Cached as Parquet, load it in code with "
+                    f"`pandas.read_parquet({sheet['parquet_path']!r})`."
+                )
+            parts.append("Column profiles:")
+            parts.extend(
+                json.dumps(column, ensure_ascii=False, default=str)
+                for column in sheet["columns"]
+            )
+            parts.append(f"First {len(sheet['sample_rows'])} rows:")
+            parts.extend(
+                json.dumps(row, ensure_ascii=False, default=str)
+                for row in sheet["sample_rows"]
+            )
+        return "\n".join(parts)
+
     def _is_webpage(self, url: str) -> bool:
         r"""Judge whether the given URL is a webpage."""
         try:
@@ -183,40 +387,91 @@ class DocumentProcessingToolkit(BaseToolkit):
         document_path: str,
         output_format: Literal["json", "markdown"] = "markdown",
     ) -> str:
+        if output_format not in ("json", "markdown"):
+            return "Invalid output format."
+
+        chunkr = Chunkr(api_key=os.getenv("CHUNKR_API_KEY"))
+        try:
+            result = await chunkr.upload(document_path)
+        finally:
+            await chunkr.close()
+
+        return self._read_chunkr_result(document_path, result, output_format)
+
+    async def _extract_contents_with_chunkr(
+        self,
+        document_paths: List[str],
+        output_format: Literal["json", "markdown"] = "markdown",
+        max_concurrency: int = 8,
+    ) -> List[str]:
+        r"""Process many documents with Chunkr concurrently.
+
+        All documents share one client. Task creation and polling for each
+        document run under a semaphore, so at most `max_concurrency`
+        documents are in flight at a time.
+
+        Args:
+            document_paths (List[str]): The paths or URLs of the documents.
+            output_format (Literal["json", "markdown"], optional): The format
+                of the extracted content. (default: :obj:`"markdown"`)
+            max_concurrency (int, optional): The maximum number of documents
+                processed at the same time. (default: :obj:`8`)
+
+        Returns:
+            List[str]: The extracted content (or an error message) of each
+                document, in the order of `document_paths`.
+        """
+        if output_format not in ("json", "markdown"):
+            return ["Invalid output format."] * len(document_paths)
+
         chunkr = Chunkr(api_key=os.getenv("CHUNKR_API_KEY"))
+        semaphore = asyncio.Semaphore(max_concurrency)
 
-        result = await chunkr.upload(document_path)
+        async def process(document_path: str) -> str:
+            async with semaphore:
+                try:
+                    task = await chunkr.create_task(document_path)
+                    result = await task.poll()
+                except Exception as e:
+                    logger.error(
+                        f"Error while processing document {document_path} using Chunkr: {e}"
+                    )
+                    return f"{CHUNKR_ERROR_PREFIX}: {e}"
+            return self._read_chunkr_result(document_path, result, output_format)
 
-        # result = chunkr.upload(document_path)
+        try:
+            return list(await asyncio.gather(*(process(p) for p in document_paths)))
+        finally:
+            await chunkr.close()
 
+    def _read_chunkr_result(
+        self,
+        document_path: str,
+        result,
+        output_format: Literal["json", "markdown"],
+    ) -> str:
+        r"""Return a Chunkr task result as text without writing it to disk."""
         if result.status == "Failed":
             logger.error(
                 f"Error while processing document {document_path}: {result.message} using Chunkr."
             )
-            return f"Error while processing document: {result.message}"
-
-        # extract document name
-        document_name = os.path.basename(document_path)
-        output_file_path: str
+            return f"{CHUNKR_ERROR_PREFIX}: {result.message}"
 
         if output_format == "json":
-            output_file_path = f"{document_name}.json"
-            result.json(output_file_path)
-
-        elif output_format == "markdown":
-            output_file_path = f"{document_name}.md"
-            result.markdown(output_file_path)
-
-        else:
-            return "Invalid output format."
-
-        with open(output_file_path, "r") as f:
-            extracted_text = f.read()
-        f.close()
-        return extracted_text
+            return json.dumps(result.json(), ensure_ascii=False, default=str)
+        return result.markdown()
 
     @retry_on_error()
     def _extract_webpage_content(self, url: str) -> str:
+        # Static pages are fetched and converted in-process; the remote
+        # crawler is only used for empty or JavaScript-rendered pages.
+        try:
+            extracted_text = extract_webpage_locally(url)
+            if extracted_text:
+                return extracted_text
+        except Exception as e:
+            logger.debug(f"Local extraction failed for {url}: {e}")
+
         api_key = os.getenv("FIRECRAWL_API_KEY")
         from firecrawl import FirecrawlApp
 
@@ -286,4 +541,6 @@ class DocumentProcessingToolkit(BaseToolkit):
         """
         return [
             FunctionTool(self.extract_document_content),
+            FunctionTool(self.extract_documents_content),
+            FunctionTool(self.query_structured_document),
         ]  # Added closing triple quotes here
@@ -12,7 +12,8 @@
 # limitations under the License.
 # ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
 
-from typing import Dict, List, Optional, Tuple
+import time
+from typing import Callable, Dict, List, Optional, Tuple
 
 
 from camel.agents import ChatAgent
@@ -21,6 +22,13 @@ from camel.messages.base import BaseMessage
 from camel.societies import RolePlaying
 from camel.logger import get_logger
 
+from .cancellation import (
+    CancelToken,
+    cancel_scope,
+    current_cancel_token,
+    guard_society_tools,
+)
+from .trajectory import ToolTimer
 
 from copy import deepcopy
 
@@ -437,10 +445,50 @@ class OwlGAIARolePlaying(OwlRolePlaying):
         )
 
 
+def _round_usage(assistant_response, user_response) -> Dict[str, int]:
+    r"""Sum the token usage of the two responses of a round."""
+    usage = {"prompt_tokens": 0, "completion_tokens": 0}
+    for response in (assistant_response, user_response):
+        for key in usage:
+            usage[key] += (response.info.get("usage") or {}).get(key, 0) or 0
+    return usage
+
+
 def run_society(
     society: OwlRolePlaying,
     round_limit: int = 15,
+    round_callback: Optional[Callable[[int, dict], None]] = None,
+    cancel_token: Optional[CancelToken] = None,
 ) -> Tuple[str, List[dict], dict]:
+    r"""Run the society until the task is done or ``round_limit`` is hit.
+
+    Args:
+        society (OwlRolePlaying): The society to run.
+        round_limit (int, optional): The maximum number of rounds.
+            (default: :obj:`15`)
+        round_callback (Callable[[int, dict], None], optional): Called after
+            every round with the round index and the round record appended
+            to the chat history. (default: :obj:`None`)
+        cancel_token (CancelToken, optional): Checked between rounds and
+            before and after every tool call; child processes started by
+            the tools are killed when it is cancelled. Defaults to the token
+            bound with :func:`cancel_scope`. (default: :obj:`None`)
+
+    Returns:
+        Tuple[str, List[dict], dict]: The answer, the chat history and the
+            token usage.
+
+    Raises:
+        SocietyCancelled: If the run was cancelled.
+    """
+    if cancel_token is not None and current_cancel_token() is not cancel_token:
+        with cancel_scope(cancel_token):
+            return run_society(society, round_limit, round_callback, cancel_token)
+    cancel_token = current_cancel_token()
+    if cancel_token is not None:
+        guard_society_tools(society, cancel_token)
+    tool_timer = ToolTimer().install(society)
+
     overall_completion_token_count = 0
     overall_prompt_token_count = 0
 
@@ -450,21 +498,20 @@ def run_society(
         """
     input_msg = society.init_chat(init_prompt)
     for _round in range(round_limit):
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        round_started = time.perf_counter()
         assistant_response, user_response = society.step(input_msg)
-        # Check if usage info is available before accessing it
-        if assistant_response.info.get("usage") and user_response.info.get("usage"):
-            overall_completion_token_count += assistant_response.info["usage"].get(
-                "completion_tokens", 0
-            ) + user_response.info["usage"].get("completion_tokens", 0)
-            overall_prompt_token_count += assistant_response.info["usage"].get(
-                "prompt_tokens", 0
-            ) + user_response.info["usage"].get("prompt_tokens", 0)
+        usage = _round_usage(assistant_response, user_response)
+        overall_completion_token_count += usage["completion_tokens"]
+        overall_prompt_token_count += usage["prompt_tokens"]
 
         # convert tool call to dict
         tool_call_records: List[dict] = []
         if assistant_response.info.get("tool_calls"):
             for tool_call in assistant_response.info["tool_calls"]:
                 tool_call_records.append(tool_call.as_dict())
+        tool_timer.annotate(tool_call_records)
 
         _data = {
             "user": user_response.msg.content
@@ -474,9 +521,13 @@ def run_society(
             if hasattr(assistant_response, "msg") and assistant_response.msg
             else "",
             "tool_calls": tool_call_records,
+            "usage": usage,
+            "duration": round(time.perf_counter() - round_started, 3),
         }
 
         chat_history.append(_data)
+        if round_callback is not None:
+            round_callback(_round, _data)
         logger.info(
             f"Round #{_round} user_response:\n {user_response.msgs[0].content if user_response.msgs and len(user_response.msgs) > 0 else ''}"
         )
@@ -505,7 +556,40 @@ def run_society(
 async def arun_society(
     society: OwlRolePlaying,
     round_limit: int = 15,
+    round_callback: Optional[Callable[[int, dict], None]] = None,
+    cancel_token: Optional[CancelToken] = None,
 ) -> Tuple[str, List[dict], dict]:
+    r"""Run the society until the task is done or ``round_limit`` is hit.
+
+    Args:
+        society (OwlRolePlaying): The society to run.
+        round_limit (int, optional): The maximum number of rounds.
+            (default: :obj:`15`)
+        round_callback (Callable[[int, dict], None], optional): Called after
+            every round with the round index and the round record appended
+            to the chat history. (default: :obj:`None`)
+        cancel_token (CancelToken, optional): Checked between rounds and
+            before and after every tool call; child processes started by
+            the tools are killed when it is cancelled. Defaults to the token
+            bound with :func:`cancel_scope`. (default: :obj:`None`)
+
+    Returns:
+        Tuple[str, List[dict], dict]: The answer, the chat history and the
+            token usage.
+
+    Raises:
+        SocietyCancelled: If the run was cancelled.
+    """
+    if cancel_token is not None and current_cancel_token() is not cancel_token:
+        with cancel_scope(cancel_token):
+            return await arun_society(
+                society, round_limit, round_callback, cancel_token
+            )
+    cancel_token = current_cancel_token()
+    if cancel_token is not None:
+        guard_society_tools(society, cancel_token)
+    tool_timer = ToolTimer().install(society)
+
     overall_completion_token_count = 0
     overall_prompt_token_count = 0
 
@@ -515,21 +599,20 @@ async def arun_society(
         """
     input_msg = society.init_chat(init_prompt)
     for _round in range(round_limit):
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        round_started = time.perf_counter()
         assistant_response, user_response = await society.astep(input_msg)
-        # Check if usage info is available before accessing it
-        if assistant_response.info.get("usage") and user_response.info.get("usage"):
-            overall_prompt_token_count += assistant_response.info["usage"].get(
-                "completion_tokens", 0
-            )
-            overall_prompt_token_count += assistant_response.info["usage"].get(
-                "prompt_tokens", 0
-            ) + user_response.info["usage"].get("prompt_tokens", 0)
+        usage = _round_usage(assistant_response, user_response)
+        overall_completion_token_count += usage["completion_tokens"]
+        overall_prompt_token_count += usage["prompt_tokens"]
 
         # convert tool call to dict
         tool_call_records: List[dict] = []
         if assistant_response.info.get("tool_calls"):
             for tool_call in assistant_response.info["tool_calls"]:
                 tool_call_records.append(tool_call.as_dict())
+        tool_timer.annotate(tool_call_records)
 
         _data = {
             "user": user_response.msg.content
@@ -539,9 +622,13 @@ async def arun_society(
             if hasattr(assistant_response, "msg") and assistant_response.msg
             else "",
             "tool_calls": tool_call_records,
+            "usage": usage,
+            "duration": round(time.perf_counter() - round_started, 3),
         }
 
         chat_history.append(_data)
+        if round_callback is not None:
+            round_callback(_round, _data)
         logger.info(
             f"Round #{_round} user_response:\n {user_response.msgs[0].content if user_response.msgs and len(user_response.msgs) > 0 else ''}"
         )
@@ -0,0 +1,244 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""In-process event bus delivering per-session events to subscribers.
+
+Producers (a logging handler, :func:`run_society` round callbacks) publish
+events from any thread; consumers block on, or ``await``, their own
+subscription and wake up as soon as an event arrives.
+"""
+
+import asyncio
+import contextvars
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+_current_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "owl_session_id", default=None
+)
+
+
+@contextmanager
+def session_context(session_id: str) -> Iterator[None]:
+    r"""Attribute the events published in this context (and the log records
+    emitted in it) to ``session_id``."""
+    token = _current_session.set(session_id)
+    try:
+        yield
+    finally:
+        _current_session.reset(token)
+
+
+def current_session() -> Optional[str]:
+    r"""Return the session bound to the current context, if any."""
+    return _current_session.get()
+
+
+@dataclass
+class Event:
+    r"""A single event published on the bus."""
+
+    session_id: Optional[str]
+    type: str
+    data: Dict[str, Any] = field(default_factory=dict)
+    seq: int = 0
+    timestamp: float = field(default_factory=time.time)
+
+
+class Subscription:
+    r"""A bounded inbox of events for one subscriber.
+
+    Events can be consumed from a thread with :meth:`get` or from a
+    coroutine with :meth:`aget` / ``async for``. When the inbox is full the
+    oldest events are dropped.
+
+    Args:
+        bus (EventBus): The bus the subscription belongs to.
+        session_id (str, optional): The session to receive events for, or
+            :obj:`None` for every session. (default: :obj:`None`)
+        maxlen (int, optional): The maximum number of pending events.
+            (default: :obj:`1000`)
+    """
+
+    def __init__(
+        self,
+        bus: "EventBus",
+        session_id: Optional[str] = None,
+        maxlen: int = 1000,
+    ):
+        self.bus = bus
+        self.session_id = session_id
+        self.closed = False
+        self._events: Deque[Event] = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def _push(self, event: Event) -> None:
+        with self._cond:
+            if self.closed:
+                return
+            self._events.append(event)
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        r"""Block until an event is available and return it, or return
+        :obj:`None` on timeout or once the subscription is closed."""
+        with self._cond:
+            if not self._events and not self.closed:
+                self._cond.wait(timeout)
+            return self._events.popleft() if self._events else None
+
+    def drain(self) -> List[Event]:
+        r"""Return all pending events without blocking."""
+        with self._cond:
+            events = list(self._events)
+            self._events.clear()
+            return events
+
+    async def aget(self) -> Optional[Event]:
+        r"""Wait for the next event without blocking the event loop. Returns
+        :obj:`None` once the subscription is closed."""
+        while True:
+            with self._cond:
+                if self._events:
+                    return self._events.popleft()
+                if self.closed:
+                    return None
+                loop = asyncio.get_running_loop()
+                future = loop.create_future()
+                self._waiters.append((loop, future))
+            await future
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> Event:
+        event = await self.aget()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+    def close(self) -> None:
+        r"""Detach from the bus and wake up every waiting consumer."""
+        self.bus.unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class EventBus:
+    r"""Thread-safe publish/subscribe hub keyed by session id."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: List[Subscription] = []
+        self._seq = itertools.count(1)
+
+    def subscribe(
+        self, session_id: Optional[str] = None, maxlen: int = 1000
+    ) -> Subscription:
+        r"""Create a subscription to one session, or to all sessions when
+        ``session_id`` is :obj:`None`."""
+        subscription = Subscription(self, session_id, maxlen)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def publish(
+        self,
+        event_type: str,
+        session_id: Optional[str] = None,
+        **data: Any,
+    ) -> Event:
+        r"""Publish an event to the subscribers of its session.
+
+        Args:
+            event_type (str): The kind of event, e.g. ``"log"`` or
+                ``"round"``.
+            session_id (str, optional): The session of the event. Defaults
+                to the session bound with :func:`session_context`.
+                (default: :obj:`None`)
+            **data: The payload of the event.
+
+        Returns:
+            Event: The published event.
+        """
+        if session_id is None:
+            session_id = current_session()
+        event = Event(session_id, event_type, data, next(self._seq))
+        with self._lock:
+            targets = [
+                s
+                for s in self._subscriptions
+                if s.session_id is None or s.session_id == session_id
+            ]
+        for subscription in targets:
+            subscription._push(event)
+        return event
+
+
+class EventBusHandler(logging.Handler):
+    r"""Logging handler that publishes every formatted record as a ``"log"``
+    event of the session active where the record was emitted.
+
+    Args:
+        bus (EventBus): The bus to publish to.
+        level (int, optional): The minimum level of published records.
+            (default: :obj:`logging.INFO`)
+    """
+
+    def __init__(self, bus: EventBus, level: int = logging.INFO):
+        super().__init__(level)
+        self.bus = bus
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.bus.publish(
+                "log",
+                line=self.format(record),
+                logger=record.name,
+                level=record.levelname,
+            )
+        except Exception:
+            self.handleError(record)
+
+
+EVENT_BUS = EventBus()
@@ -16,11 +16,14 @@ import sys
 sys.path.append("../")
 
 import json
+import multiprocessing as mp
 import random
 import re
 import string
+import time
+from multiprocessing.connection import Connection, wait
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Optional, Union, Tuple
+from typing import Any, Callable, Dict, List, Literal, Optional, Union, Tuple
 
 from tqdm import tqdm
 from camel.benchmarks import BaseBenchmark
@@ -28,6 +31,10 @@ from camel.tasks import Task
 from camel.logger import get_logger
 
 from .common import extract_pattern
+from .gaia_index import GAIAIndex
+from .gaia_scoring import score_answer
+from .result_store import ResultStore
+from .scheduling import CostModel, WorkStealingScheduler
 from .enhanced_role_playing import run_society, OwlGAIARolePlaying
 
 logger = get_logger(__name__)
@@ -40,9 +47,11 @@ class GAIABenchmark(BaseBenchmark):
 
     Args:
         data_dir (str): The directory to save the data.
-        save_to (str): The file to save the results.
-        processes (int, optional): The number of processes to use.
-            (default: :obj:`1`)
+        save_to (str): The JSON Lines file to save the results to. Chat
+            histories are saved to ``{save_to}.histories.jsonl``.
+        processes (int, optional): The number of tasks run concurrently,
+            each in a process of its own. With :obj:`1`, tasks run one by
+            one in the calling process. (default: :obj:`1`)
     """
 
     def __init__(
@@ -60,6 +69,7 @@ class GAIABenchmark(BaseBenchmark):
                 parallel processing. (default: :obj:`1`)
         """
         super().__init__("gaia", data_dir, save_to, processes)
+        self._store = ResultStore()
 
     def download(self):
         r"""Download the GAIA dataset."""
@@ -73,10 +83,22 @@ class GAIABenchmark(BaseBenchmark):
         )
 
     def _check_task_completed(self, task_id: str) -> bool:
-        for data in self._results:
-            if data["task_id"] == task_id:
-                return True
-        return False
+        return task_id in self._store
+
+    def get_history(self, task_id: str) -> Optional[List[Dict[str, Any]]]:
+        r"""Load the chat history of a finished task.
+
+        Results only reference their histories, which are kept in a side
+        file next to :obj:`save_to` when results are saved.
+
+        Args:
+            task_id (str): The id of the task.
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: The history, or :obj:`None` if
+                the task has none.
+        """
+        return self._store.history(task_id)
 
     def dump_tasks(self, save_path: str, datas):
         constructed_data = []
@@ -117,18 +139,17 @@ class GAIABenchmark(BaseBenchmark):
             logger.info("Data not found. Downloading data.")
             self.download()
 
-        # Load metadata for both validation and test datasets
-        for path, label in zip([valid_dir, test_dir], ["valid", "test"]):
-            self._data[label] = []
-            with open(path / "metadata.jsonl", "r") as f:
-                lines = f.readlines()
-                for line in lines:
-                    data = json.loads(line)
-                    if data["task_id"] == "0-0-0-0-0":
-                        continue
+        # Load both validation and test datasets from the local index, which
+        # is rebuilt only when the metadata files change
+        index = GAIAIndex.from_metadata(self.data_dir / "gaia_index.db", self.data_dir)
+        try:
+            for label in ["valid", "test"]:
+                self._data[label] = index.tasks(label)
+                for data in self._data[label]:
                     if data["file_name"]:
-                        data["file_name"] = path / data["file_name"]
-                    self._data[label].append(data)
+                        data["file_name"] = Path(data["file_name"])
+        finally:
+            index.close()
         return self
 
     @property
@@ -181,87 +202,209 @@ class GAIABenchmark(BaseBenchmark):
 
         logger.info(f"Number of tasks: {len(datas)}")
 
-        self._results = []
-
-        if save_result:
-            try:
-                with open(self.save_to, "r", encoding="utf-8") as f:
-                    self._results = json.load(f)
-                f.close()
-            except Exception as e:
-                logger.warning(e)
-                # raise FileNotFoundError(f"{self.save_to} does not exist.")
+        self._store = ResultStore(self.save_to if save_result else None)
         datas = [
             data for data in datas if not self._check_task_completed(data["task_id"])
         ]
         logger.info(f"Number of tasks to be processed: {len(datas)}")
-        # Process tasks
-        for task in tqdm(datas, desc="Running"):
-            if_prepared_task, info = self._prepare_task(task)
-            if not if_prepared_task:
-                _result_info = {
-                    "task_id": task["task_id"],
-                    "question": task["Question"],
-                    "level": task["Level"],
-                    "model_answer": None,
-                    "ground_truth": None,
-                    "score": 0,
-                    "history": None,
-                }
-                self._results.append(_result_info)
-                continue
-            try:
-                logger.info(f"Task Question: {task['Question']}")
-                logger.info(f"Required tools: {task['Annotator Metadata']['Tools']}")
-
-                task_kwargs = {
-                    "task_prompt": task["Question"],
-                    "with_task_specify": False,
-                }
-
-                society = OwlGAIARolePlaying(
-                    **task_kwargs,
-                    user_role_name=user_role_name,
-                    user_agent_kwargs=user_agent_kwargs,
-                    assistant_role_name=assistant_role_name,
-                    assistant_agent_kwargs=assistant_agent_kwargs,
-                )
 
-                raw_answer, chat_history, token_info = run_society(society)
-                try:
-                    answer = extract_pattern(raw_answer, "final_answer")
-                except Exception as e:
-                    logger.error(
-                        f"Error in extracting final answer from text {raw_answer}: {e}"
-                    )
-                    answer = None
+        run_kwargs = {
+            "user_role_name": user_role_name,
+            "assistant_role_name": assistant_role_name,
+            "user_agent_kwargs": user_agent_kwargs,
+            "assistant_agent_kwargs": assistant_agent_kwargs,
+        }
+        completed: Dict[int, str] = {}
+        previous_results = self._store.records()
+
+        def on_result(index: int, result: Optional[Dict[str, Any]]) -> None:
+            if result is None:
+                return
+            self._store.add(result)
+            completed[index] = result["task_id"]
+
+        processes = self.processes
+        if processes > 1 and "fork" not in mp.get_all_start_methods():
+            logger.warning(
+                "Running tasks sequentially, since parallel runs need the "
+                "'fork' start method."
+            )
+            processes = 1
 
-                logger.info(
-                    f"Model answer: {answer}, Ground truth: {task['Final answer']}"
-                )
+        with tqdm(total=len(datas), desc="Running") as progress:
+            if processes > 1:
+                self._run_parallel(datas, run_kwargs, processes, on_result, progress)
+            else:
+                for index, task in enumerate(datas):
+                    on_result(index, self._process_task(task, **run_kwargs))
+                    progress.update(1)
+
+        # Results are kept in task order, whatever the completion order
+        self._results = previous_results + [
+            self._store.get(completed[i]) for i in sorted(completed)
+        ]
+        return self._generate_summary()
 
-                _result_info = {
-                    "task_id": task["task_id"],
-                    "question": task["Question"]
-                    + "Please decompose the task into several sub-tasks and find the answer step-by-step.",
-                    "level": task["Level"],
-                    "model_answer": answer,
-                    "ground_truth": task["Final answer"],
-                    "score": self.question_scorer(answer, task["Final answer"]),
-                    "token_info": token_info,
-                    "history": chat_history,
-                }
-                self._results.append(_result_info)
+    def _process_task(
+        self,
+        task: Dict[str, Any],
+        user_role_name: str,
+        assistant_role_name: str,
+        user_agent_kwargs: dict,
+        assistant_agent_kwargs: dict,
+    ) -> Optional[Dict[str, Any]]:
+        r"""Run the society on one task.
 
+        Returns:
+            Optional[Dict[str, Any]]: The result of the task, or :obj:`None`
+                if it failed and should be retried by a later run.
+        """
+        if_prepared_task, info = self._prepare_task(task)
+        if not if_prepared_task:
+            return {
+                "task_id": task["task_id"],
+                "question": task["Question"],
+                "level": task["Level"],
+                "model_answer": None,
+                "ground_truth": None,
+                "score": 0,
+                "history": None,
+            }
+        started = time.perf_counter()
+        try:
+            logger.info(f"Task Question: {task['Question']}")
+            logger.info(f"Required tools: {task['Annotator Metadata']['Tools']}")
+
+            task_kwargs = {
+                "task_prompt": task["Question"],
+                "with_task_specify": False,
+            }
+
+            society = OwlGAIARolePlaying(
+                **task_kwargs,
+                user_role_name=user_role_name,
+                user_agent_kwargs=user_agent_kwargs,
+                assistant_role_name=assistant_role_name,
+                assistant_agent_kwargs=assistant_agent_kwargs,
+            )
+
+            raw_answer, chat_history, token_info = run_society(society)
+            try:
+                answer = extract_pattern(raw_answer, "final_answer")
             except Exception as e:
-                logger.error(f"Error in processing task: {e}")
+                logger.error(
+                    f"Error in extracting final answer from text {raw_answer}: {e}"
+                )
+                answer = None
+
+            logger.info(f"Model answer: {answer}, Ground truth: {task['Final answer']}")
+
+            return {
+                "task_id": task["task_id"],
+                "duration": round(time.perf_counter() - started, 3),
+                "question": task["Question"]
+                + "Please decompose the task into several sub-tasks and find the answer step-by-step.",
+                "level": task["Level"],
+                "model_answer": answer,
+                "ground_truth": task["Final answer"],
+                "score": self.question_scorer(answer, task["Final answer"]),
+                "token_info": token_info,
+                "history": chat_history,
+            }
 
-            if save_result:
-                with open(self.save_to, "w") as f:
-                    json.dump(self._results, f, indent=4, ensure_ascii=False)
-                f.close()
+        except Exception as e:
+            logger.error(f"Error in processing task: {e}")
+            return None
 
-        return self._generate_summary()
+    def _run_in_child(
+        self, task: Dict[str, Any], run_kwargs: dict, conn: Connection
+    ) -> None:
+        r"""Entry point of the process running one task."""
+        try:
+            result = self._process_task(task, **run_kwargs)
+            conn.send(result)
+        except BaseException as e:
+            logger.error(f"Error in processing task {task['task_id']}: {e}")
+            conn.send(None)
+        finally:
+            conn.close()
+
+    def _run_parallel(
+        self,
+        datas: List[Dict[str, Any]],
+        run_kwargs: dict,
+        processes: int,
+        on_result: Callable[[int, Optional[Dict[str, Any]]], None],
+        progress: tqdm,
+    ) -> None:
+        r"""Run every task in a process of its own, at most ``processes`` at a
+        time, longest expected tasks first (see :class:`CostModel`).
+
+        Processes are forked, so the agent kwargs (models, toolkits) are
+        inherited rather than pickled; only the results travel back. A task
+        whose process dies is reported as failed without affecting the
+        others.
+
+        Args:
+            datas (List[Dict[str, Any]]): The tasks to run.
+            run_kwargs (dict): The role names and agent kwargs.
+            processes (int): The maximum number of concurrent processes.
+            on_result (Callable): Called with the index of every task, in
+                completion order, and its result.
+            progress (tqdm): The progress bar advanced on every completion.
+        """
+        context = mp.get_context("fork")
+        # Longest expected tasks first, so that none is left for the end
+        cost_model = CostModel().fit(
+            self._store.records(), {task["task_id"]: task for task in datas}
+        )
+        scheduler = WorkStealingScheduler(
+            list(range(len(datas))),
+            processes,
+            lambda index: cost_model.estimate(datas[index]),
+        )
+        logger.info(
+            f"Expected makespan: {scheduler.expected_makespan / 60:.1f} minutes"
+        )
+        free_slots = list(range(processes))
+        running: Dict[Connection, Tuple[int, Any, int]] = {}
+
+        while True:
+            while free_slots:
+                slot = free_slots[-1]
+                index = scheduler.next(slot)
+                if index is None:
+                    break
+                free_slots.pop()
+                task = datas[index]
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(
+                    target=self._run_in_child,
+                    args=(task, run_kwargs, sender),
+                    name=f"gaia-{task['task_id']}",
+                )
+                process.start()
+                # Only the child writes; EOF then signals that it has exited.
+                sender.close()
+                running[receiver] = (index, process, slot)
+            if not running:
+                break
+
+            for receiver in wait(list(running)):
+                index, process, slot = running.pop(receiver)
+                free_slots.append(slot)
+                try:
+                    result = receiver.recv()
+                except EOFError:
+                    logger.error(
+                        f"Process of task {datas[index]['task_id']} exited "
+                        "without a result."
+                    )
+                    result = None
+                receiver.close()
+                process.join()
+                on_result(index, result)
+                progress.update(1)
 
     def _prepare_task(self, task: Dict[str, Any]) -> Tuple[bool, str]:
         r"""Prepare the task by validating and enriching its data."""
@@ -327,46 +470,7 @@ class GAIABenchmark(BaseBenchmark):
         Returns:
             bool: The score of the model
         """
-
-        def is_float(element: Any) -> bool:
-            try:
-                float(element)
-                return True
-            except ValueError:
-                return False
-
-        if is_float(ground_truth):
-            logger.info(f"Evaluating {model_answer} as a number.")
-            normalized_answer = self.normalize_number_str(model_answer)
-            return normalized_answer == float(ground_truth)
-
-        elif any(char in ground_truth for char in [",", ";"]):
-            logger.info(f"Evaluating {model_answer} as a comma separated list.")
-            gt_elems = self.split_string(ground_truth)
-            ma_elems = self.split_string(model_answer)
-
-            if len(gt_elems) != len(ma_elems):
-                logger.warning(
-                    "Answer lists have different lengths, returning False.",
-                    UserWarning,
-                )
-                return False
-
-            comparisons = []
-            for ma_elem, gt_elem in zip(ma_elems, gt_elems):
-                if is_float(gt_elem):
-                    normalized_ma_elem = self.normalize_number_str(ma_elem)
-                    comparisons.append(normalized_ma_elem == float(gt_elem))
-                else:
-                    ma_elem = self.normalize_str(ma_elem, remove_punct=False)
-                    gt_elem = self.normalize_str(gt_elem, remove_punct=False)
-                    comparisons.append(ma_elem == gt_elem)
-            return all(comparisons)
-        else:
-            logger.info(f"Evaluating {model_answer} as a string.")
-            ma_elem = self.normalize_str(model_answer)
-            gt_elem = self.normalize_str(ground_truth)
-            return ma_elem == gt_elem
+        return score_answer(model_answer, ground_truth)
 
     def normalize_number_str(self, number_str: str) -> float:
         for char in ["$", "%", ","]:
@@ -0,0 +1,235 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""Local SQLite index of the GAIA dataset.
+
+The dataset is read once, from the ``metadata.jsonl`` files of a local
+snapshot or through :func:`datasets.load_dataset`, and every task is stored
+by id with its split, level and attachment path. Later runs load and filter
+tasks from the index in milliseconds, without network access.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from camel.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT NOT NULL,
+    split TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    file_path TEXT,
+    record TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (split, task_id)
+);
+CREATE INDEX IF NOT EXISTS tasks_level ON tasks (split, level, position);
+CREATE INDEX IF NOT EXISTS tasks_id ON tasks (task_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Placeholder row of the GAIA test metadata
+_PLACEHOLDER_TASK_ID = "0-0-0-0-0"
+
+_SPLITS = {"validation": "valid", "test": "test"}
+
+
+class GAIAIndex:
+    r"""GAIA tasks indexed by id, split and level.
+
+    The index remembers the source it was built from; :meth:`from_metadata`
+    and :meth:`from_hub` only rebuild it when that source changed.
+
+    Args:
+        path (str): The database file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    @classmethod
+    def from_metadata(cls, path: str, data_dir: str) -> "GAIAIndex":
+        r"""Open the index of a local GAIA snapshot, building it from the
+        ``2023/{validation,test}/metadata.jsonl`` files if they changed
+        since it was built.
+
+        Args:
+            path (str): The database file.
+            data_dir (str): The directory of the snapshot.
+
+        Returns:
+            GAIAIndex: The index, with the splits ``"valid"`` and ``"test"``.
+        """
+        index = cls(path)
+        data_dir = Path(data_dir)
+        metadata = {
+            label: data_dir / "2023" / split / "metadata.jsonl"
+            for split, label in _SPLITS.items()
+        }
+        fingerprint = json.dumps(
+            {
+                label: [str(f.resolve()), f.stat().st_mtime_ns, f.stat().st_size]
+                for label, f in metadata.items()
+            }
+        )
+        if index.source() != fingerprint:
+            logger.info(f"Indexing GAIA metadata from {data_dir}")
+
+            def records() -> Iterable[Tuple[str, Dict[str, Any]]]:
+                for label, f in metadata.items():
+                    with open(f, "r", encoding="utf-8") as lines:
+                        for line in lines:
+                            record = json.loads(line)
+                            if record["task_id"] == _PLACEHOLDER_TASK_ID:
+                                continue
+                            if record["file_name"]:
+                                record["file_name"] = str(
+                                    f.parent / record["file_name"]
+                                )
+                            yield label, record
+
+            index.rebuild(records(), fingerprint)
+        return index
+
+    @classmethod
+    def from_hub(cls, path: str, config: str = "2023_all") -> "GAIAIndex":
+        r"""Open the index of a GAIA configuration of the Hugging Face hub,
+        downloading it once if the index was built from another source.
+
+        Args:
+            path (str): The database file.
+            config (str, optional): The dataset configuration.
+                (default: :obj:`"2023_all"`)
+
+        Returns:
+            GAIAIndex: The index, with the splits ``"validation"`` and
+                ``"test"`` of the dataset.
+        """
+        index = cls(path)
+        fingerprint = f"hub:gaia-benchmark/GAIA:{config}"
+        if index.source() != fingerprint:
+            from datasets import load_dataset
+
+            logger.info(f"Indexing GAIA {config} from the Hugging Face hub")
+            dataset = load_dataset(
+                path="gaia-benchmark/GAIA", name=config, trust_remote_code=True
+            )
+            index.rebuild(
+                (
+                    (split, dict(record))
+                    for split in dataset
+                    for record in dataset[split]
+                    if record["task_id"] != _PLACEHOLDER_TASK_ID
+                ),
+                fingerprint,
+            )
+        return index
+
+    def source(self) -> Optional[str]:
+        r"""Return the fingerprint of the source the index was built from."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'source'"
+            ).fetchone()
+        return row[0] if row else None
+
+    def rebuild(
+        self, records: Iterable[Tuple[str, Dict[str, Any]]], source: str
+    ) -> int:
+        r"""Replace the content of the index in a single transaction.
+
+        Args:
+            records (Iterable[Tuple[str, Dict[str, Any]]]): The split and the
+                record of every task, in dataset order.
+            source (str): The fingerprint of the source.
+
+        Returns:
+            int: The number of indexed tasks.
+        """
+        rows = [
+            (
+                record["task_id"],
+                split,
+                int(record["Level"]),
+                record.get("file_path") or record.get("file_name") or None,
+                json.dumps(record, ensure_ascii=False, default=str),
+                position,
+            )
+            for position, (split, record) in enumerate(records)
+        ]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM tasks")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tasks (task_id, split, level, file_path,"
+                " record, position) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('source', ?)",
+                (source,),
+            )
+        logger.info(f"Indexed {len(rows)} GAIA tasks in {self.path}")
+        return len(rows)
+
+    def tasks(self, split: str, levels: Optional[List[int]] = None) -> List[Dict]:
+        r"""Return the tasks of a split in dataset order.
+
+        Args:
+            split (str): The split.
+            levels (List[int], optional): The levels to keep, all of them
+                when :obj:`None`. (default: :obj:`None`)
+
+        Returns:
+            List[Dict]: The records of the tasks.
+        """
+        query = "SELECT record FROM tasks WHERE split = ?"
+        params: List[Any] = [split]
+        if levels is not None:
+            query += f" AND level IN ({', '.join('?' for _ in levels)})"
+            params.extend(int(level) for level in levels)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY position", params)
+            return [json.loads(row[0]) for row in rows]
+
+    def get(self, task_id: str) -> Optional[Dict]:
+        r"""Return the record of a task, whatever its split."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def levels(self) -> Dict[str, int]:
+        r"""Return the level of every task."""
+        with self._lock:
+            rows = self._conn.execute("SELECT task_id, level FROM tasks")
+            return dict(rows.fetchall())
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,252 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""Batch scoring of GAIA answers.
+
+The rules are those of the `GAIA leaderboard scorer
+<https://huggingface.co/spaces/gaia-benchmark/leaderboard/blob/main/scorer.py>`_,
+but every ground truth is parsed and normalized once and cached, nothing is
+logged per answer, and whole runs are scored, summarized per level and
+compared in one pass.
+"""
+
+import json
+import re
+import string
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+_WHITESPACE = re.compile(r"\s")
+_LIST_SEPARATORS = re.compile(r"[,;]")
+_PUNCTUATION = str.maketrans("", "", string.punctuation)
+
+NUMBER = "number"
+LIST = "list"
+STRING = "string"
+
+
+def _to_float(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=65536)
+def normalize_number_str(number_str: str) -> float:
+    r"""Parse a number, ignoring ``$``, ``%`` and ``,``; unparsable strings
+    give ``inf``, which equals no ground truth."""
+    for char in ["$", "%", ","]:
+        number_str = number_str.replace(char, "")
+    value = _to_float(number_str)
+    return float("inf") if value is None else value
+
+
+@lru_cache(maxsize=65536)
+def normalize_str(input_str: str, remove_punct: bool = True) -> str:
+    r"""Lowercase a string and remove its whitespace and, optionally, its
+    punctuation."""
+    no_spaces = _WHITESPACE.sub("", input_str).lower()
+    if remove_punct:
+        return no_spaces.translate(_PUNCTUATION)
+    return no_spaces
+
+
+@dataclass(frozen=True)
+class GroundTruth:
+    r"""A ground truth parsed for comparison.
+
+    Args:
+        kind (str): :obj:`NUMBER`, :obj:`LIST` or :obj:`STRING`.
+        number (Optional[float]): The value of a number.
+        elements (Tuple[Union[float, str], ...]): The elements of a list,
+            as numbers or normalized strings.
+        text (str): The normalized string.
+    """
+
+    kind: str
+    number: Optional[float] = None
+    elements: Tuple[Union[float, str], ...] = ()
+    text: str = ""
+
+
+@lru_cache(maxsize=None)
+def prepare_ground_truth(ground_truth: str) -> GroundTruth:
+    r"""Parse and normalize a ground truth once."""
+    number = _to_float(ground_truth)
+    if number is not None:
+        return GroundTruth(NUMBER, number=number)
+    if any(char in ground_truth for char in [",", ";"]):
+        elements = []
+        for element in _LIST_SEPARATORS.split(ground_truth):
+            value = _to_float(element)
+            elements.append(
+                value if value is not None else normalize_str(element, False)
+            )
+        return GroundTruth(LIST, elements=tuple(elements))
+    return GroundTruth(STRING, text=normalize_str(ground_truth))
+
+
+def score_answer(
+    model_answer: Optional[str], ground_truth: Union[str, GroundTruth]
+) -> bool:
+    r"""Score one answer.
+
+    Args:
+        model_answer (Optional[str]): The answer; :obj:`None` is scored as
+            the string ``"None"``, like the leaderboard does.
+        ground_truth (Union[str, GroundTruth]): The ground truth, raw or
+            prepared with :func:`prepare_ground_truth`.
+
+    Returns:
+        bool: Whether the answer is correct.
+    """
+    if model_answer is None:
+        model_answer = "None"
+    truth = (
+        ground_truth
+        if isinstance(ground_truth, GroundTruth)
+        else prepare_ground_truth(ground_truth)
+    )
+    if truth.kind == NUMBER:
+        return normalize_number_str(model_answer) == truth.number
+    if truth.kind == LIST:
+        answer_elements = _LIST_SEPARATORS.split(model_answer)
+        if len(answer_elements) != len(truth.elements):
+            return False
+        for answer_element, element in zip(answer_elements, truth.elements):
+            if isinstance(element, float):
+                if normalize_number_str(answer_element) != element:
+                    return False
+            elif normalize_str(answer_element, False) != element:
+                return False
+        return True
+    return normalize_str(model_answer) == truth.text
+
+
+@dataclass
+class ScoreReport:
+    r"""The scores of a run.
+
+    Args:
+        scores (Dict[str, bool]): Whether each task was answered correctly.
+        levels (Dict[str, int]): The level of each task.
+        answers (Dict[str, Optional[str]]): The answer to each task.
+    """
+
+    scores: Dict[str, bool] = field(default_factory=dict)
+    levels: Dict[str, int] = field(default_factory=dict)
+    answers: Dict[str, Optional[str]] = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return len(self.scores)
+
+    @property
+    def correct(self) -> int:
+        return sum(self.scores.values())
+
+    @property
+    def accuracy(self) -> float:
+        return self.correct / self.total if self.total else 0.0
+
+    def per_level(self) -> Dict[int, Dict[str, Any]]:
+        r"""Return the total, correct count and accuracy of every level."""
+        stats: Dict[int, Dict[str, Any]] = {}
+        for task_id, correct in self.scores.items():
+            stat = stats.setdefault(self.levels[task_id], {"total": 0, "correct": 0})
+            stat["total"] += 1
+            stat["correct"] += int(correct)
+        for stat in stats.values():
+            stat["accuracy"] = stat["correct"] / stat["total"]
+        return dict(sorted(stats.items()))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "correct": self.correct,
+            "accuracy": self.accuracy,
+            "levels": self.per_level(),
+        }
+
+
+def score_results(
+    results: Iterable[Mapping[str, Any]], tasks: Mapping[str, Mapping[str, Any]]
+) -> ScoreReport:
+    r"""Score the results of a run against the dataset.
+
+    Args:
+        results (Iterable[Mapping[str, Any]]): Records with a ``task_id`` and
+            a ``model_answer``; of several records of a task, the last one
+            counts. Empty answers are wrong.
+        tasks (Mapping[str, Mapping[str, Any]]): The dataset records, with
+            ``Final answer`` and ``Level``, by task id. Results of unknown
+            tasks are ignored.
+
+    Returns:
+        ScoreReport: The scores.
+    """
+    report = ScoreReport()
+    for record in results:
+        task_id = record["task_id"]
+        task = tasks.get(task_id)
+        if task is None:
+            continue
+        answer = record.get("model_answer")
+        report.answers[task_id] = answer
+        report.levels[task_id] = int(task["Level"])
+        report.scores[task_id] = bool(answer) and score_answer(
+            answer, task["Final answer"]
+        )
+    return report
+
+
+def read_results(path: str) -> List[Dict[str, Any]]:
+    r"""Read a JSON Lines result file, skipping malformed lines."""
+    results = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return results
+
+
+@dataclass
+class RunDiff:
+    r"""The tasks whose outcome differs between two runs.
+
+    Args:
+        fixed (List[str]): Wrong in the first run, correct in the second.
+        broken (List[str]): Correct in the first run, wrong in the second.
+        only_first (List[str]): Scored in the first run only.
+        only_second (List[str]): Scored in the second run only.
+    """
+
+    fixed: List[str]
+    broken: List[str]
+    only_first: List[str]
+    only_second: List[str]
+
+
+def diff_runs(first: ScoreReport, second: ScoreReport) -> RunDiff:
+    r"""Compare two runs task by task."""
+    common = [task_id for task_id in first.scores if task_id in second.scores]
+    return RunDiff(
+        fixed=[t for t in common if not first.scores[t] and second.scores[t]],
+        broken=[t for t in common if first.scores[t] and not second.scores[t]],
+        only_first=[t for t in first.scores if t not in second.scores],
+        only_second=[t for t in second.scores if t not in first.scores],
+    )
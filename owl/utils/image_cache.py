@@ -0,0 +1,152 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""Image downscaling and a content-hash keyed caption cache."""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from camel.logger import get_logger
+from PIL import Image, ImageOps
+
+logger = get_logger(__name__)
+
+
+def content_hash(image: Image.Image) -> str:
+    r"""Compute the SHA-256 digest of the decoded pixels of an image.
+
+    The same picture saved in another file, or in another lossless format,
+    gets the same digest, while any change to a pixel gives a different
+    one. Perceptual hashes are not used, since images differing only in
+    small details (a digit in a table, a piece on a chess board) often get
+    the same perceptual hash yet call for different answers.
+
+    Args:
+        image (Image.Image): The image to hash.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256(f"{image.mode}:{image.size}:".encode("utf-8"))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def preprocess_image(
+    path: str,
+    output_dir: str,
+    max_side: int = 1024,
+    quality: int = 85,
+) -> Tuple[str, str]:
+    r"""Downscale and recompress an image for a vision model.
+
+    Images whose longest side exceeds ``max_side`` are resized with their
+    aspect ratio preserved and re-encoded as JPEG into ``output_dir``.
+    Smaller images are returned unchanged.
+
+    Args:
+        path (str): The local path of the image.
+        output_dir (str): The directory for preprocessed images.
+        max_side (int, optional): The target size of the longest side in
+            pixels. (default: :obj:`1024`)
+        quality (int, optional): The JPEG quality of re-encoded images.
+            (default: :obj:`85`)
+
+    Returns:
+        Tuple[str, str]: The path of the image to send to the model and the
+            content hash of the original image.
+    """
+    with Image.open(path) as image:
+        # Apply the EXIF orientation so the model sees the upright image.
+        image = ImageOps.exif_transpose(image)
+        digest = content_hash(image)
+        if max(image.size) <= max_side:
+            return path, digest
+
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        if image.mode != "RGB":
+            # JPEG has no alpha channel, so transparency is flattened
+            # onto a white background.
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+                image = image.convert("RGBA")
+                background.paste(image, mask=image.split()[-1])
+            else:
+                background.paste(image.convert("RGB"))
+            image = background
+
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, f"{digest[:16]}_{max_side}.jpg")
+        image.save(output_path, "JPEG", quality=quality, optimize=True)
+    return output_path, digest
+
+
+class CaptionCache:
+    r"""A persistent cache of image answers keyed by image content, prompt
+    and model.
+
+    Entries are appended to a JSON Lines file and kept in memory. A lookup
+    only hits for the exact same pixels, as given by :func:`content_hash`,
+    asked the same question of the same model.
+
+    Args:
+        path (str): The JSON Lines file backing the cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str, str], str] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        key = (record["model"], record["prompt"], record["digest"])
+                        answer = record["answer"]
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        # Torn last line, or an entry of an older format.
+                        continue
+                    self._entries[key] = answer
+        except OSError as e:
+            logger.warning(f"Could not read the caption cache {self.path}: {e}")
+
+    def get(self, digest: str, prompt: str, model: str = "") -> Optional[str]:
+        r"""Return the cached answer for an image, if any."""
+        with self._lock:
+            return self._entries.get((model, prompt, digest))
+
+    def put(self, digest: str, prompt: str, answer: str, model: str = "") -> None:
+        r"""Store an answer and append it to the backing file."""
+        record = {
+            "model": model,
+            "prompt": prompt,
+            "digest": digest,
+            "answer": answer,
+        }
+        with self._lock:
+            self._entries[(model, prompt, digest)] = answer
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except OSError as e:
+                logger.warning(f"Could not write the caption cache {self.path}: {e}")
@@ -0,0 +1,302 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""Bounded worker pool with an admission queue for society runs.
+
+Every job gets an id that doubles as its event-bus session, so the events
+and log records of concurrent jobs reach only the subscribers of that job,
+and a cancel token that :func:`run_society` picks up from its context.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+from camel.logger import get_logger
+
+from .cancellation import CancelToken, SocietyCancelled, cancel_scope
+from .events import EVENT_BUS, EventBus, session_context
+
+logger = get_logger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class QueueFullError(RuntimeError):
+    r"""Raised when a job is submitted while the admission queue is full."""
+
+
+@dataclass
+class Job:
+    r"""A unit of work submitted to a :class:`JobManager`."""
+
+    id: str
+    fn: Callable[..., Any]
+    args: tuple = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    context: Any = None
+    status: str = QUEUED
+    result: Any = None
+    error: Optional[BaseException] = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    done: threading.Event = field(default_factory=threading.Event)
+    cancel_token: CancelToken = field(default_factory=CancelToken)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        r"""Block until the job has finished, failed or been cancelled."""
+        return self.done.wait(timeout)
+
+
+class JobManager:
+    r"""Run jobs on a fixed number of worker threads, first come first
+    served, and report their progress on an event bus.
+
+    The following events are published to the session of each job:
+    ``"queued"`` with the ``position`` of the job (1 is next to start),
+    again whenever the position changes, ``"started"`` when a worker picks
+    it up and ``"job_finished"`` with the final ``status``.
+
+    Args:
+        max_workers (int, optional): The number of jobs run concurrently.
+            (default: :obj:`2`)
+        max_queue (int, optional): The number of jobs allowed to wait for a
+            worker; further submissions raise :class:`QueueFullError`.
+            (default: :obj:`16`)
+        bus (EventBus, optional): The bus to publish job events to.
+            (default: :obj:`EVENT_BUS`)
+        history (int, optional): The number of completed jobs kept for
+            lookup by id. (default: :obj:`100`)
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_queue: int = 16,
+        bus: EventBus = EVENT_BUS,
+        history: int = 100,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max_queue
+        self.bus = bus
+        self.history = history
+        self._cond = threading.Condition()
+        self._pending: Deque[Job] = deque()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._workers: List[threading.Thread] = []
+        # Workers still finishing a cancelled job; they no longer count
+        # towards max_workers and exit once the job returns.
+        self._abandoned: Set[threading.Thread] = set()
+        self._job_threads: Dict[str, threading.Thread] = {}
+        self._running = 0
+        self._shutdown = False
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        job_id: Optional[str] = None,
+        context: Any = None,
+        **kwargs: Any,
+    ) -> Job:
+        r"""Queue ``fn(*args, **kwargs)`` for execution.
+
+        Args:
+            fn (Callable[..., Any]): The function to run.
+            *args: The positional arguments of the function.
+            job_id (str, optional): The id of the job. Subscribing to this
+                id before submitting guarantees that no event is missed.
+                A random id is used when not given. (default: :obj:`None`)
+            context (Any, optional): Arbitrary data attached to the job,
+                e.g. the store its results are written to.
+                (default: :obj:`None`)
+            **kwargs: The keyword arguments of the function.
+
+        Returns:
+            Job: The submitted job.
+
+        Raises:
+            QueueFullError: If ``max_queue`` jobs are already waiting.
+        """
+        job = Job(job_id or uuid.uuid4().hex, fn, args, kwargs, context)
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Job manager has been shut down")
+            if len(self._pending) >= self.max_queue:
+                raise QueueFullError(
+                    f"{len(self._pending)} jobs are already waiting, "
+                    "please try again later"
+                )
+            self._pending.append(job)
+            self._jobs[job.id] = job
+            position = len(self._pending)
+            # Published under the lock, so it cannot overtake the
+            # "started" event of a worker picking the job up at once.
+            self.bus.publish("queued", session_id=job.id, position=position)
+            self._spawn_worker()
+            self._cond.notify()
+        logger.info(f"Job {job.id} queued at position {position}")
+        return job
+
+    def _spawn_worker(self) -> None:
+        # Called with the condition held.
+        self._workers = [
+            w for w in self._workers if w.is_alive() and w not in self._abandoned
+        ]
+        idle = len(self._workers) - self._running
+        if idle < len(self._pending) and len(self._workers) < self.max_workers:
+            worker = threading.Thread(
+                target=self._work, name=f"owl-job-worker-{len(self._workers)}"
+            )
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._shutdown:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                job = self._pending.popleft()
+                self._job_threads[job.id] = threading.current_thread()
+                job.status = RUNNING
+                job.started_at = time.time()
+                self._running += 1
+                self.bus.publish("started", session_id=job.id)
+                self._notify_positions()
+            self._run(job)
+            with self._cond:
+                self._job_threads.pop(job.id, None)
+                self._prune()
+                current = threading.current_thread()
+                if current in self._abandoned:
+                    self._abandoned.discard(current)
+                    return
+                self._running -= 1
+
+    def _run(self, job: Job) -> None:
+        with session_context(job.id), cancel_scope(job.cancel_token):
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+                status, error = FINISHED, None
+            except SocietyCancelled:
+                result, status, error = None, CANCELLED, None
+            except Exception as e:
+                logger.error(f"Job {job.id} failed: {e}")
+                result, status, error = None, FAILED, e
+        with self._cond:
+            if job.done.is_set():
+                # Already reported as cancelled by cancel()
+                return
+            job.result, job.status, job.error = result, status, error
+            job.finished_at = time.time()
+            job.done.set()
+        self.bus.publish("job_finished", session_id=job.id, status=job.status)
+
+    def _notify_positions(self) -> None:
+        # Called with the condition held, so that the positions of a job
+        # are published in order and never after it has started.
+        for position, job in enumerate(self._pending, start=1):
+            self.bus.publish("queued", session_id=job.id, position=position)
+
+    def _prune(self) -> None:
+        # Called with the condition held: forget the oldest completed jobs.
+        completed = [j.id for j in self._jobs.values() if j.done.is_set()]
+        for job_id in completed[: max(0, len(completed) - self.history)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        r"""Return the job with the given id, if it is still known."""
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def position(self, job_id: str) -> Optional[int]:
+        r"""Return the 1-based queue position of a waiting job, or
+        :obj:`None` if it is not waiting."""
+        with self._cond:
+            for position, job in enumerate(self._pending, start=1):
+                if job.id == job_id:
+                    return position
+        return None
+
+    def cancel(self, job_id: str, reason: str = "Cancelled by user") -> bool:
+        r"""Cancel a waiting or running job.
+
+        A waiting job is removed from the queue. A running job has its
+        cancel token cancelled, which kills the child processes of its
+        tools and stops it at the next round or tool call. It is reported
+        as cancelled right away and its worker slot is handed to the next
+        waiting job, while the old worker thread exits once the job
+        returns.
+
+        Args:
+            job_id (str): The id of the job.
+            reason (str, optional): The reason recorded on the token.
+                (default: :obj:`"Cancelled by user"`)
+
+        Returns:
+            bool: Whether the job was waiting or running and has been
+                cancelled.
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.done.is_set():
+                return False
+            if job.status == QUEUED:
+                self._pending.remove(job)
+            else:
+                # The worker running the job no longer counts as a pool
+                # worker, so that a new one can take the next job now.
+                self._running -= 1
+                self._abandoned.add(self._job_threads[job_id])
+                self._spawn_worker()
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            job.done.set()
+            self.bus.publish("job_finished", session_id=job.id, status=job.status)
+            self._notify_positions()
+        job.cancel_token.cancel(reason)
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        r"""Return the number of running and waiting jobs."""
+        with self._cond:
+            return {
+                "running": self._running,
+                "queued": len(self._pending),
+                "max_workers": self.max_workers,
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        r"""Cancel waiting and running jobs and stop the workers."""
+        with self._cond:
+            self._shutdown = True
+            jobs = [j for j in self._jobs.values() if not j.done.is_set()]
+            workers = list(self._workers)
+        for job in jobs:
+            self.cancel(job.id, reason="Shutting down")
+        with self._cond:
+            self._cond.notify_all()
+        if wait:
+            for worker in workers:
+                worker.join()
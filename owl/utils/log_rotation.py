@@ -0,0 +1,307 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""Size-bounded application logs: rotation with background compression, a
+cap on the size of single records and an index of the byte ranges written
+by each run."""
+
+import glob
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .events import current_session
+
+
+class TruncateFilter(logging.Filter):
+    r"""Cap the length of log messages, so that a single huge message (a
+    whole web page, a long chat round) cannot bloat the log.
+
+    Args:
+        max_chars (int, optional): The maximum number of characters kept
+            from each message. (default: :obj:`10000`)
+    """
+
+    def __init__(self, max_chars: int = 10000):
+        super().__init__()
+        self.max_chars = max_chars
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = record.getMessage()
+        if len(message) > self.max_chars:
+            record.msg = (
+                message[: self.max_chars]
+                + f"... [truncated {len(message) - self.max_chars} characters]"
+            )
+            record.args = None
+        return True
+
+
+# (generation, start offset, end offset) of a run of consecutive lines
+Segment = Tuple[int, int, int]
+
+
+class RunLogIndex:
+    r"""Byte ranges of the log lines written by each run.
+
+    Consecutive records of the same run are merged into one segment.
+    Completed segments are appended to a JSON Lines sidecar file, so the
+    index survives restarts.
+
+    Args:
+        path (str): The sidecar file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._segments: Dict[str, List[Segment]] = {}
+        self._open: Optional[Tuple[str, int, int, int]] = None
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._segments.setdefault(entry["run"], []).append(
+                    (entry["gen"], entry["start"], entry["end"])
+                )
+
+    def add(self, run_id: str, generation: int, start: int, end: int) -> None:
+        r"""Record that ``run_id`` wrote bytes ``[start, end)``."""
+        with self._lock:
+            if (
+                self._open is not None
+                and self._open[0] == run_id
+                and self._open[1] == generation
+                and self._open[3] == start
+            ):
+                self._open = (run_id, generation, self._open[2], end)
+                return
+            self._flush()
+            self._open = (run_id, generation, start, end)
+
+    def _flush(self) -> None:
+        # Called with the lock held.
+        if self._open is None:
+            return
+        run_id, generation, start, end = self._open
+        self._open = None
+        self._segments.setdefault(run_id, []).append((generation, start, end))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(
+                json.dumps(
+                    {"run": run_id, "gen": generation, "start": start, "end": end}
+                )
+                + "\n"
+            )
+
+    def flush(self) -> None:
+        r"""Close the segment being written."""
+        with self._lock:
+            self._flush()
+
+    def segments(self, run_id: str) -> List[Segment]:
+        r"""Return the segments of a run, oldest first."""
+        with self._lock:
+            segments = list(self._segments.get(run_id, []))
+            if self._open is not None and self._open[0] == run_id:
+                segments.append(self._open[1:])
+            return segments
+
+    def drop_generations(self, below: int) -> None:
+        r"""Forget the segments of log files that have been deleted."""
+        with self._lock:
+            self._flush()
+            self._segments = {
+                run_id: kept
+                for run_id, segments in self._segments.items()
+                if (kept := [s for s in segments if s[0] >= below])
+            }
+            with open(self.path, "w", encoding="utf-8") as f:
+                for run_id, segments in self._segments.items():
+                    for generation, start, end in segments:
+                        f.write(
+                            json.dumps(
+                                {
+                                    "run": run_id,
+                                    "gen": generation,
+                                    "start": start,
+                                    "end": end,
+                                }
+                            )
+                            + "\n"
+                        )
+
+
+class RunLogHandler(logging.FileHandler):
+    r"""File handler with size-based rotation, background gzip compression
+    of rotated files and a per-run index of the lines written.
+
+    Once the file exceeds ``max_bytes`` it is renamed to
+    ``{filename}.{generation}`` and compressed to
+    ``{filename}.{generation}.gz`` in a background thread; only the newest
+    ``backup_count`` rotated files are kept. Records emitted while an event
+    bus session is active (see :func:`session_context`) are indexed by
+    session, so :meth:`read_run` returns the lines of one run without
+    scanning the logs.
+
+    Args:
+        filename (str): The active log file.
+        max_bytes (int, optional): The size at which the file is rotated.
+            (default: :obj:`50 * 1024 * 1024`)
+        backup_count (int, optional): The number of rotated files kept.
+            (default: :obj:`10`)
+        compress (bool, optional): Whether rotated files are gzipped.
+            (default: :obj:`True`)
+        encoding (str, optional): The file encoding.
+            (default: :obj:`"utf-8"`)
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = 50 * 1024 * 1024,
+        backup_count: int = 10,
+        compress: bool = True,
+        encoding: str = "utf-8",
+    ):
+        super().__init__(filename, mode="a", encoding=encoding)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.index = RunLogIndex(self.baseFilename + ".index.jsonl")
+        existing = self._rotated_generations()
+        self.generation = (max(existing) + 1) if existing else 0
+        self._compressor: Optional[threading.Thread] = None
+
+    def _rotated_generations(self) -> List[int]:
+        pattern = re.compile(re.escape(self.baseFilename) + r"\.(\d+)(\.gz)?$")
+        generations = set()
+        for path in glob.glob(glob.escape(self.baseFilename) + ".*"):
+            match = pattern.match(path)
+            if match:
+                generations.add(int(match.group(1)))
+        return sorted(generations)
+
+    def path_for(self, generation: int) -> Optional[str]:
+        r"""Return the file holding a generation of the log, if it exists."""
+        if generation == self.generation:
+            return self.baseFilename
+        for path in (
+            f"{self.baseFilename}.{generation}",
+            f"{self.baseFilename}.{generation}.gz",
+        ):
+            if os.path.exists(path):
+                return path
+        return None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            msg = self.format(record) + self.terminator
+            if self.stream.tell() + len(msg) > self.max_bytes > 0:
+                self.do_rollover()
+            start = self.stream.tell()
+            self.stream.write(msg)
+            self.flush()
+            run_id = current_session()
+            if run_id is not None:
+                self.index.add(run_id, self.generation, start, self.stream.tell())
+        except Exception:
+            self.handleError(record)
+
+    def do_rollover(self) -> None:
+        r"""Rotate the active file and compress it in the background."""
+        self.index.flush()
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        # A previous compression must finish before its file may be pruned.
+        if self._compressor is not None:
+            self._compressor.join()
+        rotated = f"{self.baseFilename}.{self.generation}"
+        if os.path.exists(self.baseFilename):
+            os.replace(self.baseFilename, rotated)
+            if self.compress:
+                self._compressor = threading.Thread(
+                    target=_gzip_file, args=(rotated,), name="owl-log-compress"
+                )
+                self._compressor.daemon = True
+                self._compressor.start()
+        self.generation += 1
+        self._prune()
+        self.stream = self._open()
+
+    def _prune(self) -> None:
+        oldest_kept = self.generation - self.backup_count
+        for generation in self._rotated_generations():
+            if generation < oldest_kept:
+                for path in (
+                    f"{self.baseFilename}.{generation}",
+                    f"{self.baseFilename}.{generation}.gz",
+                ):
+                    if os.path.exists(path):
+                        os.remove(path)
+        self.index.drop_generations(oldest_kept)
+
+    def read_run(self, run_id: str) -> List[str]:
+        r"""Return the log lines written by a run, in order.
+
+        Args:
+            run_id (str): The session id of the run.
+
+        Returns:
+            List[str]: The lines, without trailing newlines. Lines in
+                rotated files that have been deleted are skipped.
+        """
+        self.flush()
+        lines: List[str] = []
+        for generation, start, end in self.index.segments(run_id):
+            path = self.path_for(generation)
+            if path is None:
+                continue
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(path, "rb") as f:
+                f.seek(start)
+                data = f.read(end - start)
+            lines.extend(
+                data.decode(self.encoding or "utf-8", errors="replace").splitlines()
+            )
+        return lines
+
+    def close(self) -> None:
+        self.index.flush()
+        if self._compressor is not None:
+            self._compressor.join()
+        super().close()
+
+
+def _gzip_file(path: str) -> None:
+    r"""Compress ``path`` to ``path.gz`` and remove the original."""
+    tmp_path = path + ".gz.tmp"
+    with open(path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp_path, path + ".gz")
+    os.remove(path)
@@ -0,0 +1,114 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+import os
+import threading
+from collections import deque
+from typing import Deque, List, Optional
+
+_BLOCK_SIZE = 1 << 16
+
+
+class LogTail:
+    r"""Incremental reader keeping the last lines of a growing log file.
+
+    The first read scans backward from the end of the file until enough
+    lines are found; later reads only consume the bytes appended since the
+    previous read, tracked by a persistent offset. Lines live in a bounded
+    ring buffer, so the cost of a read does not depend on the size of the
+    file. Truncation or replacement of the file resets the cursor.
+
+    Args:
+        path (str): The path of the log file.
+        max_lines (int, optional): The number of lines kept in memory.
+            (default: :obj:`1000`)
+    """
+
+    def __init__(self, path: str, max_lines: int = 1000):
+        self.path = path
+        self.max_lines = max_lines
+        self._lines: Deque[str] = deque(maxlen=max_lines)
+        self._offset: Optional[int] = None
+        self._inode: Optional[int] = None
+        self._partial = b""
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        r"""Forget the cursor and buffered lines; the next read starts again
+        from the end of the file."""
+        with self._lock:
+            self._reset()
+
+    def _reset(self) -> None:
+        self._lines.clear()
+        self._offset = None
+        self._inode = None
+        self._partial = b""
+
+    def _read_backward(self, f, size: int) -> None:
+        r"""Fill the buffer with the last ``max_lines`` complete lines."""
+        chunks: List[bytes] = []
+        newlines = 0
+        position = size
+        while position > 0 and newlines <= self.max_lines:
+            step = min(_BLOCK_SIZE, position)
+            position -= step
+            f.seek(position)
+            chunk = f.read(step)
+            chunks.append(chunk)
+            newlines += chunk.count(b"\n")
+        data = b"".join(reversed(chunks))
+        lines = data.split(b"\n")
+        # Bytes after the last newline are an incomplete line still being
+        # written; keep them until the rest arrives.
+        self._partial = lines.pop()
+        if position > 0:
+            # The first piece may be cut in the middle of a line.
+            lines = lines[1:]
+        for line in lines[-self.max_lines :]:
+            self._lines.append(line.decode("utf-8", errors="replace") + "\n")
+
+    def read(self) -> List[str]:
+        r"""Return the buffered lines after consuming any new content.
+
+        Returns:
+            List[str]: Up to ``max_lines`` most recent lines, oldest first.
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                self._reset()
+                return []
+
+            if (
+                self._offset is None
+                or stat.st_ino != self._inode
+                or stat.st_size < self._offset
+            ):
+                self._reset()
+                with open(self.path, "rb") as f:
+                    self._read_backward(f, stat.st_size)
+                self._offset = stat.st_size
+                self._inode = stat.st_ino
+            elif stat.st_size > self._offset:
+                with open(self.path, "rb") as f:
+                    f.seek(self._offset)
+                    data = self._partial + f.read(stat.st_size - self._offset)
+                self._offset = stat.st_size
+                lines = data.split(b"\n")
+                self._partial = lines.pop()
+                for line in lines[-self.max_lines :]:
+                    self._lines.append(line.decode("utf-8", errors="replace") + "\n")
+
+            return list(self._lines)
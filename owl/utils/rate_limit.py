@@ -0,0 +1,664 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""Provider quotas shared by all the societies of a process, or of several
+processes.
+
+Every society creates its own model backends, so societies running side by
+side each believe they have the whole quota of an API key to themselves and
+together run into bursts of 429 responses and retries. The
+:class:`RateLimiter` wraps the backends created through
+:meth:`ModelFactory.create` so that every request first takes its share
+from token buckets of requests and tokens per minute, set per provider and
+per model. With a database path, the buckets live in SQLite and are shared
+between processes, e.g. the task processes of the benchmark runner.
+
+Limits are usually set in the environment and installed by the examples
+with :func:`install_rate_limits`::
+
+    OWL_RATE_LIMITS='{"azure": {"rpm": 600, "tpm": 150000},
+                      "azure/gpt-4o": {"tpm": 90000}}'
+    OWL_RATE_LIMIT_DB=/tmp/owl_rate_limits.db
+"""
+
+import asyncio
+import email.utils
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+
+from camel.logger import get_logger
+from camel.models import BaseModelBackend, ModelFactory
+
+logger = get_logger(__name__)
+
+# Seconds after which the trailing window of the saturation metrics ends
+METRICS_WINDOW = 60.0
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    r"""The quota of a provider or a model.
+
+    Args:
+        requests_per_minute (Optional[float]): The requests allowed per
+            minute, unlimited if :obj:`None`. (default: :obj:`None`)
+        tokens_per_minute (Optional[float]): The prompt and completion
+            tokens allowed per minute, unlimited if :obj:`None`.
+            (default: :obj:`None`)
+    """
+
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, value: Mapping[str, Any]) -> "RateLimit":
+        r"""Read a limit given as ``{"rpm": ..., "tpm": ...}`` or with the
+        full field names."""
+        return cls(
+            requests_per_minute=value.get("rpm", value.get("requests_per_minute")),
+            tokens_per_minute=value.get("tpm", value.get("tokens_per_minute")),
+        )
+
+
+class _BucketState:
+    r"""The levels of the request and token buckets of one key, and until
+    when the provider asked to be left alone."""
+
+    __slots__ = ("requests", "tokens", "updated", "blocked_until")
+
+    def __init__(
+        self, requests: float, tokens: float, updated: float, blocked_until: float
+    ):
+        self.requests = requests
+        self.tokens = tokens
+        self.updated = updated
+        self.blocked_until = blocked_until
+
+
+# Receives the states of the requested keys, None for new ones, and the time
+_Update = Callable[[Dict[str, Optional[_BucketState]], float], Any]
+
+
+class _MemoryBuckets:
+    r"""Bucket states of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states: Dict[str, _BucketState] = {}
+
+    def update(self, keys: List[str], fn: _Update) -> Any:
+        with self._lock:
+            states = {key: self._states.get(key) for key in keys}
+            result = fn(states, time.time())
+            for key, state in states.items():
+                if state is not None:
+                    self._states[key] = state
+            return result
+
+
+class _SQLiteBuckets:
+    r"""Bucket states shared by the processes using the same database."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, "
+                "requests REAL, tokens REAL, updated REAL, blocked_until REAL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit, transactions are opened explicitly
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def update(self, keys: List[str], fn: _Update) -> Any:
+        conn = self._connect()
+        # Takes the write lock up front, so the read-modify-write of the
+        # buckets is atomic across processes.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            states: Dict[str, Optional[_BucketState]] = {key: None for key in keys}
+            for key in keys:
+                row = conn.execute(
+                    "SELECT requests, tokens, updated, blocked_until FROM buckets "
+                    "WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if row is not None:
+                    states[key] = _BucketState(*row)
+            result = fn(states, time.time())
+            for key, state in states.items():
+                if state is not None:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?, ?)",
+                        (
+                            key,
+                            state.requests,
+                            state.tokens,
+                            state.updated,
+                            state.blocked_until,
+                        ),
+                    )
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class _KeyMetrics:
+    r"""What the requests of one key went through in this process."""
+
+    def __init__(self):
+        self.requests = 0
+        self.tokens = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self.rate_limited = 0
+        self.retry_after_seconds = 0.0
+        # (time, requests, tokens) within the trailing window
+        self.window: Deque[Tuple[float, int, int]] = deque()
+
+    def add(self, now: float, requests: int, tokens: int) -> None:
+        self.requests += requests
+        self.tokens += tokens
+        self.window.append((now, requests, tokens))
+        self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        while self.window and self.window[0][0] < now - METRICS_WINDOW:
+            self.window.popleft()
+
+    def trailing(self, now: float) -> Tuple[int, int]:
+        self._prune(now)
+        return (
+            sum(requests for _, requests, _ in self.window),
+            sum(tokens for _, _, tokens in self.window),
+        )
+
+
+def _retry_after_header(headers: Mapping[str, str]) -> float:
+    r"""Return the delay in the ``Retry-After`` headers of a response, 0 if
+    there is none."""
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return max(0.0, date.timestamp() - time.time())
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    r"""Return the delay asked for by a 429 response, 0 if it asked for
+    none, or :obj:`None` if ``error`` is not a rate limit error."""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", getattr(response, "status_code", None))
+    if status != 429:
+        return None
+    return _retry_after_header(getattr(response, "headers", None) or {})
+
+
+def _model_name(value: Any) -> str:
+    return str(getattr(value, "value", value))
+
+
+class RateLimiter:
+    r"""Token buckets of requests and tokens per minute, per provider and
+    per model.
+
+    A request to a model takes from the buckets of the model, keyed
+    ``"<platform>/<model type>"`` (e.g. ``"azure/gpt-4o"``), and of its
+    provider, keyed ``"<platform>"``, and waits until all of them have
+    enough. The prompt tokens are counted up front, and the bucket is
+    settled with the usage reported in the response. Buckets hold a few
+    seconds of quota, so requests are spread over the minute rather than
+    sent in bursts. Waiting requests are served in arrival order: a request
+    reserves its share at once, possibly taking the bucket into debt, and
+    waits for the debt to be paid off.
+
+    On a 429 response, the request is retried after the delay given by its
+    ``Retry-After`` header, and every request to the provider waits until
+    then, not only the one that was refused.
+
+    Args:
+        limits (Mapping[str, Union[RateLimit, Mapping[str, Any]]]): The
+            limits by provider or provider and model.
+        path (str, optional): The SQLite database holding the buckets, to
+            share them between processes. Kept in memory if :obj:`None`.
+            (default: :obj:`None`)
+        burst_seconds (float, optional): The seconds of quota a full bucket
+            holds. (default: :obj:`10.0`)
+        max_retries (int, optional): The retries of a request answered with
+            429. (default: :obj:`3`)
+        default_backoff (float, optional): The seconds waited after a 429
+            response without ``Retry-After``, doubled for every retry.
+            (default: :obj:`2.0`)
+    """
+
+    def __init__(
+        self,
+        limits: Mapping[str, Union[RateLimit, Mapping[str, Any]]],
+        path: Optional[str] = None,
+        burst_seconds: float = 10.0,
+        max_retries: int = 3,
+        default_backoff: float = 2.0,
+    ):
+        self.limits: Dict[str, RateLimit] = {
+            key: limit if isinstance(limit, RateLimit) else RateLimit.from_dict(limit)
+            for key, limit in limits.items()
+        }
+        self.path = path
+        self.burst_seconds = burst_seconds
+        self.max_retries = max_retries
+        self.default_backoff = default_backoff
+        self._buckets = _SQLiteBuckets(path) if path else _MemoryBuckets()
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _KeyMetrics] = {}
+        self._classes: Dict[type, type] = {}
+        self._original: Optional[Callable[..., BaseModelBackend]] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["RateLimiter"]:
+        r"""Create the limiter configured by ``OWL_RATE_LIMITS``, a JSON
+        object or the path of a JSON file, and ``OWL_RATE_LIMIT_DB``.
+
+        Returns:
+            Optional[RateLimiter]: The limiter, or :obj:`None` if no limit
+                is set.
+        """
+        value = os.environ.get("OWL_RATE_LIMITS", "").strip()
+        if not value:
+            return None
+        if not value.startswith("{"):
+            with open(value, "r", encoding="utf-8") as f:
+                value = f.read()
+        return cls(json.loads(value), path=os.environ.get("OWL_RATE_LIMIT_DB") or None)
+
+    def _keys(self, platform: str, model: str) -> List[str]:
+        return [f"{platform}/{model}", platform]
+
+    def _metrics_of(self, key: str) -> _KeyMetrics:
+        with self._lock:
+            return self._metrics.setdefault(key, _KeyMetrics())
+
+    def _refill(
+        self, key: str, state: Optional[_BucketState], now: float
+    ) -> _BucketState:
+        limit = self.limits.get(key, RateLimit())
+        requests_capacity = (limit.requests_per_minute or 0) / 60 * self.burst_seconds
+        tokens_capacity = (limit.tokens_per_minute or 0) / 60 * self.burst_seconds
+        if state is None:
+            return _BucketState(requests_capacity, tokens_capacity, now, 0.0)
+        elapsed = max(0.0, now - state.updated)
+        if limit.requests_per_minute:
+            state.requests = min(
+                requests_capacity,
+                state.requests + elapsed * limit.requests_per_minute / 60,
+            )
+        if limit.tokens_per_minute:
+            state.tokens = min(
+                tokens_capacity, state.tokens + elapsed * limit.tokens_per_minute / 60
+            )
+        state.updated = now
+        return state
+
+    def reserve(self, platform: str, model: str, tokens: int) -> float:
+        r"""Take one request and ``tokens`` tokens from the buckets of a
+        model and its provider.
+
+        Returns:
+            float: The seconds to wait before sending the request.
+        """
+        keys = self._keys(platform, model)
+
+        def take(states: Dict[str, Optional[_BucketState]], now: float) -> float:
+            wait = 0.0
+            for key in keys:
+                state = states[key] = self._refill(key, states[key], now)
+                limit = self.limits.get(key)
+                wait = max(wait, state.blocked_until - now)
+                if limit is None:
+                    continue
+                if limit.requests_per_minute:
+                    state.requests -= 1
+                    wait = max(wait, -state.requests * 60 / limit.requests_per_minute)
+                if limit.tokens_per_minute:
+                    state.tokens -= tokens
+                    wait = max(wait, -state.tokens * 60 / limit.tokens_per_minute)
+            return wait
+
+        wait = self._buckets.update(keys, take)
+        now = time.time()
+        for key in keys:
+            metrics = self._metrics_of(key)
+            with self._lock:
+                metrics.add(now, 1, tokens)
+                if wait > 0:
+                    metrics.throttled += 1
+                    metrics.wait_seconds += wait
+        return wait
+
+    def settle(self, platform: str, model: str, tokens: int, requests: int = 0) -> None:
+        r"""Correct the tokens taken by a request by ``tokens``, e.g. the
+        completion tokens, once its usage is known, and the requests taken
+        by ``requests``. Negative amounts are given back, e.g. for a request
+        refused before it was served."""
+        if not tokens and not requests:
+            return
+        keys = self._keys(platform, model)
+
+        def correct(states: Dict[str, Optional[_BucketState]], now: float) -> None:
+            for key in keys:
+                state = states[key] = self._refill(key, states[key], now)
+                limit = self.limits.get(key, RateLimit())
+                if limit.requests_per_minute:
+                    state.requests -= requests
+                if limit.tokens_per_minute:
+                    state.tokens -= tokens
+
+        self._buckets.update(keys, correct)
+        now = time.time()
+        for key in keys:
+            metrics = self._metrics_of(key)
+            with self._lock:
+                metrics.add(now, requests, tokens)
+
+    def block(self, platform: str, model: str, seconds: float) -> None:
+        r"""Hold back every request to a provider for ``seconds``, as asked
+        by a 429 response."""
+        keys = self._keys(platform, model)
+
+        def hold(states: Dict[str, Optional[_BucketState]], now: float) -> None:
+            for key in keys:
+                state = states[key] = self._refill(key, states[key], now)
+                state.blocked_until = max(state.blocked_until, now + seconds)
+
+        self._buckets.update(keys, hold)
+        for key in keys:
+            metrics = self._metrics_of(key)
+            with self._lock:
+                metrics.rate_limited += 1
+                metrics.retry_after_seconds += seconds
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        r"""Return what the requests of this process went through, by key.
+
+        The saturation of a key is the share of its per-minute limit used
+        over the last minute; close to 1 means requests are being held back
+        by the limiter.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The requests, tokens, throttled
+                requests and seconds waited, 429 responses and seconds they
+                asked to wait, and the request and token saturation.
+        """
+        now = time.time()
+        stats = {}
+        with self._lock:
+            for key, metrics in sorted(self._metrics.items()):
+                requests, tokens = metrics.trailing(now)
+                limit = self.limits.get(key, RateLimit())
+                stats[key] = {
+                    "requests": metrics.requests,
+                    "tokens": metrics.tokens,
+                    "throttled": metrics.throttled,
+                    "wait_seconds": round(metrics.wait_seconds, 3),
+                    "rate_limited": metrics.rate_limited,
+                    "retry_after_seconds": round(metrics.retry_after_seconds, 3),
+                    "request_saturation": (
+                        round(requests / limit.requests_per_minute, 3)
+                        if limit.requests_per_minute
+                        else None
+                    ),
+                    "token_saturation": (
+                        round(tokens / limit.tokens_per_minute, 3)
+                        if limit.tokens_per_minute
+                        else None
+                    ),
+                }
+        return stats
+
+    @staticmethod
+    def _prompt_tokens(backend: BaseModelBackend, messages: List[Any]) -> int:
+        try:
+            return backend.count_tokens_from_messages(messages)
+        except Exception:
+            # Roughly four characters per token
+            return (
+                sum(len(str(message.get("content") or "")) for message in messages) // 4
+            )
+
+    def _backoff(self, error: Exception, attempt: int) -> Optional[float]:
+        r"""Return the seconds to wait before retrying after ``error``, or
+        :obj:`None` if it is not to be retried."""
+        delay = _retry_after(error)
+        if delay is None or attempt >= self.max_retries:
+            return None
+        return delay or self.default_backoff * 2**attempt
+
+    @staticmethod
+    def _completion_tokens(response: Any) -> Optional[int]:
+        usage = getattr(response, "usage", None)
+        return getattr(usage, "completion_tokens", None)
+
+    def _before(
+        self, backend: BaseModelBackend, messages: List[Any]
+    ) -> Tuple[int, float]:
+        platform, model = backend._owl_rate_limit_key
+        tokens = self._prompt_tokens(backend, messages)
+        wait = self.reserve(platform, model, tokens)
+        if wait > 0:
+            logger.debug(f"Holding a request to {platform}/{model} for {wait:.2f}s")
+        return tokens, wait
+
+    def _after(self, backend: BaseModelBackend, tokens: int, response: Any) -> None:
+        completion_tokens = self._completion_tokens(response)
+        if completion_tokens is not None:
+            platform, model = backend._owl_rate_limit_key
+            prompt_tokens = getattr(response.usage, "prompt_tokens", None) or tokens
+            self.settle(platform, model, prompt_tokens - tokens + completion_tokens)
+
+    def _refused(
+        self, backend: BaseModelBackend, tokens: int, error: Exception, attempt: int
+    ) -> None:
+        delay = self._backoff(error, attempt)
+        if delay is None:
+            raise error
+        platform, model = backend._owl_rate_limit_key
+        # The retry reserves its share again; give back the refused one
+        self.settle(platform, model, -tokens, requests=-1)
+        logger.warning(
+            f"Rate limited by {platform}/{model}, retrying in {delay:.2f}s "
+            f"({attempt + 1}/{self.max_retries})"
+        )
+        self.block(platform, model, delay)
+
+    def _limited_class(self, cls: Type[BaseModelBackend]) -> type:
+        with self._lock:
+            limited = self._classes.get(cls)
+            if limited is not None:
+                return limited
+        limiter = self
+
+        # Overrides _run rather than run, so copies of the backend made by
+        # other wrappers, such as streaming_backend, stay limited.
+        class Limited(cls):  # type: ignore[valid-type, misc]
+            def _run(self, messages, response_format=None, tools=None):
+                attempt = 0
+                while True:
+                    tokens, wait = limiter._before(self, messages)
+                    if wait > 0:
+                        time.sleep(wait)
+                    try:
+                        response = super()._run(messages, response_format, tools)
+                    except Exception as e:
+                        limiter._refused(self, tokens, e, attempt)
+                        attempt += 1
+                        continue
+                    limiter._after(self, tokens, response)
+                    return response
+
+            async def _arun(self, messages, response_format=None, tools=None):
+                attempt = 0
+                while True:
+                    tokens, wait = limiter._before(self, messages)
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    try:
+                        response = await super()._arun(messages, response_format, tools)
+                    except Exception as e:
+                        limiter._refused(self, tokens, e, attempt)
+                        attempt += 1
+                        continue
+                    limiter._after(self, tokens, response)
+                    return response
+
+        Limited.__name__ = Limited.__qualname__ = f"RateLimited{cls.__name__}"
+        Limited.__module__ = cls.__module__
+        with self._lock:
+            return self._classes.setdefault(cls, Limited)
+
+    def wrap(
+        self, backend: BaseModelBackend, platform: Any, model: Any
+    ) -> BaseModelBackend:
+        r"""Make the requests of ``backend`` go through the limiter.
+
+        Args:
+            backend (BaseModelBackend): The backend, limited in place.
+            platform (Any): Its platform, e.g. :obj:`ModelPlatformType.AZURE`.
+            model (Any): Its model type.
+
+        Returns:
+            BaseModelBackend: The backend.
+        """
+        limited = getattr(backend, "_owl_rate_limit_key", None) is not None
+        backend._owl_rate_limit_key = (_model_name(platform), _model_name(model))
+        if not limited:
+            backend.__class__ = self._limited_class(type(backend))
+            self._watch_responses(backend)
+        return backend
+
+    def _watch_responses(self, backend: BaseModelBackend) -> None:
+        r"""Hold back every request to the provider of ``backend`` on each
+        429 response its HTTP clients get.
+
+        The OpenAI clients retry 429 responses on their own, after the
+        delay the provider asked for, so most of them never reach
+        :meth:`_refused`; the other requests to the provider must wait too.
+        """
+
+        def observe(response: Any) -> None:
+            if response.status_code == 429:
+                platform, model = backend._owl_rate_limit_key
+                delay = _retry_after_header(response.headers)
+                self.block(platform, model, delay or self.default_backoff)
+
+        async def aobserve(response: Any) -> None:
+            observe(response)
+
+        for name, hook in (("_client", observe), ("_async_client", aobserve)):
+            http_client = getattr(getattr(backend, name, None), "_client", None)
+            hooks = getattr(http_client, "event_hooks", None)
+            if not isinstance(hooks, dict):
+                continue
+            hooks["response"] = [*hooks.get("response", []), hook]
+            http_client.event_hooks = hooks
+
+    def install(self) -> None:
+        r"""Limit every backend created by :meth:`ModelFactory.create`."""
+        with self._lock:
+            if self._original is not None:
+                return
+            original = ModelFactory.create
+            self._original = original
+
+        def create(*args: Any, **kwargs: Any) -> BaseModelBackend:
+            backend = original(*args, **kwargs)
+            platform = kwargs.get("model_platform", args[0] if args else None)
+            model = kwargs.get("model_type", args[1] if len(args) > 1 else None)
+            return self.wrap(backend, platform, model)
+
+        ModelFactory.create = staticmethod(create)
+        ModelFactory._owl_rate_limiter = self
+
+    def uninstall(self) -> None:
+        r"""Restore the original :meth:`ModelFactory.create`. Backends
+        created in the meantime stay limited."""
+        with self._lock:
+            if self._original is None:
+                return
+            ModelFactory.create = staticmethod(self._original)
+            self._original = None
+            if getattr(ModelFactory, "_owl_rate_limiter", None) is self:
+                del ModelFactory._owl_rate_limiter
+
+
+def install_rate_limits() -> Optional[RateLimiter]:
+    r"""Install the limiter configured in the environment, once per process.
+
+    See :meth:`RateLimiter.from_env`.
+
+    Returns:
+        Optional[RateLimiter]: The installed limiter, or :obj:`None` if no
+            limit is set.
+    """
+    limiter = installed_rate_limiter()
+    if limiter is not None:
+        return limiter
+    limiter = RateLimiter.from_env()
+    if limiter is not None:
+        limiter.install()
+        logger.info(f"Rate limits installed for {', '.join(limiter.limits)}")
+    return limiter
+
+
+def installed_rate_limiter() -> Optional[RateLimiter]:
+    r"""Return the limiter installed in this process, if any."""
+    # Kept on ModelFactory, since this module may be imported both as
+    # owl.utils.rate_limit and as utils.rate_limit.
+    return getattr(ModelFactory, "_owl_rate_limiter", None)
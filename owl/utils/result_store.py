@@ -0,0 +1,161 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""Append-only store of benchmark results.
+
+Every result is one line of a JSON Lines file, written with a single
+``write`` and flushed, so a crash loses at most the result being written.
+Chat histories, which dominate the size of a result, go to a side file; the
+result line only keeps the byte range of its history. The store keeps an
+in-memory index by task id, so checking whether a task is done and saving a
+result both take constant time however many results there are.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from camel.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ResultStore:
+    r"""Benchmark results indexed by task id.
+
+    A task that is stored again, e.g. after being re-run, replaces its
+    previous result; both lines stay in the file and the last one wins when
+    the file is loaded.
+
+    Args:
+        path (Optional[str]): The JSON Lines file of the results. Histories
+            are stored in ``{path}.histories.jsonl``. A file in the former
+            format, a single JSON array, is converted on first use. With
+            :obj:`None`, results are only kept in memory.
+            (default: :obj:`None`)
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.history_path = f"{path}.histories.jsonl" if path else None
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._histories: Dict[str, Any] = {}
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+        if data.lstrip().startswith(b"["):
+            self._migrate(json.loads(data))
+            return
+        # Drop a line left incomplete by a crash, so that the next append
+        # starts on a line of its own.
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            logger.warning(f"Discarding incomplete last result in {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(complete)
+        for line in data[:complete].splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            self._index[record["task_id"]] = record
+
+    def _migrate(self, results: List[Dict[str, Any]]) -> None:
+        logger.info(f"Converting {self.path} to JSON Lines")
+        legacy_path = self.path + ".bak"
+        os.replace(self.path, legacy_path)
+        for result in results:
+            self.add(result)
+        logger.info(f"Previous results kept in {legacy_path}")
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def add(self, result: Dict[str, Any]) -> None:
+        r"""Store a result.
+
+        Args:
+            result (Dict[str, Any]): The result, with a ``task_id`` and
+                optionally a ``history``, which is moved to the side file.
+        """
+        record = {k: v for k, v in result.items() if k != "history"}
+        history = result.get("history")
+        task_id = record["task_id"]
+        with self._lock:
+            if self.path is None:
+                if history is not None:
+                    self._histories[task_id] = history
+                self._index[task_id] = record
+                return
+            if history is not None:
+                # The history is written first, so that a result line never
+                # points to a history that is not there.
+                offset, length = _append_line(
+                    self.history_path,
+                    json.dumps(
+                        {"task_id": task_id, "history": history}, ensure_ascii=False
+                    ),
+                )
+                record["history_offset"] = offset
+                record["history_length"] = length
+            _append_line(self.path, json.dumps(record, ensure_ascii=False))
+            self._index[task_id] = record
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        r"""Return the result of a task, without its history."""
+        return self._index.get(task_id)
+
+    def history(self, task_id: str) -> Optional[List[Dict[str, Any]]]:
+        r"""Load the chat history of a task from the side file."""
+        record = self._index.get(task_id)
+        if record is None:
+            return None
+        if self.path is None:
+            return self._histories.get(task_id)
+        if "history_offset" not in record:
+            return None
+        with open(self.history_path, "rb") as f:
+            f.seek(record["history_offset"])
+            line = f.read(record["history_length"])
+        return json.loads(line)["history"]
+
+    def records(self) -> List[Dict[str, Any]]:
+        r"""Return the results without histories, in the order in which the
+        tasks were first stored."""
+        return list(self._index.values())
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.records())
+
+
+def _append_line(path: str, line: str) -> Tuple[int, int]:
+    r"""Append one line with a single write and return its byte range."""
+    data = (line + "\n").encode("utf-8")
+    with open(path, "ab") as f:
+        offset = f.tell()
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return offset, len(data)
@@ -0,0 +1,411 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""SQLite store of past society runs with full-text search and reuse of
+answers to repeated questions."""
+
+import difflib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from camel.logger import get_logger
+
+logger = get_logger(__name__)
+
+_WORDS = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL UNIQUE,
+    question TEXT NOT NULL,
+    question_hash TEXT NOT NULL,
+    module TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    history BLOB,
+    rounds INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    reused_from TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_question ON runs (question_hash, module, created_at);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created_at);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS runs_fts USING fts5(
+    question, answer, content='runs', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS runs_fts_insert AFTER INSERT ON runs BEGIN
+    INSERT INTO runs_fts (rowid, question, answer)
+    VALUES (new.id, new.question, new.answer);
+END;
+CREATE TRIGGER IF NOT EXISTS runs_fts_delete AFTER DELETE ON runs BEGIN
+    INSERT INTO runs_fts (runs_fts, rowid, question, answer)
+    VALUES ('delete', old.id, old.question, old.answer);
+END;
+"""
+
+
+def normalize_question(question: str) -> str:
+    r"""Lowercase a question and collapse punctuation and whitespace, so
+    that trivially different spellings compare equal."""
+    return " ".join(_WORDS.findall(question.lower()))
+
+
+# Words whose presence or absence does not change what a question asks
+_FILLER_WORDS = frozenset(
+    "a an the please could can would you tell me kindly i want to know "
+    "what s is are was were do does".split()
+)
+
+
+def content_words(normalized: str) -> List[str]:
+    r"""Return the words of a normalized question that carry its meaning:
+    everything but a few filler words, in order."""
+    return [word for word in normalized.split() if word not in _FILLER_WORDS]
+
+
+def question_similarity(a: str, b: str) -> float:
+    r"""Similarity in ``[0, 1]`` of two normalized questions."""
+    if a == b:
+        return 1.0
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+@dataclass
+class ReusePolicy:
+    r"""When a stored answer may be served instead of running a society.
+
+    Args:
+        enabled (bool, optional): Whether answers are reused at all.
+            (default: :obj:`False`)
+        max_age (float, optional): The maximum age of a reused run in
+            seconds, or :obj:`None` for no limit. (default: :obj:`86400`)
+        min_similarity (float, optional): The similarity of the normalized
+            questions required for a near-duplicate; ``1.0`` only reuses
+            exact repeats. Below that, near-duplicates must still have the
+            same :func:`content_words`, so questions differing in a number,
+            a date or a name never match. (default: :obj:`1.0`)
+        same_module (bool, optional): Whether the stored run must have used
+            the same module. (default: :obj:`True`)
+    """
+
+    enabled: bool = False
+    max_age: Optional[float] = 86400
+    min_similarity: float = 1.0
+    same_module: bool = True
+
+    @classmethod
+    def from_env(cls, prefix: str = "OWL_REUSE") -> "ReusePolicy":
+        r"""Read the policy from ``{prefix}_ANSWERS``, ``{prefix}_MAX_AGE``
+        and ``{prefix}_SIMILARITY``."""
+        max_age = os.environ.get(f"{prefix}_MAX_AGE", "86400")
+        return cls(
+            enabled=os.environ.get(f"{prefix}_ANSWERS", "false").lower() == "true",
+            max_age=float(max_age) if max_age else None,
+            min_similarity=float(os.environ.get(f"{prefix}_SIMILARITY", "1.0")),
+        )
+
+
+@dataclass
+class RunRecord:
+    r"""A stored society run."""
+
+    run_id: str
+    question: str
+    module: str
+    answer: str
+    rounds: int
+    prompt_tokens: int
+    completion_tokens: int
+    created_at: float
+    reused_from: Optional[str] = None
+    similarity: float = 1.0
+    snippet: str = ""
+    _history: Optional[bytes] = field(default=None, repr=False)
+
+    @property
+    def chat_history(self) -> List[dict]:
+        r"""The chat history of the run, decompressed on access."""
+        if not self._history:
+            return []
+        return json.loads(zlib.decompress(self._history).decode("utf-8"))
+
+    @property
+    def token_info(self) -> Dict[str, int]:
+        return {
+            "completion_token_count": self.completion_tokens,
+            "prompt_token_count": self.prompt_tokens,
+        }
+
+
+class RunHistory:
+    r"""Indexed SQLite store of society runs.
+
+    Every run keeps its question, module, answer, token usage and its chat
+    history compressed with zlib. Questions and answers are indexed with
+    FTS5 for search and for finding near-duplicate questions; when the
+    SQLite build lacks FTS5, searches fall back to ``LIKE`` scans.
+
+    Args:
+        path (str): The database file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        try:
+            self._conn.executescript(_FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            logger.warning("SQLite has no FTS5, run search falls back to LIKE")
+            self.has_fts = False
+        self._conn.commit()
+
+    def record(
+        self,
+        question: str,
+        module: str,
+        answer: str,
+        chat_history: Optional[List[dict]] = None,
+        token_info: Optional[Dict[str, int]] = None,
+        run_id: Optional[str] = None,
+        reused_from: Optional[str] = None,
+    ) -> str:
+        r"""Store a run and return its id.
+
+        Args:
+            question (str): The question of the run.
+            module (str): The module that built the society.
+            answer (str): The final answer.
+            chat_history (List[dict], optional): The chat history returned
+                by :func:`run_society`. (default: :obj:`None`)
+            token_info (Dict[str, int], optional): The token usage returned
+                by :func:`run_society`. (default: :obj:`None`)
+            run_id (str, optional): The id of the run. A random id is used
+                when not given. (default: :obj:`None`)
+            reused_from (str, optional): The run whose answer was served.
+                (default: :obj:`None`)
+
+        Returns:
+            str: The id of the run.
+        """
+        run_id = run_id or uuid.uuid4().hex
+        token_info = token_info or {}
+        history = (
+            zlib.compress(
+                json.dumps(chat_history, ensure_ascii=False, default=str).encode(
+                    "utf-8"
+                )
+            )
+            if chat_history
+            else None
+        )
+        normalized = normalize_question(question)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, question, question_hash, module, answer,"
+                " history, rounds, prompt_tokens, completion_tokens, reused_from,"
+                " created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_id,
+                    question,
+                    hashlib.sha1(normalized.encode("utf-8")).hexdigest(),
+                    module,
+                    answer or "",
+                    history,
+                    len(chat_history or []),
+                    token_info.get("prompt_token_count", 0),
+                    token_info.get("completion_token_count", 0),
+                    reused_from,
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+        return run_id
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row, **extra: Any) -> RunRecord:
+        return RunRecord(
+            run_id=row["run_id"],
+            question=row["question"],
+            module=row["module"],
+            answer=row["answer"],
+            rounds=row["rounds"],
+            prompt_tokens=row["prompt_tokens"],
+            completion_tokens=row["completion_tokens"],
+            created_at=row["created_at"],
+            reused_from=row["reused_from"],
+            _history=row["history"],
+            **extra,
+        )
+
+    def get(self, run_id: str) -> Optional[RunRecord]:
+        r"""Return the run with the given id, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+        return self._to_record(row) if row else None
+
+    def find_reusable(
+        self, question: str, module: str, policy: ReusePolicy
+    ) -> Optional[RunRecord]:
+        r"""Find a stored run whose answer may be served for ``question``.
+
+        Exact repeats (after normalization) are found through the question
+        hash index; near-duplicates are looked up among the best full-text
+        matches, must have the same :func:`content_words` and are compared
+        with :func:`question_similarity`. Runs that
+        were themselves served from the store, or that produced no answer,
+        are never reused.
+
+        Args:
+            question (str): The new question.
+            module (str): The module the new question would run with.
+            policy (ReusePolicy): The reuse policy.
+
+        Returns:
+            Optional[RunRecord]: The most similar, then most recent,
+                matching run, or :obj:`None`.
+        """
+        if not policy.enabled:
+            return None
+        normalized = normalize_question(question)
+        conditions = ["runs.answer != ''", "runs.reused_from IS NULL"]
+        params: List[Any] = []
+        if policy.same_module:
+            conditions.append("runs.module = ?")
+            params.append(module)
+        if policy.max_age is not None:
+            conditions.append("runs.created_at >= ?")
+            params.append(time.time() - policy.max_age)
+        where = " AND ".join(conditions)
+
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT * FROM runs WHERE runs.question_hash = ? AND {where}"
+                " ORDER BY created_at DESC LIMIT 1",
+                [hashlib.sha1(normalized.encode("utf-8")).hexdigest(), *params],
+            ).fetchone()
+            if row is not None or policy.min_similarity >= 1.0:
+                return self._to_record(row) if row else None
+            candidates = self._candidates(normalized, where, params, limit=20)
+
+        best: Optional[RunRecord] = None
+        words = content_words(normalized)
+        for candidate in candidates:
+            stored = normalize_question(candidate["question"])
+            # A similar wording is not enough: "... 2010 census?" and
+            # "... 2011 census?" are 98% similar but ask different things.
+            if content_words(stored) != words:
+                continue
+            similarity = question_similarity(normalized, stored)
+            if similarity >= policy.min_similarity and (
+                best is None or similarity > best.similarity
+            ):
+                best = self._to_record(candidate, similarity=similarity)
+        return best
+
+    def _candidates(
+        self, normalized: str, where: str, params: List[Any], limit: int
+    ) -> List[sqlite3.Row]:
+        # Called with the lock held.
+        words = list(dict.fromkeys(normalized.split()))
+        if not words:
+            return []
+        if self.has_fts:
+            match = "question : (" + " OR ".join(f'"{w}"' for w in words) + ")"
+            return self._conn.execute(
+                "SELECT runs.* FROM runs_fts JOIN runs ON runs.id = runs_fts.rowid"
+                f" WHERE runs_fts MATCH ? AND {where}"
+                " ORDER BY bm25(runs_fts) LIMIT ?",
+                [match, *params, limit],
+            ).fetchall()
+        return self._conn.execute(
+            f"SELECT * FROM runs WHERE question LIKE ? AND {where}"
+            " ORDER BY created_at DESC LIMIT ?",
+            [f"%{max(words, key=len)}%", *params, limit],
+        ).fetchall()
+
+    def search(
+        self, query: str, limit: int = 20, module: Optional[str] = None
+    ) -> List[RunRecord]:
+        r"""Full-text search over the questions and answers of past runs.
+
+        Args:
+            query (str): Words to search for; every word must match.
+            limit (int, optional): The maximum number of results.
+                (default: :obj:`20`)
+            module (str, optional): Only return runs of this module.
+                (default: :obj:`None`)
+
+        Returns:
+            List[RunRecord]: The best matching runs, with a highlighted
+                ``snippet`` of the matching text.
+        """
+        words = normalize_question(query).split()
+        if not words:
+            return self.recent(limit, module)
+        module_filter = " AND runs.module = ?" if module else ""
+        extra = [module] if module else []
+        with self._lock:
+            if self.has_fts:
+                rows = self._conn.execute(
+                    "SELECT runs.*, snippet(runs_fts, -1, '**', '**', '...', 12)"
+                    " AS snippet FROM runs_fts JOIN runs ON runs.id = runs_fts.rowid"
+                    f" WHERE runs_fts MATCH ?{module_filter}"
+                    " ORDER BY bm25(runs_fts) LIMIT ?",
+                    [" ".join(f'"{word}"' for word in words), *extra, limit],
+                ).fetchall()
+                return [self._to_record(r, snippet=r["snippet"]) for r in rows]
+            conditions = " AND ".join(
+                "(runs.question LIKE ? OR runs.answer LIKE ?)" for _ in words
+            )
+            rows = self._conn.execute(
+                f"SELECT * FROM runs WHERE {conditions}{module_filter}"
+                " ORDER BY created_at DESC LIMIT ?",
+                [p for word in words for p in (f"%{word}%",) * 2] + extra + [limit],
+            ).fetchall()
+        return [self._to_record(r) for r in rows]
+
+    def recent(self, limit: int = 20, module: Optional[str] = None) -> List[RunRecord]:
+        r"""Return the most recent runs."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM runs"
+                + (" WHERE module = ?" if module else "")
+                + " ORDER BY created_at DESC LIMIT ?",
+                ([module] if module else []) + [limit],
+            ).fetchall()
+        return [self._to_record(r) for r in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
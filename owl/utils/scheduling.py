@@ -0,0 +1,225 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""Makespan-aware scheduling of benchmark tasks.
+
+Submitting tasks in dataset order leaves the longest ones, typically of
+level 3, for the end of a sweep while the other workers sit idle. The
+:class:`CostModel` estimates how long a task will take from its level, the
+type of its attachment and the durations recorded by past runs, and the
+:class:`WorkStealingScheduler` hands out the longest tasks first, letting
+workers that run out of tasks take over those queued for the others.
+"""
+
+import statistics
+import threading
+from collections import deque
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+# Expected seconds per level when nothing has been recorded
+DEFAULT_LEVEL_COST = {1: 180.0, 2: 360.0, 3: 720.0}
+
+# Slowdown caused by the tools needed to process each type of attachment
+DEFAULT_ATTACHMENT_FACTOR = {
+    "none": 1.0,
+    "image": 1.2,
+    "document": 1.3,
+    "table": 1.3,
+    "code": 1.1,
+    "audio": 1.5,
+    "video": 2.0,
+    "archive": 1.5,
+    "other": 1.2,
+}
+
+_ATTACHMENT_KINDS = {
+    "image": {".jpg", ".jpeg", ".png", ".gif", ".webp"},
+    "document": {".pdf", ".docx", ".doc", ".txt", ".pptx", ".md", ".json"},
+    "table": {".xlsx", ".xls", ".csv"},
+    "code": {".py"},
+    "audio": {".mp3", ".wav", ".m4a"},
+    "video": {".mp4", ".mov", ".avi"},
+    "archive": {".zip"},
+}
+
+
+def attachment_kind(task: Mapping[str, Any]) -> str:
+    r"""Classify the attachment of a GAIA task by file extension."""
+    file_name = task.get("file_name")
+    if not file_name:
+        return "none"
+    suffix = Path(str(file_name)).suffix.lower()
+    for kind, suffixes in _ATTACHMENT_KINDS.items():
+        if suffix in suffixes:
+            return kind
+    return "other"
+
+
+class CostModel:
+    r"""Expected duration of GAIA tasks.
+
+    A task that has been run before is expected to take the mean of its
+    recorded durations. Otherwise the mean duration of recorded tasks of the
+    same level and attachment type is used, then that of the same level
+    scaled by the attachment factor, and finally the defaults.
+
+    Args:
+        level_cost (Dict[int, float], optional): The expected seconds per
+            level without records. (default: :obj:`DEFAULT_LEVEL_COST`)
+        attachment_factor (Dict[str, float], optional): The slowdown per
+            attachment type. (default: :obj:`DEFAULT_ATTACHMENT_FACTOR`)
+        min_samples (int, optional): The number of records needed before the
+            mean of a group replaces the defaults. (default: :obj:`3`)
+    """
+
+    def __init__(
+        self,
+        level_cost: Optional[Dict[int, float]] = None,
+        attachment_factor: Optional[Dict[str, float]] = None,
+        min_samples: int = 3,
+    ):
+        self.level_cost = dict(level_cost or DEFAULT_LEVEL_COST)
+        self.attachment_factor = dict(attachment_factor or DEFAULT_ATTACHMENT_FACTOR)
+        self.min_samples = min_samples
+        self._by_task: Dict[str, float] = {}
+        self._by_group: Dict[Tuple[int, str], float] = {}
+        self._by_level: Dict[int, float] = {}
+
+    def fit(
+        self,
+        records: Iterable[Mapping[str, Any]],
+        tasks: Mapping[str, Mapping[str, Any]],
+    ) -> "CostModel":
+        r"""Learn from the durations of past runs.
+
+        Args:
+            records (Iterable[Mapping[str, Any]]): Result records with a
+                ``task_id`` and a ``duration`` in seconds; others are
+                ignored.
+            tasks (Mapping[str, Mapping[str, Any]]): The dataset records by
+                task id, for the level and attachment of each record.
+
+        Returns:
+            CostModel: This model.
+        """
+        by_task: Dict[str, List[float]] = {}
+        by_group: Dict[Tuple[int, str], List[float]] = {}
+        by_level: Dict[int, List[float]] = {}
+        for record in records:
+            duration = record.get("duration")
+            task = tasks.get(record.get("task_id"))
+            if not duration or task is None:
+                continue
+            level = int(task["Level"])
+            kind = attachment_kind(task)
+            by_task.setdefault(record["task_id"], []).append(duration)
+            by_group.setdefault((level, kind), []).append(duration)
+            # Normalized, so that levels estimate tasks of any attachment
+            by_level.setdefault(level, []).append(
+                duration / self.attachment_factor.get(kind, 1.0)
+            )
+        self._by_task = {k: statistics.mean(v) for k, v in by_task.items()}
+        self._by_group = {
+            k: statistics.mean(v)
+            for k, v in by_group.items()
+            if len(v) >= self.min_samples
+        }
+        self._by_level = {
+            k: statistics.mean(v)
+            for k, v in by_level.items()
+            if len(v) >= self.min_samples
+        }
+        return self
+
+    def estimate(self, task: Mapping[str, Any]) -> float:
+        r"""Return the expected duration of a task in seconds."""
+        if task.get("task_id") in self._by_task:
+            return self._by_task[task["task_id"]]
+        level = int(task.get("Level", 1))
+        kind = attachment_kind(task)
+        if (level, kind) in self._by_group:
+            return self._by_group[(level, kind)]
+        base = self._by_level.get(
+            level, self.level_cost.get(level, max(self.level_cost.values()))
+        )
+        return base * self.attachment_factor.get(kind, 1.0)
+
+
+class WorkStealingScheduler(Generic[T]):
+    r"""Longest-expected-first distribution of tasks over workers.
+
+    Tasks are assigned up front with the LPT rule: longest first, each to
+    the worker with the least expected work so far, and every worker runs
+    its own queue longest first. A worker whose queue is empty steals the
+    longest queued task of the worker with the most expected work left,
+    so estimation errors do not leave workers idle at the end of a sweep.
+
+    Args:
+        items (Sequence[T]): The tasks.
+        workers (int): The number of workers.
+        cost (Callable[[T], float]): The expected duration of a task.
+    """
+
+    def __init__(self, items: Sequence[T], workers: int, cost: Callable[[T], float]):
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._queues: List[Deque[Tuple[float, T]]] = [
+            deque() for _ in range(self.workers)
+        ]
+        self._load = [0.0] * self.workers
+        self.steals = 0
+        for expected, item in sorted(
+            ((cost(item), item) for item in items), key=lambda pair: -pair[0]
+        ):
+            worker = min(range(self.workers), key=self._load.__getitem__)
+            self._queues[worker].append((expected, item))
+            self._load[worker] += expected
+        self.expected_makespan = max(self._load)
+
+    def next(self, worker: int) -> Optional[T]:
+        r"""Return the next task of a worker, stealing one if its own queue
+        is empty, or :obj:`None` when no task is left."""
+        with self._lock:
+            queue = self._queues[worker]
+            if queue:
+                expected, item = queue.popleft()
+                self._load[worker] -= expected
+                return item
+            victims = [w for w in range(self.workers) if self._queues[w]]
+            if not victims:
+                return None
+            victim = max(victims, key=self._load.__getitem__)
+            expected, item = self._queues[victim].popleft()
+            self._load[victim] -= expected
+            self.steals += 1
+            return item
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(queue) for queue in self._queues)
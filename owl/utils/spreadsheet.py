@@ -0,0 +1,403 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""Streaming column profiles and Parquet caching for spreadsheets."""
+
+import datetime
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from camel.logger import get_logger
+
+logger = get_logger(__name__)
+
+_MAX_TRACKED_VALUES = 10000
+_MAX_CELL_CHARS = 200
+_PARQUET_BATCH_ROWS = 10000
+
+
+def _cell_type(value: Any) -> str:
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return "datetime"
+    return "string"
+
+
+def _is_null(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, float) and value != value:
+        return True
+    return isinstance(value, str) and not value.strip()
+
+
+def _display(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, str) and len(value) > _MAX_CELL_CHARS:
+        return value[:_MAX_CELL_CHARS] + "..."
+    return value
+
+
+class ColumnProfile:
+    r"""Single-pass accumulator for the statistics of one column.
+
+    Args:
+        name (str): The column header.
+        top_k (int, optional): The number of most frequent values to report.
+            (default: :obj:`5`)
+    """
+
+    def __init__(self, name: str, top_k: int = 5):
+        self.name = name
+        self.top_k = top_k
+        self.count = 0
+        self.nulls = 0
+        self.types: Counter = Counter()
+        self.minimum: Any = None
+        self.maximum: Any = None
+        self.values: Counter = Counter()
+        self.values_truncated = False
+
+    def add(self, value: Any) -> None:
+        self.count += 1
+        if _is_null(value):
+            self.nulls += 1
+            return
+        kind = _cell_type(value)
+        self.types[kind] += 1
+        if kind in ("number", "datetime"):
+            try:
+                if self.minimum is None or value < self.minimum:
+                    self.minimum = value
+                if self.maximum is None or value > self.maximum:
+                    self.maximum = value
+            except TypeError:
+                # Mixed numbers and dates are not comparable.
+                pass
+        # Distinct values are only tracked up to a cap so that high
+        # cardinality columns (ids, free text) keep memory bounded.
+        if value in self.values or len(self.values) < _MAX_TRACKED_VALUES:
+            self.values[value] += 1
+        else:
+            self.values_truncated = True
+
+    def as_dict(self) -> Dict[str, Any]:
+        dominant = self.types.most_common(1)[0][0] if self.types else "empty"
+        return {
+            "name": self.name,
+            "type": dominant if len(self.types) <= 1 else f"mixed ({dominant})",
+            "count": self.count,
+            "nulls": self.nulls,
+            "distinct": (
+                f">{_MAX_TRACKED_VALUES}" if self.values_truncated else len(self.values)
+            ),
+            "min": _display(self.minimum),
+            "max": _display(self.maximum),
+            # Values seen only once (ids, free text) are not informative.
+            "top_values": [
+                [_display(value), count]
+                for value, count in self.values.most_common(self.top_k)
+                if count > 1
+            ],
+        }
+
+
+def _iter_xlsx_sheets(path: str) -> Iterator[Tuple[str, Iterator[tuple]]]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield sheet.title, sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_xls_sheets(path: str) -> Iterator[Tuple[str, Iterator[tuple]]]:
+    # Legacy .xls files have no streaming reader, so each sheet is loaded
+    # through pandas one at a time.
+    import pandas as pd
+
+    sheets = pd.ExcelFile(path)
+    for name in sheets.sheet_names:
+        df = sheets.parse(name, header=None)
+        df = df.astype(object).where(df.notna(), None)
+        yield str(name), df.itertuples(index=False, name=None)
+
+
+def _header_names(row: tuple) -> List[str]:
+    names: List[str] = []
+    for idx, value in enumerate(row):
+        name = str(value).strip() if not _is_null(value) else f"column_{idx + 1}"
+        if name in names:
+            name = f"{name}_{idx + 1}"
+        names.append(name)
+    return names
+
+
+def _as_text(values: List[Any]) -> List[Optional[str]]:
+    return [None if _is_null(v) else str(v) for v in values]
+
+
+def _widened_type(current: Any, incoming: Any) -> Any:
+    r"""Return the type a column must take to hold values of both types."""
+    import pyarrow as pa
+
+    if pa.types.is_null(current):
+        return incoming
+    if pa.types.is_null(incoming):
+        return current
+    if (pa.types.is_integer(current) or pa.types.is_floating(current)) and (
+        pa.types.is_integer(incoming) or pa.types.is_floating(incoming)
+    ):
+        return pa.float64()
+    # Mixed-type columns are stored as text.
+    return pa.string()
+
+
+class _ParquetSheetWriter:
+    r"""Write the rows of a sheet to Parquet in record batches as they are
+    read, so that memory is bounded by the batch size rather than by the
+    size of the sheet.
+
+    The schema is inferred from the first batch. When a later batch does
+    not fit it, e.g. text in a column of numbers, the column is widened and
+    the row groups already written are rewritten batch by batch.
+
+    Args:
+        path (str): The Parquet file to write.
+        header (List[str]): The column names.
+        batch_rows (int, optional): The number of rows per record batch.
+            (default: :obj:`_PARQUET_BATCH_ROWS`)
+    """
+
+    def __init__(
+        self, path: str, header: List[str], batch_rows: int = _PARQUET_BATCH_ROWS
+    ):
+        self.path = path
+        self.header = header
+        self.batch_rows = batch_rows
+        self._rows: List[tuple] = []
+        self._schema: Any = None
+        self._writer: Any = None
+        # The file being written, which differs from path once a column
+        # has been widened.
+        self._target = path
+        self._rewrites = 0
+
+    def add(self, row: tuple) -> None:
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_rows:
+            self._flush()
+
+    @staticmethod
+    def _column(values: List[Any]) -> Any:
+        import pyarrow as pa
+
+        try:
+            return pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            return pa.array(_as_text(values), type=pa.string())
+
+    def _flush(self) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = [list(values) for values in zip(*self._rows)] or [
+            [] for _ in self.header
+        ]
+        self._rows = []
+        arrays = [self._column(values) for values in columns]
+        if self._schema is None:
+            self._schema = pa.schema(
+                [pa.field(name, array.type) for name, array in zip(self.header, arrays)]
+            )
+            self._writer = pq.ParquetWriter(self._target, self._schema)
+        for idx, array in enumerate(arrays):
+            kind = self._schema.field(idx).type
+            if array.type == kind:
+                continue
+            # Types are compared rather than converted to the schema, since
+            # pyarrow silently truncates e.g. floats stored as integers.
+            target = _widened_type(kind, array.type)
+            if target != kind:
+                self._widen(idx, target)
+            if pa.types.is_string(target):
+                arrays[idx] = pa.array(_as_text(columns[idx]), type=pa.string())
+            else:
+                arrays[idx] = array.cast(target)
+        self._writer.write_batch(pa.record_batch(arrays, schema=self._schema))
+
+    def _widen(self, idx: int, kind: Any) -> None:
+        r"""Change the type of a column, copying the rows written so far to a
+        new file, which then receives the following batches."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._writer.close()
+        previous = self._target
+        self._schema = self._schema.set(idx, pa.field(self.header[idx], kind))
+        self._target = f"{self.path}.{self._rewrites}.tmp"
+        self._rewrites += 1
+        self._writer = pq.ParquetWriter(self._target, self._schema)
+        for batch in pq.ParquetFile(previous).iter_batches():
+            arrays = batch.columns
+            try:
+                arrays[idx] = arrays[idx].cast(kind)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                arrays[idx] = pa.array(
+                    _as_text(arrays[idx].to_pylist()), type=pa.string()
+                )
+            self._writer.write_batch(pa.record_batch(arrays, schema=self._schema))
+        os.remove(previous)
+
+    def abort(self) -> None:
+        r"""Stop writing and remove the partial file."""
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+        if os.path.exists(self._target):
+            os.remove(self._target)
+
+    def close(self) -> None:
+        if self._rows or self._writer is None:
+            self._flush()
+        self._writer.close()
+        if self._target != self.path:
+            os.replace(self._target, self.path)
+
+
+def _cache_failed(
+    writer: _ParquetSheetWriter, sheet_name: str, error: Exception
+) -> None:
+    logger.warning(f"Failed to cache sheet {sheet_name} as Parquet: {error}")
+    writer.abort()
+
+
+def _cache_key(path: str, sample_rows: int, top_k: int) -> str:
+    # The profile depends on the options as well as on the workbook
+    stat = os.stat(path)
+    raw = (
+        f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:"
+        f"{sample_rows}:{top_k}"
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def profile_spreadsheet(
+    path: str,
+    cache_dir: Optional[str] = None,
+    sample_rows: int = 10,
+    top_k: int = 5,
+) -> Dict[str, Any]:
+    r"""Profile every sheet of a workbook in a single streaming pass.
+
+    Sheets are read row by row in read-only mode. For each column the
+    dominant type, null count, distinct count, min/max and most frequent
+    values are computed, and the first rows are kept as samples. When
+    ``cache_dir`` is given, every sheet is also written to a Parquet file
+    in record batches as its rows are read, and the profile is stored next
+    to it, so that repeated calls on an unchanged workbook with the same
+    ``sample_rows`` and ``top_k`` are served from the cache.
+
+    Args:
+        path (str): The path of the ``.xlsx`` or ``.xls`` file.
+        cache_dir (str, optional): The directory for the Parquet cache.
+            (default: :obj:`None`)
+        sample_rows (int, optional): The number of rows kept per sheet.
+            (default: :obj:`10`)
+        top_k (int, optional): The number of most frequent values reported
+            per column. (default: :obj:`5`)
+
+    Returns:
+        Dict[str, Any]: The file path and, per sheet, the row count,
+            column profiles, sample rows and Parquet path (if cached).
+    """
+    cache_path = None
+    if cache_dir:
+        stem = re.sub(r"[^\w.-]", "_", os.path.splitext(os.path.basename(path))[0])
+        cache_path = os.path.join(
+            cache_dir, "spreadsheets", f"{stem}-{_cache_key(path, sample_rows, top_k)}"
+        )
+        profile_file = os.path.join(cache_path, "profile.json")
+        if os.path.exists(profile_file):
+            with open(profile_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        os.makedirs(cache_path, exist_ok=True)
+
+    reader = _iter_xls_sheets if path.lower().endswith(".xls") else _iter_xlsx_sheets
+    result: Dict[str, Any] = {"path": path, "sheets": []}
+
+    for sheet_name, rows in reader(path):
+        header: Optional[List[str]] = None
+        profiles: List[ColumnProfile] = []
+        writer: Optional[_ParquetSheetWriter] = None
+        samples: List[List[Any]] = []
+        row_count = 0
+
+        for row in rows:
+            if header is None:
+                # The first non-empty row is taken as the header.
+                if all(_is_null(v) for v in row):
+                    continue
+                header = _header_names(row)
+                profiles = [ColumnProfile(name, top_k) for name in header]
+                if cache_path:
+                    file_name = re.sub(r"[^\w.-]", "_", sheet_name) + ".parquet"
+                    writer = _ParquetSheetWriter(
+                        os.path.join(cache_path, file_name), header
+                    )
+                continue
+            if all(_is_null(v) for v in row):
+                continue
+            row_count += 1
+            row = tuple(row[: len(header)]) + (None,) * (len(header) - len(row))
+            for profile, value in zip(profiles, row):
+                profile.add(value)
+            if writer is not None:
+                try:
+                    writer.add(row)
+                except Exception as e:
+                    _cache_failed(writer, sheet_name, e)
+                    writer = None
+            if len(samples) < sample_rows:
+                samples.append([_display(v) for v in row])
+
+        sheet_info: Dict[str, Any] = {
+            "name": sheet_name,
+            "rows": row_count,
+            "columns": [profile.as_dict() for profile in profiles],
+            "sample_rows": samples,
+        }
+        if writer is not None:
+            try:
+                writer.close()
+                sheet_info["parquet_path"] = writer.path
+            except Exception as e:
+                _cache_failed(writer, sheet_name, e)
+        result["sheets"].append(sheet_info)
+
+    if cache_path:
+        with open(os.path.join(cache_path, "profile.json"), "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, default=str)
+    return result
@@ -0,0 +1,245 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""Token-level streaming of the model responses of a society.
+
+The model backends of the society's agents are replaced by streaming copies
+that request a streamed completion, report every content delta to a
+callback as it arrives and assemble the chunks back into a regular
+:class:`ChatCompletion`. The agents therefore keep handling complete
+responses, tool calls included, exactly as without streaming.
+"""
+
+import copy
+import time
+from itertools import cycle
+from typing import Any, Callable, Dict, List, Optional
+
+from camel.logger import get_logger
+from camel.models import BaseModelBackend, OpenAIModel
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+from openai.types.chat.chat_completion import Choice
+from openai.types.chat.chat_completion_message import ChatCompletionMessage
+from openai.types.chat.chat_completion_message_tool_call import (
+    ChatCompletionMessageToolCall,
+    Function,
+)
+from openai.types.completion_usage import CompletionUsage
+
+logger = get_logger(__name__)
+
+DeltaCallback = Callable[[str, str], None]
+
+
+class _CompletionAssembler:
+    r"""Accumulate streamed chunks into a :class:`ChatCompletion`."""
+
+    def __init__(self):
+        self.id = ""
+        self.model = ""
+        self.created = int(time.time())
+        self.content: Dict[int, str] = {}
+        self.finish_reasons: Dict[int, Optional[str]] = {}
+        # choice index -> tool call index -> {"id", "name", "arguments"}
+        self.tool_calls: Dict[int, Dict[int, Dict[str, str]]] = {}
+        self.usage: Optional[CompletionUsage] = None
+
+    def add(self, chunk: ChatCompletionChunk) -> str:
+        r"""Add a chunk and return the new content of the first choice."""
+        self.id = chunk.id or self.id
+        self.model = chunk.model or self.model
+        if chunk.usage is not None:
+            self.usage = chunk.usage
+        new_content = ""
+        for choice in chunk.choices:
+            delta = choice.delta
+            if delta.content:
+                self.content[choice.index] = (
+                    self.content.get(choice.index, "") + delta.content
+                )
+                if choice.index == 0:
+                    new_content += delta.content
+            for call in delta.tool_calls or []:
+                calls = self.tool_calls.setdefault(choice.index, {})
+                entry = calls.setdefault(
+                    call.index, {"id": "", "name": "", "arguments": ""}
+                )
+                if call.id:
+                    entry["id"] = call.id
+                if call.function is not None:
+                    entry["name"] += call.function.name or ""
+                    entry["arguments"] += call.function.arguments or ""
+            if choice.finish_reason:
+                self.finish_reasons[choice.index] = choice.finish_reason
+            else:
+                self.finish_reasons.setdefault(choice.index, None)
+        return new_content
+
+    def build(self) -> ChatCompletion:
+        choices = []
+        for index in sorted(self.finish_reasons):
+            calls = self.tool_calls.get(index, {})
+            tool_calls = [
+                ChatCompletionMessageToolCall(
+                    id=entry["id"],
+                    type="function",
+                    function=Function(
+                        name=entry["name"], arguments=entry["arguments"] or "{}"
+                    ),
+                )
+                for _, entry in sorted(calls.items())
+            ]
+            finish_reason = self.finish_reasons[index] or (
+                "tool_calls" if tool_calls else "stop"
+            )
+            choices.append(
+                Choice(
+                    index=index,
+                    finish_reason=finish_reason,
+                    message=ChatCompletionMessage(
+                        role="assistant",
+                        content=self.content.get(index),
+                        tool_calls=tool_calls or None,
+                    ),
+                )
+            )
+        return ChatCompletion(
+            id=self.id,
+            choices=choices,
+            created=self.created,
+            model=self.model,
+            object="chat.completion",
+            usage=self.usage,
+        )
+
+
+def _estimate_usage(
+    backend: BaseModelBackend, messages: List[Any], completion: ChatCompletion
+) -> Optional[CompletionUsage]:
+    r"""Count tokens locally for providers that report no usage in streams."""
+    try:
+        counter = backend.token_counter
+        prompt_tokens = counter.count_tokens_from_messages(messages)
+        completion_tokens = counter.count_tokens_from_messages(
+            [
+                {"role": "assistant", "content": choice.message.content or ""}
+                for choice in completion.choices
+            ]
+        )
+    except Exception:
+        return None
+    return CompletionUsage(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        total_tokens=prompt_tokens + completion_tokens,
+    )
+
+
+def streaming_backend(
+    backend: BaseModelBackend, on_delta: Callable[[str], None]
+) -> BaseModelBackend:
+    r"""Return a copy of ``backend`` that streams its completions.
+
+    The copy shares the client of ``backend`` but has its own config with
+    streaming enabled, so the original, possibly shared between runs, is
+    left untouched. Requests with a structured response format are not
+    streamed. If a streamed request fails, the request is retried without
+    streaming and streaming is turned off for the copy.
+
+    Args:
+        backend (BaseModelBackend): The backend to stream from.
+        on_delta (Callable[[str], None]): Called with every piece of
+            content as it arrives.
+
+    Returns:
+        BaseModelBackend: The streaming backend.
+    """
+    streaming = copy.copy(backend)
+    config = dict(backend.model_config_dict)
+    config["stream"] = True
+    if isinstance(backend, OpenAIModel):
+        config["stream_options"] = {"include_usage": True}
+    streaming.model_config_dict = config
+    state = {"enabled": True}
+
+    def fallback(error: Exception) -> None:
+        logger.warning(f"Streaming failed, falling back to batch responses: {error}")
+        state["enabled"] = False
+
+    def finish(messages, assembler: _CompletionAssembler) -> ChatCompletion:
+        completion = assembler.build()
+        if completion.usage is None:
+            completion.usage = _estimate_usage(backend, messages, completion)
+        return completion
+
+    def run(messages, response_format=None, tools=None):
+        if not state["enabled"] or response_format is not None:
+            return backend.run(messages, response_format, tools)
+        try:
+            response = type(streaming).run(streaming, messages, None, tools)
+            if isinstance(response, ChatCompletion):
+                return response
+            assembler = _CompletionAssembler()
+            for chunk in response:
+                delta = assembler.add(chunk)
+                if delta:
+                    on_delta(delta)
+        except Exception as e:
+            fallback(e)
+            return backend.run(messages, response_format, tools)
+        return finish(messages, assembler)
+
+    async def arun(messages, response_format=None, tools=None):
+        if not state["enabled"] or response_format is not None:
+            return await backend.arun(messages, response_format, tools)
+        try:
+            response = await type(streaming).arun(streaming, messages, None, tools)
+            if isinstance(response, ChatCompletion):
+                return response
+            assembler = _CompletionAssembler()
+            async for chunk in response:
+                delta = assembler.add(chunk)
+                if delta:
+                    on_delta(delta)
+        except Exception as e:
+            fallback(e)
+            return await backend.arun(messages, response_format, tools)
+        return finish(messages, assembler)
+
+    streaming.run = run
+    streaming.arun = arun
+    return streaming
+
+
+def enable_streaming(society: Any, on_delta: DeltaCallback) -> None:
+    r"""Stream the model responses of the user and assistant agents of a
+    society.
+
+    Args:
+        society (OwlRolePlaying): The society, before it is run.
+        on_delta (Callable[[str, str], None]): Called with the role name of
+            the agent (``"user"`` or ``"assistant"``) and every piece of
+            content of its responses.
+    """
+    for role, agent in (
+        ("user", society.user_agent),
+        ("assistant", society.assistant_agent),
+    ):
+        manager = agent.model_backend
+        index = manager.models.index(manager.current_model)
+        manager.models = [
+            streaming_backend(model, lambda delta, role=role: on_delta(role, delta))
+            for model in manager.models
+        ]
+        manager.models_cycle = cycle(manager.models)
+        manager.current_model = manager.models[index]
@@ -0,0 +1,535 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""Streaming readers for large JSON, JSONL and XML documents.
+
+Paths use the dotted notation of the summaries produced here: map keys are
+joined with ``.`` and ``item`` stands for every element of an array, e.g.
+``data.item.name``. The records of a JSONL file live under ``item``, as if
+the file were one top-level array. XML paths join tag names with ``/``,
+e.g. ``catalog/book/title``.
+"""
+
+import json
+import operator
+import re
+import xml.etree.ElementTree as ET
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import xmltodict
+from camel.logger import get_logger
+
+logger = get_logger(__name__)
+
+JSON_EXTENSIONS = (".json", ".jsonld")
+JSONL_EXTENSIONS = (".jsonl", ".ndjson")
+XML_EXTENSIONS = (".xml",)
+
+_CHUNK_SIZE = 1 << 16
+_MAX_PATHS = 200
+_MAX_SAMPLE_CHARS = 2000
+
+_WHITESPACE = re.compile(r"\s*")
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_SCALAR = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null")
+_DELIMITERS = set(" \t\r\n,]}:")
+
+_FILTER = re.compile(r"^\s*([\w@.#:-]+)\s*(==|!=|>=|<=|>|<|~)\s*(.*?)\s*$")
+_FILTER_OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+    "~": lambda value, target: str(target).lower() in str(value).lower(),
+}
+
+
+def detect_format(path: str) -> Optional[str]:
+    r"""Return ``"json"``, ``"jsonl"`` or ``"xml"`` based on the file
+    extension, or :obj:`None` for other files."""
+    lower = path.lower()
+    if lower.endswith(JSONL_EXTENSIONS):
+        return "jsonl"
+    if lower.endswith(JSON_EXTENSIONS):
+        return "json"
+    if lower.endswith(XML_EXTENSIONS):
+        return "xml"
+    return None
+
+
+class _JsonTokenizer:
+    r"""Pull tokenizer reading a JSON text in fixed-size chunks, so that
+    memory use is bounded by the largest single token rather than the
+    size of the document."""
+
+    def __init__(self, fp, chunk_size: int = _CHUNK_SIZE):
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._fp.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def next(self) -> Tuple[str, Any]:
+        r"""Return the next ``(kind, value)`` token. ``kind`` is ``"punct"``
+        for structural characters, ``"string"`` / ``"scalar"`` for values
+        and ``"eof"`` at the end of the input."""
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                break
+            if not self._fill():
+                return "eof", None
+
+        char = self._buf[self._pos]
+        if char in "{}[]:,":
+            self._pos += 1
+            return "punct", char
+
+        pattern = _STRING if char == '"' else _SCALAR
+        while True:
+            match = pattern.match(self._buf, self._pos)
+            # A match reaching the end of the buffer may be a truncated
+            # string or number, and a number must be followed by a
+            # delimiter, so read more before trusting it.
+            if match:
+                end = match.end()
+                if end == len(self._buf):
+                    complete = self._eof
+                else:
+                    complete = char == '"' or self._buf[end] in _DELIMITERS
+                if complete:
+                    self._pos = end
+                    kind = "string" if char == '"' else "scalar"
+                    return kind, json.loads(match.group(0))
+            if not self._fill() and not (match and match.end() == len(self._buf)):
+                raise ValueError(
+                    f"Invalid JSON near: {self._buf[self._pos:self._pos + 50]!r}"
+                )
+
+
+def iter_json_events(fp) -> Iterator[Tuple[str, str, Any]]:
+    r"""Stream ``(path, event, value)`` triples from a JSON document.
+
+    Events are ``start_map``, ``map_key``, ``end_map``, ``start_array``,
+    ``end_array`` and ``value``. The whole document is never materialized.
+
+    Args:
+        fp: A text file object opened for reading.
+
+    Yields:
+        Tuple[str, str, Any]: The path, the event name and its value.
+    """
+    tokenizer = _JsonTokenizer(fp)
+
+    def parse_value(path: str, token: Tuple[str, Any]):
+        kind, value = token
+        if kind == "punct" and value == "{":
+            yield path, "start_map", None
+            token = tokenizer.next()
+            while token != ("punct", "}"):
+                if token[0] != "string":
+                    raise ValueError(f"Expected an object key at {path!r}")
+                key = token[1]
+                if tokenizer.next() != ("punct", ":"):
+                    raise ValueError(f"Expected ':' after key {key!r}")
+                yield path, "map_key", key
+                child = f"{path}.{key}" if path else key
+                yield from parse_value(child, tokenizer.next())
+                token = tokenizer.next()
+                if token == ("punct", ","):
+                    token = tokenizer.next()
+            yield path, "end_map", None
+        elif kind == "punct" and value == "[":
+            yield path, "start_array", None
+            child = f"{path}.item" if path else "item"
+            token = tokenizer.next()
+            while token != ("punct", "]"):
+                yield from parse_value(child, token)
+                token = tokenizer.next()
+                if token == ("punct", ","):
+                    token = tokenizer.next()
+            yield path, "end_array", None
+        elif kind in ("string", "scalar"):
+            yield path, "value", value
+        else:
+            raise ValueError(f"Unexpected token {value!r} at {path!r}")
+
+    yield from parse_value("", tokenizer.next())
+
+
+def _object_events(obj: Any, path: str) -> Iterator[Tuple[str, str, Any]]:
+    r"""Replay an in-memory object as the events of
+    :func:`iter_json_events`."""
+    if isinstance(obj, dict):
+        yield path, "start_map", None
+        for key, value in obj.items():
+            yield path, "map_key", key
+            yield from _object_events(value, f"{path}.{key}" if path else key)
+        yield path, "end_map", None
+    elif isinstance(obj, list):
+        yield path, "start_array", None
+        for value in obj:
+            yield from _object_events(value, f"{path}.item" if path else "item")
+        yield path, "end_array", None
+    else:
+        yield path, "value", obj
+
+
+def _iter_jsonl_events(fp) -> Iterator[Tuple[str, str, Any]]:
+    yield "", "start_array", None
+    for line_no, line in enumerate(fp, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Skipping malformed JSONL line {line_no}: {e}")
+            continue
+        yield from _object_events(record, "item")
+    yield "", "end_array", None
+
+
+class _ItemBuilder:
+    r"""Incrementally materialize the values located at a single path from
+    a stream of events, leaving everything else unbuilt."""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._stack: List[Any] = []
+        self._keys: List[Optional[str]] = []
+
+    def _attach(self, value: Any) -> bool:
+        if not self._stack:
+            return True
+        parent = self._stack[-1]
+        if isinstance(parent, dict):
+            parent[self._keys[-1]] = value
+        else:
+            parent.append(value)
+        return False
+
+    def feed(self, path: str, event: str, value: Any) -> Tuple[bool, Any]:
+        r"""Consume one event and return ``(True, item)`` once an item at
+        the prefix is complete, ``(False, None)`` otherwise."""
+        if not self._stack and (path != self.prefix or event == "map_key"):
+            return False, None
+        if event == "map_key":
+            self._keys[-1] = value
+        elif event in ("start_map", "start_array"):
+            container: Any = {} if event == "start_map" else []
+            self._attach(container)
+            self._stack.append(container)
+            self._keys.append(None)
+        elif event in ("end_map", "end_array"):
+            done = self._stack.pop()
+            self._keys.pop()
+            if not self._stack:
+                return True, done
+        elif self._attach(value):
+            return True, value
+        return False, None
+
+
+def _iter_items(events: Iterator[Tuple[str, str, Any]], prefix: str) -> Iterator[Any]:
+    builder = _ItemBuilder(prefix)
+    for path, event, value in events:
+        complete, item = builder.feed(path, event, value)
+        if complete:
+            yield item
+
+
+def _type_name(event: str, value: Any) -> str:
+    if event == "start_map":
+        return "object"
+    if event == "start_array":
+        return "array"
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    return "string"
+
+
+def _truncate(value: Any) -> Any:
+    text = json.dumps(value, ensure_ascii=False, default=str)
+    if len(text) <= _MAX_SAMPLE_CHARS:
+        return value
+    return text[:_MAX_SAMPLE_CHARS] + "...(truncated)"
+
+
+def _summarize_json_events(
+    events: Iterator[Tuple[str, str, Any]],
+    fmt: str,
+    sample_size: int,
+) -> Dict[str, Any]:
+    paths: Dict[str, Dict[str, Any]] = {}
+    samples: List[Any] = []
+    root_type: Optional[str] = None
+    record_path: Optional[str] = None
+    builder: Optional[_ItemBuilder] = None
+
+    for path, event, value in events:
+        if root_type is None:
+            root_type = _type_name(event, value)
+            if event == "start_array":
+                record_path = "item"
+        elif record_path is None and event == "start_array" and "." not in path:
+            # For a root object, records are the items of the first
+            # array found directly under it, e.g. ``{"data": [...]}``.
+            record_path = f"{path}.item"
+
+        if record_path is not None and builder is None:
+            builder = _ItemBuilder(record_path)
+        if builder is not None and len(samples) < sample_size:
+            complete, item = builder.feed(path, event, value)
+            if complete:
+                samples.append(_truncate(item))
+
+        if not path or event in ("map_key", "end_map", "end_array"):
+            continue
+        stats = paths.get(path)
+        if stats is None:
+            if len(paths) >= _MAX_PATHS:
+                continue
+            stats = paths[path] = {"count": 0, "types": Counter()}
+        stats["count"] += 1
+        stats["types"][_type_name(event, value)] += 1
+
+    record_count = paths[record_path]["count"] if record_path in paths else 0
+    return {
+        "format": fmt,
+        "root_type": root_type,
+        "record_path": record_path,
+        "record_count": record_count,
+        "schema": {
+            path: {"count": stats["count"], "types": dict(stats["types"])}
+            for path, stats in paths.items()
+        },
+        "schema_truncated": len(paths) >= _MAX_PATHS,
+        "samples": samples,
+    }
+
+
+def _xml_element_to_dict(elem: ET.Element) -> Any:
+    return xmltodict.parse(ET.tostring(elem, encoding="unicode"))[elem.tag]
+
+
+def _iter_xml_elements(
+    fp, release_depth: int = 1
+) -> Iterator[Tuple[str, int, ET.Element]]:
+    r"""Stream ``(path, depth, element)`` for every closed element. Elements
+    at ``release_depth`` are detached from their parent once yielded, so
+    memory stays bounded by the size of a single record."""
+    stack: List[ET.Element] = []
+    for event, elem in ET.iterparse(fp, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+        depth = len(stack) - 1
+        yield "/".join(e.tag for e in stack), depth, elem
+        stack.pop()
+        if depth == release_depth and stack:
+            stack[-1].remove(elem)
+
+
+def _summarize_xml(fp, sample_size: int) -> Dict[str, Any]:
+    paths: Dict[str, Dict[str, Any]] = {}
+    samples: List[Any] = []
+    root_tag = None
+    record_path = None
+    record_count = 0
+
+    for path, depth, elem in _iter_xml_elements(fp):
+        if depth == 0:
+            root_tag = elem.tag
+            continue
+        if depth == 1:
+            if record_path is None:
+                record_path = path
+            if path == record_path:
+                record_count += 1
+                if len(samples) < sample_size:
+                    samples.append(_truncate(_xml_element_to_dict(elem)))
+        stats = paths.get(path)
+        if stats is None:
+            if len(paths) >= _MAX_PATHS:
+                continue
+            stats = paths[path] = {"count": 0, "attributes": set(), "text": 0}
+        stats["count"] += 1
+        stats["attributes"].update(elem.attrib)
+        if elem.text and elem.text.strip():
+            stats["text"] += 1
+
+    return {
+        "format": "xml",
+        "root_type": root_tag,
+        "record_path": record_path,
+        "record_count": record_count,
+        "schema": {
+            path: {
+                "count": stats["count"],
+                "attributes": sorted(stats["attributes"]),
+                "with_text": stats["text"],
+            }
+            for path, stats in paths.items()
+        },
+        "schema_truncated": len(paths) >= _MAX_PATHS,
+        "samples": samples,
+    }
+
+
+def summarize_structured_file(path: str, sample_size: int = 3) -> Dict[str, Any]:
+    r"""Summarize a JSON, JSONL or XML file in a single streaming pass.
+
+    Args:
+        path (str): The path of the file.
+        sample_size (int, optional): The number of sample records to keep.
+            (default: :obj:`3`)
+
+    Returns:
+        Dict[str, Any]: The format, the record path and count, per-path
+            occurrence counts and types, and a few sample records.
+    """
+    fmt = detect_format(path)
+    if fmt == "xml":
+        with open(path, "rb") as f:
+            return _summarize_xml(f, sample_size)
+    if fmt not in ("json", "jsonl"):
+        raise ValueError(f"Unsupported structured file: {path}")
+    with open(path, "r", encoding="utf-8") as f:
+        events = iter_json_events(f) if fmt == "json" else _iter_jsonl_events(f)
+        return _summarize_json_events(events, fmt, sample_size)
+
+
+def _lookup(record: Any, field: str) -> Any:
+    if field in (".", "#text") and not isinstance(record, (dict, list)):
+        # Scalar records (e.g. text-only XML elements) are their own value.
+        return record
+    for part in field.split("."):
+        if isinstance(record, dict):
+            record = record.get(part)
+        elif isinstance(record, list) and part.isdigit():
+            index = int(part)
+            record = record[index] if index < len(record) else None
+        else:
+            return None
+    return record
+
+
+def _coerce(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text.strip("\"'")
+
+
+def _make_filter(expression: Optional[str]):
+    if not expression:
+        return lambda record: True
+    match = _FILTER.match(expression)
+    if match is None:
+        raise ValueError(
+            f"Invalid filter {expression!r}, expected `<field> <op> <value>` "
+            f"with op one of {', '.join(_FILTER_OPS)}."
+        )
+    field, op, raw_target = match.groups()
+    target = _coerce(raw_target)
+    compare = _FILTER_OPS[op]
+
+    def accept(record: Any) -> bool:
+        value = _lookup(record, field)
+        if value is None and op != "!=":
+            return False
+        if isinstance(target, (int, float)) and isinstance(value, str):
+            try:
+                value = float(value)
+            except ValueError:
+                return False
+        try:
+            return bool(compare(value, target))
+        except TypeError:
+            return False
+
+    return accept
+
+
+def query_structured_file(
+    path: str,
+    record_path: str,
+    filter_expression: Optional[str] = None,
+    limit: int = 20,
+) -> List[Any]:
+    r"""Stream the records at ``record_path`` and return the ones that pass
+    the filter, stopping as soon as ``limit`` matches are found.
+
+    Args:
+        path (str): The path of a JSON, JSONL or XML file.
+        record_path (str): The dotted (JSON) or slash-separated (XML) path of
+            the records, as reported by :func:`summarize_structured_file`.
+        filter_expression (str, optional): A condition such as
+            ``price > 10``, ``author.name == "Ann"`` or ``title ~ python``
+            (``~`` is a case-insensitive substring test). XML attributes
+            are addressed as ``@name`` and text content as ``#text``; ``.``
+            refers to the record itself when it is a plain value.
+            (default: :obj:`None`)
+        limit (int, optional): The maximum number of records to return.
+            (default: :obj:`20`)
+
+    Returns:
+        List[Any]: The matching records.
+    """
+    fmt = detect_format(path)
+    accept = _make_filter(filter_expression)
+    results: List[Any] = []
+
+    if fmt == "xml":
+        record_path = record_path.strip("/")
+        release_depth = max(record_path.count("/"), 1)
+        with open(path, "rb") as f:
+            for elem_path, _, elem in _iter_xml_elements(f, release_depth):
+                if elem_path != record_path:
+                    continue
+                record = _xml_element_to_dict(elem)
+                if accept(record):
+                    results.append(record)
+                    if len(results) >= limit:
+                        break
+        return results
+
+    if fmt not in ("json", "jsonl"):
+        raise ValueError(f"Unsupported structured file: {path}")
+    with open(path, "r", encoding="utf-8") as f:
+        events = iter_json_events(f) if fmt == "json" else _iter_jsonl_events(f)
+        for record in _iter_items(events, record_path):
+            if accept(record):
+                results.append(record)
+                if len(results) >= limit:
+                    break
+    return results
@@ -0,0 +1,453 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""Offline analytics of recorded society trajectories.
+
+:func:`run_society` records, for every round, the token usage, the wall
+time and the duration of each tool call (see :class:`ToolTimer`). The
+functions here replay those chat histories, without calling any model, to
+measure how the context grows round after round, how long tools take, how
+many rounds it takes to reach an answer and how many are spent after it,
+and what a correct answer costs. :meth:`TrajectoryReport.round_limit_curve`
+estimates the effect of a lower ``round_limit`` on accuracy and cost.
+
+Histories recorded before per-round usage was kept are still analysed; their
+token counts are estimated from the length of the messages.
+"""
+
+import functools
+import inspect
+import re
+import statistics
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+# Characters per token used to estimate the usage of old histories
+_CHARS_PER_TOKEN = 4
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Where a final answer is stated: the ``FINAL ANSWER:`` line of the benchmark
+# template, or the ``<final_answer>`` tags of the GAIA prompt
+_ANSWER_STATEMENTS = (
+    re.compile(r"FINAL ANSWER:[ \t]*([^\r\n]+)", re.IGNORECASE),
+    re.compile(r"<final_answer>(.*?)</final_answer>", re.DOTALL | re.IGNORECASE),
+)
+
+
+class ToolTimer:
+    r"""Measure the wall time of the tool calls of a society's agents.
+
+    Durations are collected in call order and attached to the tool call
+    records of a round with :meth:`annotate`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations: List[Tuple[str, float]] = []
+
+    def _record(self, name: str, started: float) -> None:
+        with self._lock:
+            self._durations.append((name, time.perf_counter() - started))
+
+    @staticmethod
+    def _wrap(name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        # The timer is looked up on every call, so that tools shared by
+        # successive societies report to the timer of the current run.
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                timer = async_wrapper.__owl_tool_timer__
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    timer._record(name, started)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            timer = wrapper.__owl_tool_timer__
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timer._record(name, started)
+
+        return wrapper
+
+    def install(self, society: Any) -> "ToolTimer":
+        r"""Time the tools of the user and assistant agents of a society.
+
+        Returns:
+            ToolTimer: This timer.
+        """
+        for agent in (society.user_agent, society.assistant_agent):
+            for name, tool in getattr(agent, "_internal_tools", {}).items():
+                if getattr(tool.func, "__owl_tool_timer__", None) is None:
+                    tool.func = self._wrap(name, tool.func)
+                tool.func.__owl_tool_timer__ = self
+        return self
+
+    def annotate(self, tool_calls: List[Dict[str, Any]]) -> None:
+        r"""Add a ``duration`` to the tool call records of a round, matching
+        the calls timed since the previous round in order."""
+        with self._lock:
+            durations, self._durations = self._durations, []
+        for call in tool_calls:
+            for i, (name, duration) in enumerate(durations):
+                if name == call.get("tool_name"):
+                    call["duration"] = round(duration, 3)
+                    del durations[i]
+                    break
+
+
+def _percentile(values: Sequence[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _round_text(record: Mapping[str, Any]) -> str:
+    parts = [record.get("user") or "", record.get("assistant") or ""]
+    for call in record.get("tool_calls") or []:
+        parts.append(str(call.get("args", "")))
+        parts.append(str(call.get("result", "")))
+    return "\n".join(parts)
+
+
+def _normalize_answer(text: str) -> str:
+    text = _WHITESPACE.sub(" ", text).strip().strip("\"'`*[]").strip()
+    return text.rstrip(".").strip().lower()
+
+
+def _stated_answers(record: Mapping[str, Any]) -> List[str]:
+    r"""The final answers stated in a round: after a final answer marker in
+    the messages or in the arguments of a file-write tool call, or as the
+    whole content written to a file."""
+    texts = [record.get("user") or "", record.get("assistant") or ""]
+    stated = []
+    for call in record.get("tool_calls") or []:
+        if "write" not in str(call.get("tool_name", "")).lower():
+            continue
+        args = call.get("args")
+        values = args.values() if isinstance(args, Mapping) else [args]
+        for value in values:
+            if isinstance(value, str):
+                texts.append(value)
+                stated.append(value)
+    for text in texts:
+        for pattern in _ANSWER_STATEMENTS:
+            stated.extend(match.group(1) for match in pattern.finditer(text))
+    return stated
+
+
+def _states_answer(record: Mapping[str, Any], answer: str) -> bool:
+    expected = _normalize_answer(answer)
+    return any(
+        _normalize_answer(stated) == expected for stated in _stated_answers(record)
+    )
+
+
+@dataclass
+class TrajectoryStats:
+    r"""What one recorded run did, round by round.
+
+    Args:
+        task_id (str): The task.
+        rounds (int): The number of rounds run.
+        prompt_tokens (List[int]): The prompt tokens of every round.
+        completion_tokens (List[int]): The completion tokens of every round.
+        estimated (bool): Whether the token counts are estimated from the
+            length of the messages.
+        tool_calls (List[Tuple[str, Optional[float]]]): The name and
+            duration in seconds, if recorded, of every tool call.
+        answer_round (Optional[int]): The first round, counted from 1, whose
+            stated final answer, after a ``FINAL ANSWER:`` marker or written
+            to a file, is the final answer.
+        correct (Optional[bool]): Whether the answer was correct, if known.
+        level (Optional[int]): The level of the task, if known.
+    """
+
+    task_id: str
+    rounds: int
+    prompt_tokens: List[int]
+    completion_tokens: List[int]
+    estimated: bool
+    tool_calls: List[Tuple[str, Optional[float]]] = field(default_factory=list)
+    answer_round: Optional[int] = None
+    correct: Optional[bool] = None
+    level: Optional[int] = None
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.prompt_tokens) + sum(self.completion_tokens)
+
+    @property
+    def wasted_rounds(self) -> int:
+        r"""The rounds run after the one in which the answer appeared."""
+        if self.answer_round is None:
+            return 0
+        return self.rounds - self.answer_round
+
+    def tokens_until(self, round_limit: int) -> int:
+        r"""The tokens the run would have used with ``round_limit``."""
+        return sum(self.prompt_tokens[:round_limit]) + sum(
+            self.completion_tokens[:round_limit]
+        )
+
+
+def analyze_trajectory(
+    task_id: str,
+    history: Sequence[Mapping[str, Any]],
+    model_answer: Optional[str] = None,
+    correct: Optional[bool] = None,
+    level: Optional[int] = None,
+) -> TrajectoryStats:
+    r"""Replay a chat history recorded by :func:`run_society`.
+
+    Args:
+        task_id (str): The task.
+        history (Sequence[Mapping[str, Any]]): The round records.
+        model_answer (Optional[str]): The final answer, compared with the
+            answers stated in the rounds to find when it first appeared.
+            (default: :obj:`None`)
+        correct (Optional[bool]): Whether the answer was correct.
+            (default: :obj:`None`)
+        level (Optional[int]): The level of the task. (default: :obj:`None`)
+
+    Returns:
+        TrajectoryStats: The statistics of the run.
+    """
+    estimated = not all("usage" in record for record in history)
+    prompt_tokens: List[int] = []
+    completion_tokens: List[int] = []
+    context_chars = 0
+    tool_calls: List[Tuple[str, Optional[float]]] = []
+    answer_round = None
+    answer = (model_answer or "").strip()
+    for index, record in enumerate(history):
+        text = _round_text(record)
+        if estimated:
+            # The prompt of a round holds the whole conversation so far
+            context_chars += len(text)
+            prompt_tokens.append(context_chars // _CHARS_PER_TOKEN)
+            completion_tokens.append(
+                len((record.get("user") or "") + (record.get("assistant") or ""))
+                // _CHARS_PER_TOKEN
+            )
+        else:
+            usage = record["usage"]
+            prompt_tokens.append(usage.get("prompt_tokens", 0))
+            completion_tokens.append(usage.get("completion_tokens", 0))
+        for call in record.get("tool_calls") or []:
+            tool_calls.append((call.get("tool_name", ""), call.get("duration")))
+        if answer and answer_round is None and _states_answer(record, answer):
+            answer_round = index + 1
+    return TrajectoryStats(
+        task_id=task_id,
+        rounds=len(history),
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        estimated=estimated,
+        tool_calls=tool_calls,
+        answer_round=answer_round,
+        correct=correct,
+        level=level,
+    )
+
+
+@dataclass
+class TrajectoryReport:
+    r"""Statistics over the recorded runs of a benchmark.
+
+    Args:
+        trajectories (List[TrajectoryStats]): The analysed runs.
+    """
+
+    trajectories: List[TrajectoryStats]
+
+    def token_growth(self) -> List[Dict[str, Any]]:
+        r"""Mean prompt and completion tokens of each round, over the runs
+        that reached it."""
+        growth = []
+        longest = max((t.rounds for t in self.trajectories), default=0)
+        for index in range(longest):
+            reached = [t for t in self.trajectories if t.rounds > index]
+            growth.append(
+                {
+                    "round": index + 1,
+                    "runs": len(reached),
+                    "prompt_tokens": statistics.mean(
+                        t.prompt_tokens[index] for t in reached
+                    ),
+                    "completion_tokens": statistics.mean(
+                        t.completion_tokens[index] for t in reached
+                    ),
+                }
+            )
+        return growth
+
+    def tool_latency(self) -> Dict[str, Dict[str, Any]]:
+        r"""Number of calls and duration percentiles of every tool."""
+        durations: Dict[str, List[float]] = {}
+        calls: Dict[str, int] = {}
+        for trajectory in self.trajectories:
+            for name, duration in trajectory.tool_calls:
+                calls[name] = calls.get(name, 0) + 1
+                if duration is not None:
+                    durations.setdefault(name, []).append(duration)
+        return {
+            name: {
+                "calls": count,
+                "timed": len(durations.get(name, [])),
+                "p50": _percentile(durations.get(name, []), 50),
+                "p90": _percentile(durations.get(name, []), 90),
+                "max": max(durations.get(name, []), default=None),
+                "total": sum(durations.get(name, [])),
+            }
+            for name, count in sorted(calls.items(), key=lambda item: -item[1])
+        }
+
+    def rounds_to_answer(self) -> Dict[str, Any]:
+        r"""Distribution of the round in which the answer first appeared,
+        and of the rounds run."""
+        answer_rounds = [
+            t.answer_round for t in self.trajectories if t.answer_round is not None
+        ]
+        rounds = [t.rounds for t in self.trajectories]
+        histogram: Dict[int, int] = {}
+        for value in answer_rounds:
+            histogram[value] = histogram.get(value, 0) + 1
+        return {
+            "answered": len(answer_rounds),
+            "mean_answer_round": statistics.mean(answer_rounds)
+            if answer_rounds
+            else None,
+            "mean_rounds": statistics.mean(rounds) if rounds else None,
+            "histogram": dict(sorted(histogram.items())),
+        }
+
+    def wasted_rounds(self) -> Dict[str, Any]:
+        r"""Rounds run after the answer had already appeared, and the tokens
+        they used."""
+        wasted = [t for t in self.trajectories if t.wasted_rounds > 0]
+        return {
+            "runs": len(wasted),
+            "rounds": sum(t.wasted_rounds for t in wasted),
+            "tokens": sum(
+                t.total_tokens - t.tokens_until(t.answer_round) for t in wasted
+            ),
+        }
+
+    def cost_per_correct(
+        self, prompt_price: float = 0.0, completion_price: float = 0.0
+    ) -> Dict[str, Any]:
+        r"""Tokens, and optionally money, spent per correct answer.
+
+        Args:
+            prompt_price (float, optional): The price of a million prompt
+                tokens. (default: :obj:`0.0`)
+            completion_price (float, optional): The price of a million
+                completion tokens. (default: :obj:`0.0`)
+        """
+        prompt = sum(sum(t.prompt_tokens) for t in self.trajectories)
+        completion = sum(sum(t.completion_tokens) for t in self.trajectories)
+        correct = sum(1 for t in self.trajectories if t.correct)
+        cost = (prompt * prompt_price + completion * completion_price) / 1e6
+        return {
+            "correct": correct,
+            "total_tokens": prompt + completion,
+            "tokens_per_correct": (prompt + completion) / correct if correct else None,
+            "cost": cost,
+            "cost_per_correct": cost / correct if correct else None,
+        }
+
+    def round_limit_curve(self, limits: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        r"""Estimate accuracy and tokens under lower round limits.
+
+        A correct run stays correct under a limit if its answer had
+        appeared by then, assuming the society would have stopped as soon
+        as it did; every run is cut at the limit for the token count.
+        """
+        total = len(self.trajectories)
+        curve = {}
+        for limit in limits:
+            correct = sum(
+                1
+                for t in self.trajectories
+                if t.correct and t.answer_round is not None and t.answer_round <= limit
+            )
+            curve[limit] = {
+                "correct": correct,
+                "accuracy": correct / total if total else None,
+                "tokens": sum(t.tokens_until(limit) for t in self.trajectories),
+            }
+        return curve
+
+    @property
+    def estimated(self) -> int:
+        r"""The number of runs whose token counts are estimated."""
+        return sum(1 for t in self.trajectories if t.estimated)
+
+
+def analyze_results(
+    results: Iterable[Mapping[str, Any]],
+    load_history: Callable[[str], Optional[Sequence[Mapping[str, Any]]]],
+) -> TrajectoryReport:
+    r"""Analyse the recorded runs of a benchmark.
+
+    Args:
+        results (Iterable[Mapping[str, Any]]): The result records, with a
+            ``task_id``, a ``model_answer`` and optionally a ``score`` and a
+            ``level``.
+        load_history (Callable): Returns the chat history of a task, e.g.
+            :meth:`ResultStore.history`. Runs without one are skipped.
+
+    Returns:
+        TrajectoryReport: The statistics.
+    """
+    trajectories = []
+    for record in results:
+        history = load_history(record["task_id"])
+        if not history:
+            continue
+        score = record.get("score")
+        trajectories.append(
+            analyze_trajectory(
+                record["task_id"],
+                history,
+                model_answer=record.get("model_answer"),
+                correct=None if score is None else bool(score),
+                level=record.get("level"),
+            )
+        )
+    return TrajectoryReport(trajectories)
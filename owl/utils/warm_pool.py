@@ -0,0 +1,204 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""Warm preloading of society factory modules and reuse of model clients
+across society runs."""
+
+import importlib
+import json
+import threading
+import time
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from camel.logger import get_logger
+from camel.models import BaseModelBackend, ModelFactory
+
+logger = get_logger(__name__)
+
+
+class ModelClientCache:
+    r"""Reuse model backends created with identical arguments.
+
+    Once installed, :meth:`ModelFactory.create` returns an existing backend
+    when one was already created for the same platform, model type, config,
+    API key and URL, so consecutive societies share HTTP clients, connection
+    pools and token counters instead of building seven new clients per
+    question. Model backends keep no conversation state, which lives in the
+    agents, so sharing them between runs is safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[str, BaseModelBackend] = {}
+        self._original: Optional[Callable[..., BaseModelBackend]] = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(args: tuple, kwargs: Dict[str, Any]) -> Optional[str]:
+        if kwargs.get("token_counter") is not None:
+            # A caller-provided counter belongs to the caller.
+            return None
+        try:
+            return json.dumps(
+                [[str(arg) for arg in args], kwargs], sort_keys=True, default=str
+            )
+        except (TypeError, ValueError):
+            return None
+
+    def install(self) -> None:
+        r"""Route :meth:`ModelFactory.create` through the cache."""
+        with self._lock:
+            if self._original is not None:
+                return
+            original = ModelFactory.create
+            self._original = original
+
+        def create(*args: Any, **kwargs: Any) -> BaseModelBackend:
+            key = self._key(args, kwargs)
+            if key is None:
+                return original(*args, **kwargs)
+            with self._lock:
+                client = self._clients.get(key)
+                if client is not None:
+                    self.hits += 1
+                    return client
+            client = original(*args, **kwargs)
+            with self._lock:
+                self.misses += 1
+                return self._clients.setdefault(key, client)
+
+        ModelFactory.create = staticmethod(create)
+
+    def uninstall(self) -> None:
+        r"""Restore the original :meth:`ModelFactory.create`."""
+        with self._lock:
+            if self._original is None:
+                return
+            ModelFactory.create = staticmethod(self._original)
+            self._original = None
+
+    def clear(self) -> None:
+        r"""Drop every cached client, e.g. after API keys were changed."""
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+
+class SocietyFactoryPool:
+    r"""Preload the modules providing ``construct_society`` and keep them
+    warm for incoming questions.
+
+    :meth:`preload` imports every module in a background thread and, when
+    ``warm_up`` is set, builds one throwaway society per module. That pays
+    the one-off costs (module and toolkit imports, tokenizer loading, model
+    client creation through the shared :class:`ModelClientCache`) before the
+    first user arrives. Societies themselves are built per question, since
+    the question is part of their system prompts and toolkits such as the
+    browser or the code sandbox hold per-run state.
+
+    Args:
+        module_names (Iterable[str]): The names of the modules to preload.
+        package (str, optional): The package containing the modules.
+            (default: :obj:`"examples"`)
+        model_cache (ModelClientCache, optional): The cache installed while
+            the pool is in use. (default: :obj:`None`)
+    """
+
+    WARM_UP_QUESTION = "Warm-up question, reply with 'done'."
+
+    def __init__(
+        self,
+        module_names: Iterable[str],
+        package: str = "examples",
+        model_cache: Optional[ModelClientCache] = None,
+    ):
+        self.module_names = list(module_names)
+        self.package = package
+        self.model_cache = model_cache
+        self._lock = threading.Lock()
+        self._module_locks: Dict[str, threading.Lock] = {
+            name: threading.Lock() for name in self.module_names
+        }
+        self._modules: Dict[str, ModuleType] = {}
+        self._errors: Dict[str, Exception] = {}
+        self._thread: Optional[threading.Thread] = None
+        if self.model_cache is not None:
+            self.model_cache.install()
+
+    def get_module(self, name: str) -> ModuleType:
+        r"""Return the imported module, importing it now if it has not been
+        preloaded yet.
+
+        Raises:
+            ImportError: If the module cannot be imported.
+        """
+        with self._lock:
+            lock = self._module_locks.setdefault(name, threading.Lock())
+        # Waits for a preload of the same module that is in progress.
+        with lock:
+            module = self._modules.get(name)
+            if module is not None:
+                return module
+            try:
+                module = importlib.import_module(f"{self.package}.{name}")
+            except Exception as e:
+                self._errors[name] = e
+                raise
+            self._errors.pop(name, None)
+            self._modules[name] = module
+            return module
+
+    def construct_society(self, name: str, question: str) -> Any:
+        r"""Build a society for ``question`` with the given module."""
+        return self.get_module(name).construct_society(question)
+
+    def _preload(self, warm_up: bool) -> None:
+        for name in self.module_names:
+            start = time.time()
+            try:
+                module = self.get_module(name)
+                if warm_up and hasattr(module, "construct_society"):
+                    module.construct_society(self.WARM_UP_QUESTION)
+            except Exception as e:
+                logger.warning(f"Could not preload module {name}: {e}")
+                continue
+            logger.info(f"Preloaded module {name} in {time.time() - start:.2f}s")
+
+    def preload(self, warm_up: bool = True, background: bool = True) -> None:
+        r"""Import, and optionally warm up, every module.
+
+        Args:
+            warm_up (bool, optional): Whether to build a throwaway society
+                per module. (default: :obj:`True`)
+            background (bool, optional): Whether to return immediately and
+                preload in a daemon thread. (default: :obj:`True`)
+        """
+        if not background:
+            self._preload(warm_up)
+            return
+        self._thread = threading.Thread(
+            target=self._preload, args=(warm_up,), name="owl-preload"
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def invalidate(self) -> None:
+        r"""Forget cached model clients so that the next societies pick up
+        changed credentials."""
+        if self.model_cache is not None:
+            self.model_cache.clear()
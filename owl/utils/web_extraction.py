@@ -0,0 +1,235 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+r"""In-process webpage extraction: pooled fetch, main-content detection
+and markdown conversion."""
+
+import re
+import threading
+from typing import Optional, Tuple
+
+import requests
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+from camel.logger import get_logger
+from requests.adapters import HTTPAdapter
+
+logger = get_logger(__name__)
+
+_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+# Elements that never carry the main content of a page.
+_NOISE_TAGS = [
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "iframe",
+    "svg",
+    "canvas",
+    "form",
+    "button",
+    "input",
+    "select",
+    "nav",
+    "footer",
+    "aside",
+]
+_NOISE_HINTS = re.compile(
+    r"comment|cookie|banner|sidebar|footer|footnote|masthead|menu|nav|"
+    r"popup|promo|related|share|social|sponsor|subscribe|advert|\bad\b",
+    re.IGNORECASE,
+)
+_CONTENT_HINTS = re.compile(
+    r"article|body|content|entry|main|page|post|story|text", re.IGNORECASE
+)
+_JS_REQUIRED = re.compile(
+    r"enable javascript|javascript is (disabled|required)|"
+    r"requires javascript|turn on javascript",
+    re.IGNORECASE,
+)
+_APP_ROOT_IDS = ("root", "app", "__next", "__nuxt", "svelte")
+
+MIN_CONTENT_CHARS = 200
+
+_session_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+
+
+def get_session() -> requests.Session:
+    r"""Return the process-wide HTTP session, so that connections to the
+    same hosts are kept alive and reused across extractions."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(
+                {
+                    "User-Agent": _USER_AGENT,
+                    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+                    "Accept-Language": "en-US,en;q=0.9",
+                }
+            )
+            _session = session
+        return _session
+
+
+def _make_soup(html: str) -> BeautifulSoup:
+    try:
+        return BeautifulSoup(html, "lxml")
+    except Exception:
+        return BeautifulSoup(html, "html.parser")
+
+
+def _class_and_id(tag: Tag) -> str:
+    classes = tag.get("class") or []
+    if isinstance(classes, str):
+        classes = [classes]
+    return " ".join(classes) + " " + (tag.get("id") or "")
+
+
+def _link_density(tag: Tag) -> float:
+    text_length = len(tag.get_text(" ", strip=True)) or 1
+    link_length = sum(len(a.get_text(" ", strip=True)) for a in tag.find_all("a"))
+    return link_length / text_length
+
+
+def _score_candidates(body: Tag) -> Optional[Tag]:
+    r"""Readability-style scoring: every paragraph adds points to its parent
+    and grandparent, weighted by its length and comma count, and the best
+    container after link-density damping wins."""
+    scores = {}
+    for block in body.find_all(["p", "pre", "td", "blockquote", "li"]):
+        text = block.get_text(" ", strip=True)
+        if len(text) < 25:
+            continue
+        points = 1 + text.count(",") + min(len(text) // 100, 3)
+        parent = block.parent
+        grandparent = parent.parent if isinstance(parent, Tag) else None
+        for node, share in ((parent, 1.0), (grandparent, 0.5)):
+            if not isinstance(node, Tag) or node.name in ("html", "[document]"):
+                continue
+            if node not in scores:
+                hints = _class_and_id(node)
+                base = 0.0
+                if _CONTENT_HINTS.search(hints):
+                    base += 25
+                if _NOISE_HINTS.search(hints):
+                    base -= 25
+                scores[node] = base
+            scores[node] += points * share
+
+    if not scores:
+        return None
+    best = max(scores, key=lambda node: scores[node] * (1 - _link_density(node)))
+    return best
+
+
+def extract_main_content(html: str) -> Tuple[str, str]:
+    r"""Extract the title and the main content of an HTML page as markdown.
+
+    Args:
+        html (str): The raw HTML of the page.
+
+    Returns:
+        Tuple[str, str]: The page title and the markdown of its main content.
+    """
+    import html2text
+
+    soup = _make_soup(html)
+    title = soup.title.get_text(strip=True) if soup.title else ""
+
+    for tag in soup.find_all(_NOISE_TAGS):
+        tag.decompose()
+    for tag in soup.find_all(True):
+        if tag.decomposed or tag.name in ("html", "body", "main", "article"):
+            continue
+        if _NOISE_HINTS.search(_class_and_id(tag)) and not _CONTENT_HINTS.search(
+            _class_and_id(tag)
+        ):
+            tag.decompose()
+
+    body = soup.body or soup
+    content = None
+    # A single <article> or <main> is trusted as the content; listing
+    # pages with many article teasers fall through to scoring.
+    for landmark in (
+        soup.find_all("article"),
+        soup.find_all("main"),
+        soup.find_all(attrs={"role": "main"}),
+    ):
+        if (
+            len(landmark) == 1
+            and len(landmark[0].get_text(strip=True)) >= MIN_CONTENT_CHARS
+        ):
+            content = landmark[0]
+            break
+    if content is None:
+        content = _score_candidates(body) or body
+
+    converter = html2text.HTML2Text()
+    converter.body_width = 0
+    converter.ignore_images = True
+    converter.protect_links = True
+    converter.unicode_snob = True
+    markdown = converter.handle(str(content))
+    markdown = re.sub(r"\n{3,}", "\n\n", markdown).strip()
+    return title, markdown
+
+
+def needs_javascript(html: str, markdown: str) -> bool:
+    r"""Guess whether a page only renders its content client-side."""
+    if len(markdown) >= MIN_CONTENT_CHARS:
+        return False
+    if _JS_REQUIRED.search(html):
+        return True
+    soup = _make_soup(html)
+    for root_id in _APP_ROOT_IDS:
+        root = soup.find(id=root_id)
+        if root is not None and len(root.get_text(strip=True)) < MIN_CONTENT_CHARS:
+            return True
+    return len(soup.find_all("script")) > 5
+
+
+def extract_webpage_locally(url: str, timeout: float = 10) -> Optional[str]:
+    r"""Fetch a page with a pooled connection and convert its main content
+    to markdown, without any remote crawling service.
+
+    Args:
+        url (str): The URL of the page.
+        timeout (float, optional): The request timeout in seconds.
+            (default: :obj:`10`)
+
+    Returns:
+        Optional[str]: The markdown content, or :obj:`None` when the page is
+            not HTML, is empty, or appears to need JavaScript rendering.
+    """
+    response = get_session().get(url, timeout=timeout)
+    response.raise_for_status()
+    content_type = response.headers.get("Content-Type", "").lower()
+    if content_type and "html" not in content_type:
+        logger.debug(f"Skipping local extraction of non-HTML page {url}")
+        return None
+
+    html = response.text
+    title, markdown = extract_main_content(html)
+    if not markdown or needs_javascript(html, markdown):
+        logger.debug(f"Local extraction of {url} found no static content")
+        return None
+    return f"# {title}\n\n{markdown}" if title else markdown
@@ -13,18 +13,23 @@
 # ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
 # Import from the correct module path
 from utils import run_society
+from utils.events import EVENT_BUS, EventBusHandler
+from utils.log_tail import LogTail
+from utils.log_rotation import RunLogHandler, TruncateFilter
+from utils.conversation import ConversationStore
+from utils.jobs import JobManager, QueueFullError, CANCELLED, FINISHED
+from utils.warm_pool import ModelClientCache, SocietyFactoryPool
+from utils.streaming import enable_streaming
+from utils.run_history import ReusePolicy, RunHistory
 import os
 import gradio as gr
-import time
 import json
 import logging
 import datetime
 from typing import Tuple
-import importlib
 from dotenv import load_dotenv, set_key, find_dotenv, unset_key
-import threading
-import queue
 import re
+import uuid
 
 os.environ["PYTHONIOENCODING"] = "utf-8"
 
@@ -49,9 +54,15 @@ def setup_logging():
 
     root_logger.setLevel(logging.INFO)
 
-    # Create file handler
-    file_handler = logging.FileHandler(log_file, encoding="utf-8", mode="a")
+    # Create file handler, rotated and compressed once it grows too large
+    global LOG_HANDLER
+    file_handler = RunLogHandler(
+        log_file,
+        max_bytes=int(os.environ.get("OWL_LOG_MAX_BYTES", 50 * 1024 * 1024)),
+        backup_count=int(os.environ.get("OWL_LOG_BACKUPS", "10")),
+    )
     file_handler.setLevel(logging.INFO)
+    LOG_HANDLER = file_handler
 
     # Create console handler
     console_handler = logging.StreamHandler()
@@ -64,9 +75,22 @@ def setup_logging():
     file_handler.setFormatter(formatter)
     console_handler.setFormatter(formatter)
 
+    # Publish records to the event bus so that the UI is notified at event
+    # time instead of polling the log file
+    bus_handler = EventBusHandler(EVENT_BUS, level=logging.INFO)
+    bus_handler.setFormatter(formatter)
+
+    # Cap the size of single records, e.g. whole rounds or web pages
+    truncate_filter = TruncateFilter(
+        int(os.environ.get("OWL_LOG_MAX_RECORD_CHARS", "10000"))
+    )
+    for handler in (file_handler, console_handler, bus_handler):
+        handler.addFilter(truncate_filter)
+
     # Add handlers to root logger
     root_logger.addHandler(file_handler)
     root_logger.addHandler(console_handler)
+    root_logger.addHandler(bus_handler)
 
     logging.info("Logging system initialized, log file: %s", log_file)
     return log_file
@@ -74,85 +98,93 @@ def setup_logging():
 
 # Global variables
 LOG_FILE = None
-LOG_QUEUE: queue.Queue = queue.Queue()  # Log queue
-STOP_LOG_THREAD = threading.Event()
-CURRENT_PROCESS = None  # Used to track the currently running process
-STOP_REQUESTED = threading.Event()  # Used to mark if stop was requested
+LOG_TAIL = None  # Incremental reader of the end of LOG_FILE
+LOG_HANDLER = None  # Handler writing LOG_FILE, with the index of each run's lines
+# Runs the questions of all users on a bounded pool of workers
+JOB_MANAGER = JobManager(
+    max_workers=int(os.environ.get("OWL_WEB_MAX_WORKERS", "2")),
+    max_queue=int(os.environ.get("OWL_WEB_MAX_QUEUE", "16")),
+    bus=EVENT_BUS,
+)
 
 
-# Log reading and updating functions
-def log_reader_thread(log_file):
-    """Background thread that continuously reads the log file and adds new lines to the queue"""
-    try:
-        with open(log_file, "r", encoding="utf-8") as f:
-            # Move to the end of file
-            f.seek(0, 2)
-
-            while not STOP_LOG_THREAD.is_set():
-                line = f.readline()
-                if line:
-                    LOG_QUEUE.put(line)  # Add to conversation record queue
-                else:
-                    # No new lines, wait for a short time
-                    time.sleep(0.1)
-    except Exception as e:
-        logging.error(f"Log reader thread error: {str(e)}")
-
+def get_latest_logs(max_lines=100, job_id=None):
+    """Get the latest log lines from the end of the log file
 
-def get_latest_logs(max_lines=100, queue_source=None):
-    """Get the latest log lines from the queue, or read directly from the file if the queue is empty
+    Only the bytes appended since the previous call are read, so the cost of
+    a refresh does not grow with the size of the log file.
 
     Args:
         max_lines: Maximum number of lines to return
-        queue_source: Specify which queue to use, default is LOG_QUEUE
+        job_id: Job of the current user, whose messages or log lines are
+            shown if known
 
     Returns:
         str: Log content
     """
-    logs = []
-    log_queue = queue_source if queue_source else LOG_QUEUE
+    # Prefer the structured messages of the user's own run over parsing logs
+    job = JOB_MANAGER.get(job_id) if job_id else None
+    if job is not None and job.context is not None and len(job.context) > 0:
+        return "\n\n".join(format_message(message) for message in job.context.since(0))
 
-    # Create a temporary queue to store logs so we can process them without removing them from the original queue
-    temp_queue = queue.Queue()
-    temp_logs = []
-
-    try:
-        # Try to get all available log lines from the queue
-        while not log_queue.empty() and len(temp_logs) < max_lines:
-            log = log_queue.get_nowait()
-            temp_logs.append(log)
-            temp_queue.put(log)  # Put the log back into the temporary queue
-    except queue.Empty:
-        pass
-
-    # Process conversation records
-    logs = temp_logs
-
-    # If there are no new logs or not enough logs, try to read the last few lines directly from the file
-    if len(logs) < max_lines and LOG_FILE and os.path.exists(LOG_FILE):
+    logs = []
+    # Otherwise jump to the log lines of the user's run through the log index
+    if job_id and LOG_HANDLER is not None:
         try:
-            with open(LOG_FILE, "r", encoding="utf-8") as f:
-                all_lines = f.readlines()
-                # If there are already some logs in the queue, only read the remaining needed lines
-                remaining_lines = max_lines - len(logs)
-                file_logs = (
-                    all_lines[-remaining_lines:]
-                    if len(all_lines) > remaining_lines
-                    else all_lines
-                )
+            lines = LOG_HANDLER.read_run(job_id)[-max_lines:]
+            logs = [line + "\n" for line in lines]
+        except Exception as e:
+            logging.error(f"Error reading the log lines of job {job_id}: {str(e)}")
 
-                # Add file logs before queue logs
-                logs = file_logs + logs
+    if not logs and LOG_TAIL is not None:
+        try:
+            logs = LOG_TAIL.read()[-max_lines:]
         except Exception as e:
             error_msg = f"Error reading log file: {str(e)}"
             logging.error(error_msg)
-            if not logs:  # Only add error message if there are no logs
-                logs = [error_msg]
+            logs = [error_msg]
 
     # If there are still no logs, return a prompt message
     if not logs:
         return "Initialization in progress..."
 
+    return render_conversation(logs)
+
+
+def format_message(message):
+    """Format one message of a conversation store as markdown
+
+    Args:
+        message: Message dictionary from ConversationStore
+
+    Returns:
+        str: Message in markdown format
+    """
+    role = message["role"]
+    lines = [line.strip() for line in message["content"].split("\n")]
+    content = "\n".join(lines).strip()
+
+    tool_names = [call.get("tool_name", "") for call in message.get("tool_calls") or []]
+    if tool_names:
+        content += (
+            "\n\n*Tools used: " + ", ".join(f"`{name}`" for name in tool_names) + "*"
+        )
+
+    role_emoji = "🙋" if role.lower() == "user" else "🤖"
+    return f"""### {role_emoji} {role.title()} Agent
+
+{content}"""
+
+
+def render_conversation(logs):
+    """Render the agent conversation contained in a list of log lines
+
+    Args:
+        logs: Log lines to render
+
+    Returns:
+        str: Conversation in markdown format
+    """
     # Filter logs, only keep logs with 'camel.agents.chat_agent - INFO'
     filtered_logs = []
     for log in logs:
@@ -259,6 +291,38 @@ MODULE_DESCRIPTIONS = {
     "run_novita_ai": "Using novita ai model to process tasks",
 }
 
+# Keeps the modules above imported and their model clients alive between runs
+SOCIETY_POOL = SocietyFactoryPool(MODULE_DESCRIPTIONS, model_cache=ModelClientCache())
+ENV_FILE_STATE = None  # (path, mtime) of the last loaded .env file
+
+# Past runs, searchable and optionally reused for repeated questions
+RUN_HISTORY = RunHistory(
+    os.environ.get(
+        "OWL_RUN_HISTORY", os.path.join(os.path.dirname(__file__), "run_history.db")
+    )
+)
+REUSE_POLICY = ReusePolicy.from_env()
+
+
+def refresh_env():
+    """Reload the .env file only if it changed since it was last loaded
+
+    Cached model clients are dropped on change, so that new credentials are
+    used by the next run.
+    """
+    global ENV_FILE_STATE
+    dotenv_path = find_dotenv()
+    try:
+        state = (dotenv_path, os.path.getmtime(dotenv_path)) if dotenv_path else None
+    except OSError:
+        state = None
+    if state != ENV_FILE_STATE:
+        load_dotenv(dotenv_path, override=True)
+        if ENV_FILE_STATE is not None:
+            logging.info("Environment variables changed, refreshing model clients")
+            SOCIETY_POOL.invalidate()
+        ENV_FILE_STATE = state
+
 
 # Default environment variable template
 DEFAULT_ENV_TEMPLATE = """#===========================================
@@ -315,18 +379,24 @@ def validate_input(question: str) -> bool:
     return True
 
 
-def run_owl(question: str, example_module: str) -> Tuple[str, str, str]:
+def run_owl(
+    question: str,
+    example_module: str,
+    conversation: ConversationStore = None,
+    stream: bool = False,
+) -> Tuple[str, str, str]:
     """Run the OWL system and return results
 
     Args:
         question: User question
         example_module: Example module name to import (e.g., "run_terminal_zh" or "run_deep")
+        conversation: Store receiving the messages of every round, if given
+        stream: Whether to publish the agents' responses token by token as
+            "token" events while they are generated
 
     Returns:
         Tuple[...]: Answer, token count, status
     """
-    global CURRENT_PROCESS
-
     # Validate input
     if not validate_input(question):
         logging.warning("User submitted invalid input")
@@ -337,8 +407,8 @@ def run_owl(question: str, example_module: str) -> Tuple[str, str, str]:
         )
 
     try:
-        # Ensure environment variables are loaded
-        load_dotenv(find_dotenv(), override=True)
+        # Ensure the latest environment variables are loaded
+        refresh_env()
         logging.info(
             f"Processing question: '{question}', using module: {example_module}"
         )
@@ -352,11 +422,11 @@ def run_owl(question: str, example_module: str) -> Tuple[str, str, str]:
                 "❌ Error: Unsupported module",
             )
 
-        # Dynamically import target module
+        # Get the target module, imported at startup unless it failed then
         module_path = f"examples.{example_module}"
         try:
             logging.info(f"Importing module: {module_path}")
-            module = importlib.import_module(module_path)
+            module = SOCIETY_POOL.get_module(example_module)
         except ImportError as ie:
             logging.error(f"Unable to import module {module_path}: {str(ie)}")
             return (
@@ -385,10 +455,37 @@ def run_owl(question: str, example_module: str) -> Tuple[str, str, str]:
                 "❌ Error: Module interface incompatible",
             )
 
+        # Serve a repeated question from the run history if allowed
+        reused = RUN_HISTORY.find_reusable(question, example_module, REUSE_POLICY)
+        if reused is not None:
+            logging.info(
+                f"Reusing the answer of run {reused.run_id} "
+                f"(similarity {reused.similarity:.2f})"
+            )
+            if conversation is not None:
+                for round_idx, record in enumerate(reused.chat_history):
+                    conversation.add_round(round_idx, record)
+            RUN_HISTORY.record(
+                question, example_module, reused.answer, reused_from=reused.run_id
+            )
+            created = datetime.datetime.fromtimestamp(reused.created_at)
+            return (
+                reused.answer,
+                "Reused answer, no new tokens",
+                f"✅ Reused the answer of a previous run from {created:%Y-%m-%d %H:%M}",
+            )
+
         # Build society simulation
         try:
             logging.info("Building society simulation...")
             society = module.construct_society(question)
+            if stream:
+                enable_streaming(
+                    society,
+                    lambda role, delta: EVENT_BUS.publish(
+                        "token", role=role, delta=delta
+                    ),
+                )
 
         except Exception as e:
             logging.error(f"Error occurred while building society simulation: {str(e)}")
@@ -401,7 +498,12 @@ def run_owl(question: str, example_module: str) -> Tuple[str, str, str]:
         # Run society simulation
         try:
             logging.info("Running society simulation...")
-            answer, chat_history, token_info = run_society(society)
+            answer, chat_history, token_info = run_society(
+                society,
+                round_callback=(
+                    conversation.add_round if conversation is not None else None
+                ),
+            )
             logging.info("Society simulation completed")
         except Exception as e:
             logging.error(f"Error occurred while running society simulation: {str(e)}")
@@ -423,6 +525,13 @@ def run_owl(question: str, example_module: str) -> Tuple[str, str, str]:
             f"Processing completed, token usage: completion={completion_tokens}, prompt={prompt_tokens}, total={total_tokens}"
         )
 
+        try:
+            RUN_HISTORY.record(
+                question, example_module, answer, chat_history, token_info
+            )
+        except Exception as e:
+            logging.warning(f"Failed to save the run to the run history: {str(e)}")
+
         return (
             answer,
             f"Completion tokens: {completion_tokens:,} | Prompt tokens: {prompt_tokens:,} | Total: {total_tokens:,}",
@@ -436,6 +545,36 @@ def run_owl(question: str, example_module: str) -> Tuple[str, str, str]:
         return (f"Error occurred: {str(e)}", "0", f"❌ Error: {str(e)}")
 
 
+def search_run_history(query: str) -> str:
+    """Search past runs and return them as a markdown table
+
+    Args:
+        query: Words to search for, or empty for the most recent runs
+
+    Returns:
+        str: Matching runs in markdown format
+    """
+    runs = RUN_HISTORY.search(query or "", limit=20)
+    if not runs:
+        return "No matching runs."
+
+    def cell(text):
+        return " ".join(str(text).split()).replace("|", "\\|")[:200]
+
+    rows = [
+        "| Time | Module | Question | Answer | Tokens |",
+        "| --- | --- | --- | --- | --- |",
+    ]
+    for run in runs:
+        created = datetime.datetime.fromtimestamp(run.created_at)
+        answer = run.answer if not run.reused_from else f"♻️ {run.answer}"
+        rows.append(
+            f"| {created:%Y-%m-%d %H:%M} | {run.module} | {cell(run.question)} "
+            f"| {cell(answer)} | {run.prompt_tokens + run.completion_tokens:,} |"
+        )
+    return "\n".join(rows)
+
+
 def update_module_description(module_name: str) -> str:
     """Return the description of the selected module"""
     return MODULE_DESCRIPTIONS.get(module_name, "No description available")
@@ -781,91 +920,131 @@ def get_env_var_value(key):
 def create_ui():
     """Create enhanced Gradio interface"""
 
-    def clear_log_file():
-        """Clear log file content"""
-        try:
-            if LOG_FILE and os.path.exists(LOG_FILE):
-                # Clear log file content instead of deleting the file
-                open(LOG_FILE, "w").close()
-                logging.info("Log file has been cleared")
-                # Clear log queue
-                while not LOG_QUEUE.empty():
-                    try:
-                        LOG_QUEUE.get_nowait()
-                    except queue.Empty:
-                        break
-                return ""
-            else:
-                return ""
-        except Exception as e:
-            logging.error(f"Error clearing log file: {str(e)}")
-            return ""
+    def clear_conversation():
+        """Clear the conversation record of the current user
 
-    # Create a real-time log update function
-    def process_with_live_logs(question, module_name):
-        """Process questions and update logs in real-time"""
-        global CURRENT_PROCESS
+        The shared log file is left untouched, as other users may be running
+        questions at the same time.
+        """
+        return "No conversation records yet.", None
 
-        # Clear log file
-        clear_log_file()
+    def status_html(kind, text):
+        return f"<span class='status-indicator status-{kind}'></span> {text}"
 
-        # Create a background thread to process the question
-        result_queue = queue.Queue()
+    def stop_job(job_id):
+        """Cancel the running or waiting job of the current user"""
+        if job_id and JOB_MANAGER.cancel(job_id):
+            logging.info(f"Job {job_id} cancelled by user")
+            return status_html("error", "Stopping...")
+        return gr.update()
 
-        def process_in_background():
+    # Create a real-time log update function
+    def process_with_live_logs(question, module_name, stream=False):
+        """Process questions and update logs in real-time"""
+        # The job id is also the session of the job's events, so this run
+        # only sees its own events even when other users run questions
+        job_id = uuid.uuid4().hex
+        subscription = EVENT_BUS.subscribe(job_id)
+        conversation = ConversationStore(job_id, EVENT_BUS)
+
+        try:
             try:
-                result = run_owl(question, module_name)
-                result_queue.put(result)
-            except Exception as e:
-                result_queue.put(
-                    (f"Error occurred: {str(e)}", "0", f"❌ Error: {str(e)}")
+                job = JOB_MANAGER.submit(
+                    run_owl,
+                    question,
+                    module_name,
+                    conversation,
+                    stream,
+                    job_id=job_id,
+                    context=conversation,
                 )
-
-        # Start background processing thread
-        bg_thread = threading.Thread(target=process_in_background)
-        CURRENT_PROCESS = bg_thread  # Record current process
-        bg_thread.start()
-
-        # While waiting for processing to complete, update logs once per second
-        while bg_thread.is_alive():
-            # Update conversation record display
-            logs2 = get_latest_logs(100, LOG_QUEUE)
-
-            # Always update status
-            yield (
-                "0",
-                "<span class='status-indicator status-running'></span> Processing...",
-                logs2,
-            )
-
-            time.sleep(1)
+            except QueueFullError as e:
+                logging.warning(f"Rejected question: {str(e)}")
+                yield (
+                    "0",
+                    status_html("error", f"Server busy: {str(e)}"),
+                    "No conversation records yet.",
+                    None,
+                )
+                return
+
+            # Rendered messages, extended with only the new messages on each update
+            rendered_messages = []
+            # [role, text] of the responses being streamed in the current round
+            streaming = []
+            logs2 = "No conversation records yet."
+            status = status_html("running", "Waiting for a worker...")
+            yield "0", status, logs2, job_id
+
+            # Update the status and conversation record whenever the job
+            # reports progress or stores new messages
+            finished = False
+            while not finished:
+                # Block until the next event, then take the whole burst at once
+                event = subscription.get()
+                if event is None:
+                    break
+                previous_status = status
+                has_deltas = False
+                for event in [event] + subscription.drain():
+                    if event.type == "queued":
+                        status = status_html(
+                            "running",
+                            f"Queued, position {event.data['position']} in line...",
+                        )
+                    elif event.type == "started":
+                        status = status_html("running", "Processing...")
+                    elif event.type == "job_finished":
+                        finished = True
+                    elif event.type == "token":
+                        if streaming and streaming[-1][0] == event.data["role"]:
+                            streaming[-1][1] += event.data["delta"]
+                        else:
+                            streaming.append([event.data["role"], event.data["delta"]])
+                        has_deltas = True
+
+                new_messages = conversation.since(len(rendered_messages))
+                if new_messages:
+                    rendered_messages.extend(format_message(m) for m in new_messages)
+                    # The complete messages replace the streamed text
+                    streaming = []
+                if new_messages or has_deltas:
+                    logs2 = "\n\n".join(
+                        rendered_messages
+                        + [
+                            format_message({"role": role, "content": text + " ▌"})
+                            for role, text in streaming
+                        ]
+                    )
+                if not finished and (
+                    new_messages or has_deltas or status != previous_status
+                ):
+                    yield "0", status, logs2, job_id
+        finally:
+            subscription.close()
 
         # Processing complete, get results
-        if not result_queue.empty():
-            result = result_queue.get()
-            answer, token_count, status = result
-
-            # Final update of conversation record
-            logs2 = get_latest_logs(100, LOG_QUEUE)
+        if job.status == FINISHED:
+            answer, token_count, status = job.result
 
             # Set different indicators based on status
             if "Error" in status:
-                status_with_indicator = (
-                    f"<span class='status-indicator status-error'></span> {status}"
-                )
+                status_with_indicator = status_html("error", status)
             else:
-                status_with_indicator = (
-                    f"<span class='status-indicator status-success'></span> {status}"
-                )
+                status_with_indicator = status_html("success", status)
 
-            yield token_count, status_with_indicator, logs2
-        else:
-            logs2 = get_latest_logs(100, LOG_QUEUE)
+            yield token_count, status_with_indicator, logs2, job_id
+        elif job.error is not None:
             yield (
                 "0",
-                "<span class='status-indicator status-error'></span> Terminated",
+                status_html("error", f"❌ Error: {str(job.error)}"),
                 logs2,
+                job_id,
             )
+        elif job.status == CANCELLED:
+            yield "0", status_html("error", "⏹️ Stopped"), logs2, job_id
+        else:
+            yield "0", status_html("error", "Terminated"), logs2, job_id
 
     with gr.Blocks(title="OWL", theme=gr.themes.Soft(primary_hue="blue")) as app:
         gr.Markdown(
@@ -1113,10 +1292,20 @@ def create_ui():
                     elem_classes="module-info",
                 )
 
+                stream_checkbox = gr.Checkbox(
+                    label="Stream responses token by token",
+                    value=os.environ.get("OWL_WEB_STREAM", "false").lower() == "true",
+                    interactive=True,
+                )
+
+                # Id of the latest job of this browser session
+                job_state = gr.State(None)
+
                 with gr.Row():
                     run_button = gr.Button(
                         "Run", variant="primary", elem_classes="primary"
                     )
+                    stop_button = gr.Button("Stop", variant="stop")
 
                 status_output = gr.HTML(
                     value="<span class='status-indicator status-success'></span> Ready",
@@ -1162,6 +1351,27 @@ def create_ui():
                             "Clear Record", variant="secondary"
                         )
 
+                with gr.TabItem("Run History"):
+                    with gr.Row():
+                        history_query = gr.Textbox(
+                            label="Search past questions and answers",
+                            placeholder="Leave empty to list the most recent runs",
+                            scale=4,
+                        )
+                        history_search_button = gr.Button("Search", scale=1)
+                    history_results = gr.Markdown("No matching runs.")
+
+                    history_search_button.click(
+                        fn=search_run_history,
+                        inputs=[history_query],
+                        outputs=[history_results],
+                    )
+                    history_query.submit(
+                        fn=search_run_history,
+                        inputs=[history_query],
+                        outputs=[history_results],
+                    )
+
                 with gr.TabItem("Environment Variable Management", id="env-settings"):
                     with gr.Group(elem_classes="env-manager-container"):
                         gr.Markdown("""
@@ -1248,8 +1458,17 @@ def create_ui():
         # Set up event handling
         run_button.click(
             fn=process_with_live_logs,
-            inputs=[question_input, module_dropdown],
-            outputs=[token_count_output, status_output, log_display2],
+            inputs=[question_input, module_dropdown, stream_checkbox],
+            outputs=[token_count_output, status_output, log_display2, job_state],
+            # Admission and concurrency are handled by JOB_MANAGER
+            concurrency_limit=None,
+        )
+
+        stop_button.click(
+            fn=stop_job,
+            inputs=[job_state],
+            outputs=[status_output],
+            concurrency_limit=None,
         )
 
         # Module selection updates description
@@ -1261,10 +1480,14 @@ def create_ui():
 
         # Conversation record related event handling
         refresh_logs_button2.click(
-            fn=lambda: get_latest_logs(100, LOG_QUEUE), outputs=[log_display2]
+            fn=lambda job_id: get_latest_logs(100, job_id),
+            inputs=[job_state],
+            outputs=[log_display2],
         )
 
-        clear_logs_button2.click(fn=clear_log_file, outputs=[log_display2])
+        clear_logs_button2.click(
+            fn=clear_conversation, outputs=[log_display2, job_state]
+        )
 
         # Auto refresh control
         def toggle_auto_refresh(enabled):
@@ -1288,19 +1511,20 @@ def create_ui():
 def main():
     try:
         # Initialize logging system
-        global LOG_FILE
+        global LOG_FILE, LOG_TAIL
         LOG_FILE = setup_logging()
+        LOG_TAIL = LogTail(LOG_FILE, max_lines=1000)
         logging.info("OWL Web application started")
 
-        # Start log reading thread
-        log_thread = threading.Thread(
-            target=log_reader_thread, args=(LOG_FILE,), daemon=True
-        )
-        log_thread.start()
-        logging.info("Log reading thread started")
-
         # Initialize .env file (if it doesn't exist)
         init_env_file()
+        refresh_env()
+
+        # Import the society modules and build their model clients ahead of
+        # the first question
+        SOCIETY_POOL.preload(
+            warm_up=os.environ.get("OWL_WEB_WARM_UP", "true").lower() == "true"
+        )
         app = create_ui()
 
         app.queue()
@@ -1318,9 +1542,8 @@ def main():
         traceback.print_exc()
 
     finally:
-        # Ensure log thread stops
-        STOP_LOG_THREAD.set()
-        STOP_REQUESTED.set()
+        # Cancel running jobs, which also kills the processes of their tools
+        JOB_MANAGER.shutdown()
         logging.info("Application closed")
 
 
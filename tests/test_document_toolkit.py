@@ -0,0 +1,141 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+import asyncio
+import json
+
+import pytest
+
+from owl.utils import document_toolkit
+from owl.utils.document_toolkit import DocumentProcessingToolkit
+
+
+class FakeResult:
+    def __init__(self, path, failed=False):
+        self.status = "Failed" if failed else "Succeeded"
+        self.message = f"cannot parse {path}" if failed else ""
+        self.path = path
+
+    def markdown(self):
+        return f"# {self.path}"
+
+    def json(self):
+        return {"path": self.path}
+
+
+class FakeTask:
+    def __init__(self, chunkr, path):
+        self.chunkr = chunkr
+        self.path = path
+
+    async def poll(self):
+        self.chunkr.in_flight += 1
+        self.chunkr.max_in_flight = max(
+            self.chunkr.max_in_flight, self.chunkr.in_flight
+        )
+        await asyncio.sleep(0.01)
+        self.chunkr.in_flight -= 1
+        return FakeResult(self.path, failed="broken" in self.path)
+
+
+class FakeChunkr:
+    r"""Stand-in for the Chunkr client, recording what it was asked."""
+
+    instances = []
+
+    def __init__(self, api_key=None):
+        self.created = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.closed = False
+        FakeChunkr.instances.append(self)
+
+    async def create_task(self, path):
+        if "unreachable" in path:
+            raise ConnectionError("connection refused")
+        self.created.append(path)
+        return FakeTask(self, path)
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def toolkit(tmp_path, monkeypatch):
+    FakeChunkr.instances = []
+    monkeypatch.setattr(document_toolkit, "Chunkr", FakeChunkr)
+    monkeypatch.setenv("CHUNKR_API_KEY", "test")
+    # The image analysis toolkit creates a default model client.
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    return DocumentProcessingToolkit(cache_dir=str(tmp_path / "cache"))
+
+
+def make_files(tmp_path, names):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.write_text("content")
+        paths.append(str(path))
+    return paths
+
+
+def test_batch_keeps_order_and_limits_concurrency(toolkit, tmp_path):
+    paths = make_files(tmp_path, [f"doc{i}.pdf" for i in range(10)])
+    contents = asyncio.run(
+        toolkit._extract_contents_with_chunkr(paths, max_concurrency=3)
+    )
+    assert contents == [f"# {path}" for path in paths]
+    (chunkr,) = FakeChunkr.instances
+    assert chunkr.max_in_flight <= 3
+    assert chunkr.closed
+
+
+def test_batch_reports_failures_per_document(toolkit, tmp_path):
+    paths = make_files(tmp_path, ["a.pdf", "broken.pdf", "unreachable.pdf"])
+    contents = asyncio.run(
+        toolkit._extract_contents_with_chunkr(paths, output_format="json")
+    )
+    assert contents[0] == json.dumps({"path": paths[0]})
+    assert contents[1].startswith(document_toolkit.CHUNKR_ERROR_PREFIX)
+    assert "connection refused" in contents[2]
+
+
+def test_extract_documents_content_batches_chunkr_documents(
+    toolkit, tmp_path, monkeypatch
+):
+    pdfs = make_files(tmp_path, ["a.pdf", "b.docx", "broken.pdf"])
+    (script,) = make_files(tmp_path, ["c.py"])
+    fallback = []
+
+    def extract_one(path):
+        fallback.append(path)
+        return True, f"single {path}"
+
+    # Only the documents Chunkr did not handle are extracted one by one.
+    monkeypatch.setattr(toolkit, "extract_document_content", extract_one)
+    results = toolkit.extract_documents_content([pdfs[0], script, pdfs[1], pdfs[2]])
+
+    assert results == [
+        (True, f"# {pdfs[0]}"),
+        (True, f"single {script}"),
+        (True, f"# {pdfs[1]}"),
+        (True, f"single {pdfs[2]}"),
+    ]
+    assert fallback == [script, pdfs[2]]
+    (chunkr,) = FakeChunkr.instances
+    assert chunkr.created == pdfs
+
+
+def test_extract_documents_content_is_a_tool(toolkit):
+    names = [tool.get_function_name() for tool in toolkit.get_tools()]
+    assert "extract_documents_content" in names